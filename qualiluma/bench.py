@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+"""
+Throughput benchmarks of qualiluma itself, with the fake LLM backend.
+
+Measures files/sec, LLM requests/sec, client CPU time per request and peak
+memory of `check_path` over synthetic trees, for every checker separately.
+Every checker runs in a fresh process, so that its peak memory is its own,
+and is compared with the baseline relative to a reference workload timed
+in the same process, so that baselines of other machines stay usable.
+
+Usage:
+    python -m qualiluma.bench --files 1000 --baseline tests/bench_baseline.json
+"""
+
+import argparse
+import ast
+import hashlib
+import json
+import multiprocessing
+import os
+import random
+import resource
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from pydantic import BaseModel
+
+from .main import build_checkers, check_path
+from .util import Config, flush_logging, init_logging
+from .util.llm import configure_llms
+from .util.metrics import METRICS
+
+CHECKER_NAMES = [
+    "trailing newline",
+    "local rules",
+    "LLMSimpleChecker",
+    "VariablesConsistencyChecker",
+    "PepChecker",
+]
+FILES_PER_DIR = 100
+# allowed relative speed against the baseline before it is a regression, i.e.
+# slowdowns over 1.7x fail, smaller ones are within the noise of 1000 files
+REGRESSION_TOLERANCE = 0.6
+REFERENCE_SECONDS = 0.2  # duration of the reference workload
+
+_TEMPLATES = {
+    ".py": "def function_{i}(value):\n    result = value * {i}\n    return result\n",
+    ".js": "function f{i}(value) {{\n  return value * {i};\n}}\n",
+    ".md": "## Section {i}\n\nSome documentation for item {i}.\n",
+}
+
+
+class BenchResult(BaseModel):
+    """Throughput of one checker over one tree."""
+
+    checker: str
+    files: int
+    seconds: float
+    files_per_sec: float
+    requests: int
+    requests_per_sec: float
+    cpu_ms_per_request: float | None
+    peak_rss_mb: float
+    # files/sec per reference workload iteration/sec, comparable across machines
+    relative_speed: float
+
+
+def make_synthetic_tree(root: Path, n_files: int, seed: int = 0) -> Path:
+    """Create a tree of small source files, FILES_PER_DIR per directory.
+
+    Args:
+        root: The directory to create files in.
+        n_files: The number of files to create.
+        seed: The seed for file contents.
+
+    Returns:
+        The root directory.
+    """
+    rng = random.Random(seed)
+    extensions = list(_TEMPLATES)
+    for i in range(n_files):
+        directory = (
+            root / f"pkg_{i // FILES_PER_DIR // 10}" / f"mod_{i // FILES_PER_DIR}"
+        )
+        if i % FILES_PER_DIR == 0:
+            directory.mkdir(parents=True, exist_ok=True)
+        ext = rng.choice(extensions)
+        text = "".join(_TEMPLATES[ext].format(i=j) for j in range(rng.randint(1, 10)))
+        if rng.random() < 0.1:
+            text = text.rstrip("\n")  # some files fail the trailing newline check
+        (directory / f"file_{i}{ext}").write_text(text)
+    return root
+
+
+def measure_reference(seconds: float = REFERENCE_SECONDS) -> float:
+    """Time a fixed CPU workload, similar to local checks, in this process.
+
+    Returns:
+        Iterations per second of the workload.
+    """
+    text = "".join(_TEMPLATES[".py"].format(i=i) for i in range(50))
+    iterations = 0
+    start = time.perf_counter()
+    while (elapsed := time.perf_counter() - start) < seconds:
+        ast.parse(text)
+        hashlib.sha256(text.encode()).hexdigest()
+        "\n".join(f"{i}: {line}" for i, line in enumerate(text.splitlines(), 1))
+        iterations += 1
+    return iterations / elapsed
+
+
+def run_benchmark(
+    root: Path,
+    checker_name: str,
+    jobs: int = 1,
+    latency: float = 0.0,
+    log_file: str = os.devnull,
+) -> BenchResult:
+    """Run one checker over a tree in a fresh process and measure its throughput.
+
+    Args:
+        root: The tree to check.
+        checker_name: The name of the checker to run.
+        jobs: Worker processes for CPU-bound checkers.
+        latency: Constant fake LLM latency in seconds.
+        log_file: The log of the benchmark process.
+
+    Returns:
+        The measured throughput.
+    """
+    with ProcessPoolExecutor(
+        max_workers=1, mp_context=multiprocessing.get_context("spawn")
+    ) as executor:
+        return executor.submit(
+            _run_benchmark, root, checker_name, jobs, latency, log_file
+        ).result()
+
+
+def _run_benchmark(
+    root: Path, checker_name: str, jobs: int, latency: float, log_file: str
+) -> BenchResult:
+    init_logging(log_file, console_log_level="WARNING")
+    configure_llms(
+        backend="fake",
+        fake={"latency": {"distribution": "constant", "value": latency}},
+    )
+    reference_before = measure_reference()
+    checkers = build_checkers(Config(), checker_name)
+    METRICS.clear()
+
+    cpu_start = time.process_time()
+    start = time.perf_counter()
+    results = check_path(root, checkers, jobs=jobs)
+    seconds = time.perf_counter() - start
+    cpu_seconds = time.process_time() - cpu_start
+
+    files = sum(len(file_results) for file_results in results.values())
+    requests = sum(record.llm_calls for record in METRICS.records)
+    peak_rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    reference = (reference_before + measure_reference()) / 2  # load may change
+    flush_logging()
+    return BenchResult(
+        checker=checker_name,
+        files=files,
+        seconds=seconds,
+        files_per_sec=files / seconds,
+        requests=requests,
+        requests_per_sec=requests / seconds,
+        cpu_ms_per_request=cpu_seconds * 1000 / requests if requests else None,
+        peak_rss_mb=peak_rss_kb / 1024,
+        relative_speed=files / seconds / reference,
+    )
+
+
+def find_regressions(
+    results: list[BenchResult], baseline: dict, n_files: int
+) -> list[str]:
+    """Compare results with baseline speeds, relative to the reference workload.
+
+    Args:
+        results: The measured results.
+        baseline: Baseline data, {n_files: {checker: {"relative_speed": ...}}}.
+        n_files: The size of the benchmarked tree.
+
+    Returns:
+        Descriptions of the regressions found.
+    """
+    regressions = []
+    for res in results:
+        expected = baseline.get(str(n_files), {}).get(res.checker)
+        if expected is None:
+            continue
+        if res.relative_speed < expected["relative_speed"] * REGRESSION_TOLERANCE:
+            regressions.append(
+                f"{res.checker} on {n_files} files: relative speed"
+                f" {res.relative_speed:.2f}, baseline {expected['relative_speed']:.2f}"
+                f" ({res.files_per_sec:.0f} files/sec)"
+            )
+    return regressions
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Benchmark qualiluma throughput with a fake LLM",
+        prog="qualiluma.bench",
+    )
+    parser.add_argument("--files", type=int, default=1000, help="Files in the tree")
+    parser.add_argument(
+        "-c",
+        "--checkers",
+        type=str,
+        default=",".join(CHECKER_NAMES),
+        help="Comma-separated list of checkers to benchmark",
+    )
+    parser.add_argument(
+        "--latency",
+        type=float,
+        default=0.0,
+        help="Constant fake LLM latency in seconds",
+    )
+    parser.add_argument(
+        "-j", "--jobs", type=int, default=1, help="Processes for CPU-bound checkers"
+    )
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=1,
+        help="Runs per checker, the run of the median relative speed is kept",
+    )
+    parser.add_argument(
+        "--baseline", type=Path, default=None, help="Baseline JSON to compare with"
+    )
+    parser.add_argument(
+        "--update-baseline",
+        action="store_true",
+        help="Store the results in the baseline file instead of comparing",
+    )
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    log_file = "qualiluma_bench.log"
+    init_logging(log_file, console_log_level="WARNING")
+
+    results = []
+    with TemporaryDirectory() as tmp_dir:
+        root = make_synthetic_tree(Path(tmp_dir), args.files)
+        for checker_name in args.checkers.split(","):
+            runs = sorted(
+                (
+                    run_benchmark(root, checker_name, args.jobs, args.latency, log_file)
+                    for _ in range(args.repeat)
+                ),
+                key=lambda res: res.relative_speed,
+            )
+            res = runs[len(runs) // 2]
+            print(json.dumps(res.model_dump()))
+            results.append(res)
+
+    if args.baseline is None:
+        return 0
+
+    baseline = json.loads(args.baseline.read_text()) if args.baseline.exists() else {}
+    if args.update_baseline:
+        baseline[str(args.files)] = {
+            res.checker: {
+                "files_per_sec": round(res.files_per_sec),
+                "relative_speed": round(res.relative_speed, 3),
+            }
+            for res in results
+        }
+        args.baseline.write_text(json.dumps(baseline, indent=2) + "\n")
+        return 0
+
+    regressions = find_regressions(results, baseline, args.files)
+    for regression in regressions:
+        print(f"Regression: {regression}")
+    return int(len(regressions) > 0)
+
+
+if __name__ == "__main__":
+    sys.exit(main())  # pragma: no cover
@@ -4,6 +4,7 @@ Qualiluma checks module.
 
 from .base import (
     CheckerABC,
+    CostTier,
     FileCheckResult,
     FileIssue,
     FunctionAdapter,
@@ -13,6 +14,8 @@ from .base import (
 from .pep_checker import PepChecker
 from .endsline import check_trailing_newline
 from .llm_simple_checker import LLMSimpleChecker
+from .rules import RulesChecker
+from .syntax import SyntaxChecker
 from .variable_consistency import VariablesConsistencyChecker
 
 __all__ = [
@@ -20,7 +23,10 @@ __all__ = [
     "LLMSimpleChecker",
     "VariablesConsistencyChecker",
     "PepChecker",
+    "SyntaxChecker",
+    "RulesChecker",
     "CheckerABC",
+    "CostTier",
     "FileCheckResult",
     "FileIssue",
     "Severity",
@@ -1,17 +1,33 @@
 # checks/base.py
+import hashlib
+import json
 import os
+import time
 from abc import ABC, abstractmethod
 from enum import IntEnum
 from pathlib import Path
-from typing import Any, Callable
+from typing import TYPE_CHECKING, Any, Callable, Iterable, Iterator, Mapping
 
 import tqdm
 from pydantic import BaseModel
 
-from ..util import Config, get_logger
+from ..util import Config, deadline, file_digest, get_logger
+from ..util.batch import BATCH_PENDING, BatchPendingError
+from ..util.cache import ResultCache
+from ..util.circuit import LLM_UNAVAILABLE, LLMUnavailableError, fail_fast_enabled
+from ..util.metrics import METRICS, FileMetrics
+from ..util.prefetch import Prefetcher
+from ..util.sources import find_source, is_file
+from ..util.tracing import span, traced_iter
+
+if TYPE_CHECKING:
+    from .fused import PromptFuser
+    from .gates import Gate
 
 logger = get_logger(__name__)
 
+BUDGET_EXCEEDED = "budget exceeded"
+
 
 class Severity(IntEnum):
     """Severity levels for issues."""
@@ -21,6 +37,13 @@ class Severity(IntEnum):
     ERROR = 3
 
 
+class CostTier(IntEnum):
+    """Cost of running a checker, cheaper tiers run first."""
+
+    LOCAL = 0  # local computation only
+    LLM = 1  # paid LLM requests
+
+
 class FileIssue(BaseModel):
     """Represents an issue found in a file."""
 
@@ -84,9 +107,27 @@ class FileCheckResultBuilder:
 
 
 class CheckerABC(ABC):
+    cost_tier: CostTier = CostTier.LOCAL
+    # local checks limited by CPU may run in worker processes, see pool.py
+    cpu_bound: bool = False
+
     def __init__(self, config: Config):
         self.config = config
-        self.statistics: list[Any] = []  # any info saved during dir check
+        # any info saved during dir check, e.g. FileMetrics for every file
+        self.statistics: list[Any] = []
+        # set to reuse results of files with unchanged content
+        self.result_cache: ResultCache | None = None
+        # file extensions to check (of its languages, e.g. {".py"}), all if None
+        self.extensions: frozenset[str] | None = None
+        # conditions to skip a file, see gates.py
+        self.gates: list["Gate"] = []
+        # LLM cost in dollars per `check_files` run, files above it are not checked
+        self.budget: float | None = None
+        # walk into symlinked directories, see `iter_files`
+        self.follow_symlinks = False
+        # path -> the path of the same directory or file found first by the
+        # last `iter_files`, with `follow_symlinks`
+        self.aliases: dict[Path, Path] = {}
 
     @abstractmethod
     def _check_file_impl(self, file_path: Path) -> FileCheckResult:
@@ -97,16 +138,74 @@ class CheckerABC(ABC):
         """Get the name of the checker."""
         return self.__class__.__name__
 
-    def check_file(self, file_path: Path) -> FileCheckResult:
+    def get_cost_tier(self) -> CostTier:
+        """Get the cost tier of the checker."""
+        return self.cost_tier
+
+    def _tier_name(self) -> str:
+        return self.get_cost_tier().name.lower()
+
+    def skip_reason(
+        self, file_path: Path, prior_results: Mapping[str, FileCheckResult]
+    ) -> str | None:
+        """Decide if a file can be skipped, before spending anything on it.
+
+        Args:
+            file_path (Path): The path to the file to check.
+            prior_results (Mapping[str, FileCheckResult]):
+                Results of the file by the checkers that already ran.
+
+        Returns:
+            str | None: The reason to skip the file, or None to check it.
+        """
+        if self.extensions is not None and file_path.suffix not in self.extensions:
+            return f"Unsupported file type {file_path.suffix or '(no extension)'}"
+        for gate in self.gates:
+            reason = gate(file_path, prior_results)
+            if reason is not None:
+                return reason
+        return None
+
+    def check_file(
+        self,
+        file_path: Path,
+        prior_results: Mapping[str, FileCheckResult] | None = None,
+    ) -> FileCheckResult:
         """Check a single file for issues.
         Args:
             file_path (Path): The path to the file to check.
+            prior_results (Mapping[str, FileCheckResult] | None):
+                Results of the file by the checkers that already ran, for gates.
 
         Returns:
             FileCheckResult: The result of the file check.
         """
-        res = self._check_file_impl(file_path)
+        builder = FileCheckResultBuilder(self.get_name())
+        reason = self.skip_reason(file_path, prior_results or {})
+        if reason is not None:
+            logger.debug("{}: skipping {}: {}", self.get_name(), file_path, reason)
+            self._file_done(file_path)
+            return builder.skipped(reason)
+        if deadline.expired():
+            self._file_done(file_path)
+            return builder.ambiguous(deadline.DEADLINE_EXCEEDED)
+
+        with (
+            METRICS.track(self.get_name(), file_path, tier=self._tier_name()),
+            span("check", checker=self.get_name(), file=file_path),
+        ):
+            try:
+                res = self._check_file_cached(file_path)
+            except deadline.DeadlineExceededError:
+                res = builder.ambiguous(deadline.DEADLINE_EXCEEDED)
+            except BatchPendingError:
+                res = builder.ambiguous(BATCH_PENDING)
+            except LLMUnavailableError:
+                if fail_fast_enabled():
+                    raise
+                res = builder.ambiguous(LLM_UNAVAILABLE)
         self._clear_statistics()
+        self._file_done(file_path)
         return res
 
     def check_directory(self, directory_path: Path) -> dict[Path, FileCheckResult]:
@@ -118,68 +217,317 @@ class CheckerABC(ABC):
             dict[Path, FileCheckResult]:
                 A dictionary mapping file paths to their check results.
         """
-        results: dict[Path, FileCheckResult] = {}
+        results = self.check_files(self.iter_files(directory_path))
+        self.add_aliases(results)
+        return results
 
-        # todo: follow_symlink = True with saving to avoid recursion
-        with tqdm.tqdm() as pbar:
-            for dirpath, dirnames, filenames in os.walk(
-                directory_path, topdown=True, onerror=None, followlinks=False
-            ):
+    def iter_files(self, directory_path: Path) -> Iterator[Path]:
+        """Find files to check in a directory recursively, applying filters.
+
+        With `follow_symlinks`, symlinked directories are walked too. Every
+        directory and file is identified by (st_dev, st_ino) and visited
+        once, which stops symlink cycles, and other paths to it are kept
+        in `aliases` instead of being walked or yielded again.
+
+        Args:
+            directory_path (Path): The path to the directory to search.
+
+        Yields:
+            Path: The paths of files to check.
+        """
+        source = find_source(directory_path)
+        if source is not None:  # e.g. a git revision, listed without a walk
+            for file_path in source.iter_files(directory_path):
+                if self.accepts_file(file_path, directory_path):
+                    yield file_path
+            return
+
+        follow = self.follow_symlinks
+        self.aliases = {}
+        visited: dict[tuple[int, int], Path] = {}  # (st_dev, st_ino) -> first path
+        if follow:
+            self._first_visit(directory_path, visited)
+        walk = os.walk(directory_path, topdown=True, onerror=None, followlinks=follow)
+        for dirpath, dirnames, filenames in traced_iter(
+            walk, "walk", checker=self.get_name()
+        ):
+            dirnames[:] = [d for d in dirnames if self._filter_dir(Path(dirpath) / d)]
+            if follow:
                 dirnames[:] = [
-                    d for d in dirnames if self._filter_dir(Path(dirpath) / d)
+                    d for d in dirnames if self._first_visit(Path(dirpath) / d, visited)
                 ]
-                for file_name in filenames:
-                    file_path = Path(dirpath) / file_name
-                    if file_path.is_file() and self._filter_file(file_path):
-                        pbar.set_description_str(
-                            f"{self.get_name()}: checking file {file_name}"
-                        )
-                        try:
-                            results[file_path] = self._check_file_impl(file_path)
-                        except Exception as e:
-                            logger.warning(f"Failed to check {file_path}: {e}")
-                            results[file_path] = FileCheckResult(
-                                was_checked=False, issues=[]
-                            )
-                        pbar.update(1)
+            for file_name in filenames:
+                file_path = Path(dirpath) / file_name
+                if file_path.is_file() and self._filter_file(file_path):
+                    if follow and not self._first_visit(file_path, visited):
+                        continue
+                    yield file_path
+
+    def _first_visit(self, path: Path, visited: dict[tuple[int, int], Path]) -> bool:
+        """Mark a directory or file visited, keeping an alias if it already was."""
+        try:
+            stat = path.stat()
+        except OSError:  # e.g. a broken symlink
+            return False
+        key = (stat.st_dev, stat.st_ino)
+        first = visited.setdefault(key, path)
+        if first != path:
+            self.aliases[path] = first
+            return False
+        return True
+
+    def add_aliases(self, results: dict[Path, FileCheckResult]) -> None:
+        """Give the aliases of the last `iter_files` the results of their files.
+
+        Args:
+            results (dict[Path, FileCheckResult]): Results by file path,
+                updated in place with the same result objects.
+        """
+        dir_aliases: dict[Path, list[Path]] = {}  # directory -> its aliases
+        for alias, path in self.aliases.items():
+            if path in results:
+                results[alias] = results[path]
+            elif path not in alias.parents:  # not a symlink cycle
+                dir_aliases.setdefault(path, []).append(alias)
+
+        pending = list(results.items()) if dir_aliases else []
+        while pending:  # files in aliased directories, also nested ones
+            file_path, res = pending.pop()
+            for directory in file_path.parents:
+                for alias in dir_aliases.get(directory, []):
+                    alias_path = alias / file_path.relative_to(directory)
+                    if alias_path not in results:
+                        results[alias_path] = res
+                        pending.append((alias_path, res))
+
+    def accepts_file(self, file_path: Path, directory_path: Path) -> bool:
+        """Check if `iter_files(directory_path)` would yield the file.
+
+        Args:
+            file_path (Path): The path of the file, inside the directory.
+            directory_path (Path): The directory being checked.
+
+        Returns:
+            bool: True if the file passes the file and directory filters.
+        """
+        if not is_file(file_path) or not self._filter_file(file_path):
+            return False
+        parent = file_path.parent
+        while parent != directory_path and directory_path in parent.parents:
+            if not self._filter_dir(parent):
+                return False
+            parent = parent.parent
+        return parent == directory_path
+
+    def check_files(
+        self,
+        file_paths: Iterable[Path],
+        on_result: Callable[[Path, FileCheckResult], None] | None = None,
+        prior_results: Callable[[Path], Mapping[str, FileCheckResult]] | None = None,
+    ) -> dict[Path, FileCheckResult]:
+        """Check the given files for issues, without filtering them.
+
+        Files are still skipped by the extensions and gates of the checker.
+        For LLM checkers, upcoming files are read ahead in the background.
+        Files not checked by the run deadline, while the LLM is unavailable,
+        or once the LLM cost reached the budget of the checker, are reported
+        as ambiguous.
+
+        Args:
+            file_paths (Iterable[Path]): The files to check (may be a lazy iterator).
+            on_result (Callable | None): Called with every file result when ready.
+            prior_results (Callable | None): Get results of a file by the checkers
+                that already ran, for gates.
 
+        Returns:
+            dict[Path, FileCheckResult]:
+                A dictionary mapping file paths to their check results.
+        """
+        self._clear_statistics()  # only this run, e.g. for warm server checkers
+        results: dict[Path, FileCheckResult] = {}
+        builder = FileCheckResultBuilder(self.get_name())
+        n_skipped = n_late = n_over_budget = 0
+        spent = 0.0
+        if self.get_cost_tier() >= CostTier.LLM:
+            file_paths = Prefetcher().iterate(file_paths)
+
+        with tqdm.tqdm() as pbar:
+            for file_path in file_paths:
+                queued_at = time.perf_counter()
+                pbar.set_description_str(
+                    f"{self.get_name()}: checking file {file_path.name}"
+                )
+                prior = prior_results(file_path) if prior_results is not None else {}
+                reason = self.skip_reason(file_path, prior)
+                if reason is not None:
+                    logger.debug(
+                        "{}: skipping {}: {}", self.get_name(), file_path, reason
+                    )
+                    results[file_path] = builder.skipped(reason)
+                    n_skipped += 1
+                elif deadline.expired():
+                    results[file_path] = builder.ambiguous(deadline.DEADLINE_EXCEEDED)
+                    n_late += 1
+                elif self.budget is not None and spent >= self.budget:
+                    results[file_path] = builder.ambiguous(BUDGET_EXCEEDED)
+                    n_over_budget += 1
+                else:
+                    results[file_path] = self._check_file_tracked(file_path, queued_at)
+                    spent += self.statistics[-1].cost
+                self._file_done(file_path)
+                if on_result is not None:
+                    on_result(file_path, results[file_path])
+                pbar.update(1)
+
+        if n_skipped:
+            logger.info(f"{self.get_name()}: skipped {n_skipped} files by gates")
+        if n_late:
+            logger.warning(
+                f"{self.get_name()}: {n_late} files not checked, run deadline exceeded"
+            )
+        if n_over_budget:
+            logger.warning(
+                f"{self.get_name()}: {n_over_budget} files not checked,"
+                f" budget of ${self.budget:.2f} spent"
+            )
         return results
 
+    def _check_file_tracked(
+        self, file_path: Path, queued_at: float | None = None
+    ) -> FileCheckResult:
+        """Check a file during a directory check, collecting its metrics.
+
+        Failures are logged and reported as not checked files.
+
+        Raises:
+            LLMUnavailableError: If the LLM is unavailable in fail-fast mode.
+        """
+        record: FileMetrics
+        with (
+            METRICS.track(
+                self.get_name(), file_path, queued_at, tier=self._tier_name()
+            ) as record,
+            span("check", checker=self.get_name(), file=file_path),
+        ):
+            try:
+                res = self._check_file_cached(file_path)
+            except deadline.DeadlineExceededError:
+                res = FileCheckResultBuilder(self.get_name()).ambiguous(
+                    deadline.DEADLINE_EXCEEDED
+                )
+            except BatchPendingError:
+                res = FileCheckResultBuilder(self.get_name()).ambiguous(BATCH_PENDING)
+            except LLMUnavailableError:
+                if fail_fast_enabled():
+                    raise
+                res = FileCheckResultBuilder(self.get_name()).ambiguous(LLM_UNAVAILABLE)
+            except Exception as e:
+                logger.warning(f"Failed to check {file_path}: {e}")
+                res = FileCheckResult(was_checked=False, issues=[])
+        self.statistics.append(record)
+        return res
+
+    def get_cache_namespace(self) -> str:
+        """Identify the checker and its settings in result cache keys."""
+        return self.get_name()
+
+    def _check_file_cached(self, file_path: Path) -> FileCheckResult:
+        """Check a file, reusing the cached result if its content is unchanged."""
+        if self.result_cache is None:
+            return self._check_file_impl(file_path)
+
+        namespace = self.get_cache_namespace()
+        digest = file_digest(file_path)
+        cached = self.result_cache.get(namespace, digest)
+        if cached is not None:
+            return cached.model_copy(deep=True)
+
+        res = self._check_file_impl(file_path)
+        if res.was_checked:  # failures and skips may change on the next run
+            self.result_cache.put(namespace, digest, res)
+        return res
+
+    def _file_done(self, file_path: Path) -> None:
+        """Called after every file of `check_file` and `check_files`, checked or not."""
+
     def _clear_statistics(self) -> None:
         """Clear collected statistics."""
         self.statistics = []
 
     def _filter_file(self, file_path: Path) -> bool:
         """Process the file during checks."""
-        labels = self.config.get_labels(file_path.suffix)
-        return ("code" in labels) or ("docs" in labels)
+        return self.config.is_checked_extension(file_path.suffix)
 
     def _filter_dir(self, dir_path: Path) -> bool:
         """Process the directory during checks."""
-        return dir_path.name not in self.config.get_ignored_directories()
+        return not self.config.is_ignored_directory(dir_path.name)
 
 
 class SimpleCheckerABC(ABC):
+    cost_tier: CostTier = CostTier.LOCAL
+
     @abstractmethod
     def _check_file(self, file_path: Path, checker_config: dict) -> FileCheckResult:
         """Check a single file for issues."""
         pass
 
+    def fused_task(
+        self, file_path: Path, checker_config: dict
+    ) -> str | FileCheckResult | None:
+        """Get the task of this check in a prompt shared with other checks.
+
+        See fused.py, the response section of the task is the result.
+
+        Returns:
+            str | FileCheckResult | None: The task, a result if the file needs
+                no LLM request (e.g. it is too long), None if not fusable.
+        """
+        return None
+
 
 class SimpleCheckerAdapter(CheckerABC):
     """Adapter to make a complex checker from a simple one."""
 
     def __init__(self, config: Config, checker: SimpleCheckerABC):
+        # gates use the result models of this module
+        from .gates import GATES
+
         super().__init__(config)
         self.checker = checker
         self.checker_config = self.config.get_checker_extra(self.get_name())
+        self.cost_tier = CostTier[
+            self.checker_config.get("tier", checker.cost_tier.name).upper()
+        ]
+        self.extensions = self.config.get_checker_extensions(self.get_name())
+        self.gates = [GATES[name] for name in self.checker_config.get("gates", [])]
+        self.budget = self.checker_config.get("budget")
+        # set by `fuse_checkers` to share LLM requests with other checkers
+        self.fuser: "PromptFuser | None" = None
 
     def _check_file_impl(self, file_path: Path) -> FileCheckResult:
+        if self.fuser is not None:
+            return self.fuser.check(self, file_path)
         return self.checker._check_file(file_path, self.checker_config)
 
+    def _file_done(self, file_path: Path) -> None:
+        # fused sections of skipped or cached files are not needed anymore
+        if self.fuser is not None:
+            self.fuser.discard(self, file_path)
+
     def get_name(self) -> str:
         return self.checker.__class__.__name__
 
+    def get_cache_namespace(self) -> str:
+        llm_client = getattr(self.checker, "llm_client", None)
+        settings = {
+            "config": self.checker_config,
+            "model": getattr(llm_client, "model_name", None),
+        }
+        if self.fuser is not None:  # answers of fused prompts may differ
+            settings["fused"] = True
+        settings_json = json.dumps(settings, sort_keys=True, default=str)
+        return f"{self.get_name()}:{hashlib.sha256(settings_json.encode()).hexdigest()}"
+
 
 class FunctionAdapter(CheckerABC):
     """Deprecated interface to support function checks"""
@@ -1,5 +1,7 @@
 """
 End-of-line checking functionality for Qualiluma.
+
+Deprecated: the "trailing newline" local rule (see rules.py) replaces it.
 """
 
 from pathlib import Path
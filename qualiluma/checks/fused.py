@@ -0,0 +1,181 @@
+"""
+Fused LLM checks: one LLM request per file for several LLM checkers.
+
+Every LLM checker sends the numbered file in its own prompt, so the input
+tokens of a file are paid once per checker. With `fuse_checkers()`, the
+first fused checker reaching a file sends one prompt with the tasks of all
+fused checkers accepting the file, and a response schema with a section
+per checker. The other sections are kept until their checkers reach the
+file, so results (and gates, caching, output) stay per checker. At most
+MAX_SECTIONS are kept, the oldest ones are dropped and their checkers
+send their own requests.
+
+A checker takes part with a `fused_task` in its `checkers_extra` entry, see
+`SimpleCheckerABC.fused_task`. Gates depending on results of other checkers
+(e.g. no_errors) are evaluated when the checker reaches the file, so their
+sections may be paid for and dropped.
+"""
+
+import re
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+from pydantic import BaseModel, Field, create_model
+
+from ..util import file_digest, get_logger, load_numbered, log_payload
+from ..util.llm import LLMClient
+from ..util.metrics import stage
+from .base import CheckerABC, CostTier, FileCheckResult, SimpleCheckerAdapter
+
+logger = get_logger(__name__)
+
+MAX_SECTIONS = 10_000  # results of other checkers kept for their files
+
+DEFAULT_FUSED_TEMPLATE = """\
+You are given a code, every line contains its number.
+Please make the following checks of the code independently, answering every
+check in its own section of the response:
+{tasks}
+The code is here: ```{code}```
+"""
+
+
+class PromptFuser:
+    """Shares one LLM request per file among several LLM checkers."""
+
+    def __init__(self, members: list[SimpleCheckerAdapter], template: str):
+        """Init fuser.
+
+        Args:
+            members: The checkers to fuse, in the order they run.
+            template: The prompt, with {tasks} and {code} placeholders.
+        """
+        self.members = members
+        self.template = template
+        self._lock = threading.Lock()
+        # (checker name, file) -> (file digest, result) of fused responses
+        self._sections: OrderedDict[tuple[str, Path], tuple[str, FileCheckResult]] = (
+            OrderedDict()
+        )
+        self._schemas: dict[tuple[str, ...], type[BaseModel]] = {}
+
+    def check(self, member: SimpleCheckerAdapter, file_path: Path) -> FileCheckResult:
+        """Check a file for a member, with a fused request if none answered it yet.
+
+        Args:
+            member: The fused checker the file is checked for.
+            file_path: The file to check.
+
+        Returns:
+            FileCheckResult: The result of the member.
+        """
+        digest = file_digest(file_path)
+        with self._lock:
+            section = self._sections.pop((member.get_name(), file_path), None)
+        if section is not None and section[0] == digest:
+            return section[1]
+
+        own_task = member.checker.fused_task(file_path, member.checker_config)
+        if isinstance(own_task, FileCheckResult):  # decided without the LLM
+            return own_task
+        if own_task is None:
+            return member.checker._check_file(file_path, member.checker_config)
+
+        tasks = {member.get_name(): own_task}
+        llm_client = getattr(member.checker, "llm_client", None)
+        for other in self.members[self.members.index(member) + 1 :]:
+            if getattr(other.checker, "llm_client", None) is not llm_client:
+                continue
+            if other.skip_reason(file_path, {}) is not None:
+                continue
+            task = other.checker.fused_task(file_path, other.checker_config)
+            if isinstance(task, str):
+                tasks[other.get_name()] = task
+        if len(tasks) == 1:
+            return member.checker._check_file(file_path, member.checker_config)
+
+        sections = self._request(file_path, tasks, llm_client)
+        with self._lock:
+            for name, result in sections.items():
+                if name != member.get_name():
+                    self._sections[(name, file_path)] = (digest, result)
+            while len(self._sections) > MAX_SECTIONS:
+                self._sections.popitem(last=False)
+        return sections[member.get_name()]
+
+    def discard(self, member: SimpleCheckerAdapter, file_path: Path) -> None:
+        """Drop the section of a file for a member, e.g. skipped by its gates."""
+        with self._lock:
+            self._sections.pop((member.get_name(), file_path), None)
+
+    def _request(
+        self, file_path: Path, tasks: dict[str, str], llm_client: LLMClient
+    ) -> dict[str, FileCheckResult]:
+        """Send one prompt with the tasks of several checkers.
+
+        Returns:
+            dict[str, FileCheckResult]: The result of every checker by name.
+        """
+        code = load_numbered(file_path)
+        fields = {name: _field_name(name) for name in tasks}
+        with stage("prompt_build"):
+            task_list = "\n".join(
+                f"- {fields[name]}: {task.strip()}" for name, task in tasks.items()
+            )
+            prompt = self.template.format(tasks=task_list, code=code)
+        log_payload(__name__, "prompt", prompt)
+
+        answer = llm_client.structured_output(prompt, self._schema(tuple(tasks)))
+        logger.debug("Fused check of {} for {} checkers", file_path, len(tasks))
+        return {name: getattr(answer, fields[name]) for name in tasks}
+
+    def _schema(self, names: tuple[str, ...]) -> type[BaseModel]:
+        """Get the response schema with a section per checker."""
+        with self._lock:
+            if names not in self._schemas:
+                sections = {
+                    _field_name(name): (
+                        FileCheckResult,
+                        Field(description=f"The result of the {name} check"),
+                    )
+                    for name in names
+                }
+                self._schemas[names] = create_model("FusedCheckResult", **sections)
+            return self._schemas[names]
+
+
+def _field_name(checker_name: str) -> str:
+    """Get the schema field of a checker, e.g. "PepChecker" -> "pep_checker"."""
+    name = re.sub(r"(?<=[a-z0-9])(?=[A-Z])", "_", checker_name)
+    return re.sub(r"\W+", "_", name).strip("_").lower()
+
+
+def fuse_checkers(
+    checkers: list[CheckerABC], template: str | None = None
+) -> PromptFuser | None:
+    """Let the LLM checkers with a `fused_task` share one request per file.
+
+    Args:
+        checkers: The checkers of the run, others are left unchanged.
+        template: The fused prompt, DEFAULT_FUSED_TEMPLATE if None.
+
+    Returns:
+        PromptFuser | None: The fuser, None if less than two checkers fuse.
+    """
+    members = [
+        checker
+        for checker in checkers
+        if isinstance(checker, SimpleCheckerAdapter)
+        and checker.get_cost_tier() >= CostTier.LLM
+        and checker.checker_config.get("fused_task")
+    ]
+    members.sort(key=lambda checker: checker.get_cost_tier())  # the run order
+    if len(members) < 2:
+        logger.info("Fused mode needs at least two LLM checkers with a fused_task")
+        return None
+    fuser = PromptFuser(members, template or DEFAULT_FUSED_TEMPLATE)
+    for member in members:
+        member.fuser = fuser
+    logger.info(f"Fusing LLM checks of {[member.get_name() for member in members]}")
+    return fuser
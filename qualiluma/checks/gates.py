@@ -0,0 +1,114 @@
+"""
+Gating conditions, to skip expensive checks of files that don't need them.
+
+Gates are enabled per checker with the `gates` list in `checkers_extra` and
+get the results of the checkers that already ran on the file (cheap local
+checkers run first). A gate returns the reason to skip the file, or None.
+"""
+
+import ast
+import functools
+import re
+from pathlib import Path
+from typing import Callable, Mapping
+
+from ..util.io import load_file
+from ..util.sources import stat_key
+from .base import FileCheckResult, Severity
+
+# established header markers in comment lines, e.g. "// Code generated by
+# protoc. DO NOT EDIT." (Go) or "# @generated" (Phabricator and others);
+# prose like "the report generated by ..." doesn't match
+GENERATED_MARKERS = re.compile(
+    r"^[ \t]*(?:#|//|/?\*|--|;|<!--).*(?:@generated\b|\bDO NOT EDIT\b)",
+    re.MULTILINE,
+)
+GENERATED_HEADER_CHARS = 1024  # markers are searched in the file head only
+SYNTAX_CHECKER = "python syntax"  # its results tell if a file parses
+
+Gate = Callable[[Path, Mapping[str, FileCheckResult]], str | None]
+
+
+def python_syntax_error(file_path: Path) -> SyntaxError | None:
+    """Parse a Python file, reusing the result while the file is unchanged.
+
+    Args:
+        file_path: The Python file to parse.
+
+    Returns:
+        The syntax error, or None if the file parses.
+    """
+    return _python_syntax_error(file_path, *stat_key(file_path))
+
+
+@functools.lru_cache(maxsize=1024)
+def _python_syntax_error(
+    file_path: Path, _mtime_ns: int, _size: int
+) -> SyntaxError | None:
+    try:
+        ast.parse(load_file(file_path).text, filename=str(file_path))
+    except (SyntaxError, ValueError) as e:  # ValueError: binary content
+        if isinstance(e, SyntaxError):
+            return e
+        return SyntaxError(str(e))
+    return None
+
+
+def gate_parses(
+    file_path: Path, prior_results: Mapping[str, FileCheckResult]
+) -> str | None:
+    """Skip Python files with syntax errors, found by the syntax checker if it ran.
+
+    The checker may run in a worker process, its result spares another parse.
+    """
+    if file_path.suffix != ".py":
+        return None
+    checked = prior_results.get(SYNTAX_CHECKER)
+    if checked is not None and checked.was_checked:
+        if checked.issues:
+            return f"Python syntax error at line {checked.issues[0].line}"
+        return None
+    error = python_syntax_error(file_path)
+    if error is not None:
+        return f"Python syntax error at line {error.lineno}"
+    return None
+
+
+def gate_no_errors(
+    file_path: Path, prior_results: Mapping[str, FileCheckResult]
+) -> str | None:
+    """Skip files already having an ERROR from an earlier checker."""
+    for checker_name, res in prior_results.items():
+        if res.was_checked and any(i.severity >= Severity.ERROR for i in res.issues):
+            return f"Already has errors from '{checker_name}'"
+    return None
+
+
+def gate_not_generated(
+    file_path: Path, prior_results: Mapping[str, FileCheckResult]
+) -> str | None:
+    """Skip generated files, recognized by header comments like 'DO NOT EDIT'."""
+    source = load_file(file_path)
+    if source.is_binary:
+        return None
+    if GENERATED_MARKERS.search(source.text, 0, GENERATED_HEADER_CHARS):
+        return "Generated file"
+    return None
+
+
+def gate_not_binary(
+    file_path: Path, prior_results: Mapping[str, FileCheckResult]
+) -> str | None:
+    """Skip files with binary content, the content is kept for the check."""
+    source = load_file(file_path)
+    if source.is_binary:
+        return "Binary file"
+    return None
+
+
+GATES: dict[str, Gate] = {
+    "parses": gate_parses,
+    "no_errors": gate_no_errors,
+    "not_generated": gate_not_generated,
+    "not_binary": gate_not_binary,
+}
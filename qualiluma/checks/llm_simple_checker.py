@@ -1,14 +1,16 @@
 from pathlib import Path
 
-from ..util import get_llm_client, get_logger, load_numbered
-from ..util.config import CONFIG_PATH, _yaml_read
+from ..util import get_llm_client, get_logger, load_numbered, log_payload
+from ..util.config import read_config_file
+from ..util.metrics import stage
 from .base import (
+    CostTier,
     FileCheckResult,
     FileCheckResultBuilder,
     SimpleCheckerABC,
 )
 
-CONFIG = _yaml_read(CONFIG_PATH)
+CONFIG = read_config_file()
 
 logger = get_logger(__name__)
 
@@ -19,38 +21,53 @@ class LLMSimpleChecker(SimpleCheckerABC):
     Gets a prompt from config, and processes file-wise.
     """
 
+    cost_tier = CostTier.LLM
+
     def __init__(self, thorough: bool = False):
         self.llm_client = get_llm_client("fast" if not thorough else "thorough")
 
     def _check_file(self, file_path: Path, checker_config: dict) -> FileCheckResult:
+        file_res = self._precheck(file_path, checker_config)
+        if file_res is not None:
+            return file_res
+
+        code = load_numbered(file_path)
+        # Use the prompt from checker_config if present, otherwise fall back to
+        # global template from config (keeps compatibility with previous behavior).
+        prompt_template = checker_config.get("prompt") or CONFIG.get("llm_template")
+        assert isinstance(prompt_template, str), "Prompt template must be a string."
+        with stage("prompt_build"):
+            prompt = prompt_template.format(code=code)
+
+        log_payload(__name__, "prompt", prompt)
+        return self.llm_client.structured_output(prompt, FileCheckResult)
+
+    def fused_task(
+        self, file_path: Path, checker_config: dict
+    ) -> str | FileCheckResult | None:
+        return self._precheck(file_path, checker_config) or checker_config.get(
+            "fused_task"
+        )
+
+    def _precheck(
+        self, file_path: Path, checker_config: dict
+    ) -> FileCheckResult | None:
+        """Get the result of a file not to send to the LLM, None to send it."""
         # If there's no initialized LLM client, indicate the file wasn't checked
         file_res = FileCheckResultBuilder(checker_name="LLMSimpleChecker")
 
         if self.llm_client is None:
             return file_res.ambiguous("LLM client not initialized")
 
-        # Skip unsupported extensions early
-        # TODO: do on the wrapper level
-        if file_path.suffix not in checker_config["available_extensions"]:
-            logger.debug(f"Skipping unsupported file type: {file_path.suffix}")
-            return file_res.ambiguous(f"Unsupported file type {file_path.suffix}")
-
-        code = load_numbered(file_path)
+        # unsupported extensions (`available_extensions`) are skipped by the
+        # adapter, see `Config.get_checker_extensions`
 
         # Enforce length limit to avoid sending huge files to the LLM
-        if len(code) > checker_config["length_limit"]:
+        if len(load_numbered(file_path)) > checker_config["length_limit"]:
             logger.warning(
                 "Code length exceeds the limit for LLM processing, ignoring."
             )
             return file_res.ambiguous(
                 "Code length exceeds the limit for LLM processing"
             )
-
-        # Use the prompt from checker_config if present, otherwise fall back to
-        # global template from config (keeps compatibility with previous behavior).
-        prompt_template = checker_config.get("prompt") or CONFIG.get("llm_template")
-        assert isinstance(prompt_template, str), "Prompt template must be a string."
-        prompt = prompt_template.format(code=code)
-
-        logger.debug(f"Sending prompt {prompt}")
-        return self.llm_client.structured_output(prompt, FileCheckResult)
+        return None
@@ -1,17 +1,21 @@
-import os
 from pathlib import Path
 
-from ..util import load_numbered
+from ..util import load_numbered, log_payload
 from ..util.llm import get_llm_client
-from .base import FileCheckResult, FileCheckResultBuilder, SimpleCheckerABC
-
-# TODO find better debug method. Maybe file logging.
-DEBUG = os.getenv("DEBUG", "False").lower() == "true"
+from ..util.metrics import stage
+from .base import (
+    CostTier,
+    FileCheckResult,
+    FileCheckResultBuilder,
+    SimpleCheckerABC,
+)
 
 
 class PepChecker(SimpleCheckerABC):
     """Checker for PEP 8 compliance."""
 
+    cost_tier = CostTier.LLM
+
     def __init__(self, thorough: bool = False):
         self.llm_client = get_llm_client("fast" if not thorough else "thorough")
 
@@ -23,7 +27,18 @@ class PepChecker(SimpleCheckerABC):
             return file_res.ambiguous("LLM client not initialized")
 
         code_numbered: str = load_numbered(file_path)
-        prompt_check: str = checker_config["prompt_check_case"].format(
-            code=code_numbered,
-        )
+        with stage("prompt_build"):
+            prompt_check: str = checker_config["prompt_check_case"].format(
+                code=code_numbered,
+            )
+        log_payload(__name__, "prompt", prompt_check)
         return self.llm_client.structured_output(prompt_check, FileCheckResult)
+
+    def fused_task(
+        self, file_path: Path, checker_config: dict
+    ) -> str | FileCheckResult | None:
+        if self.llm_client is None:
+            return FileCheckResultBuilder(checker_name="PepChecker").ambiguous(
+                "LLM client not initialized"
+            )
+        return checker_config.get("fused_task")
@@ -0,0 +1,290 @@
+"""
+Process pool execution of CPU-bound checkers.
+
+Checkers marked with `cpu_bound = True` can run in worker processes, so
+that local analysis of large trees is not limited to one core by the GIL.
+Workers get the config and the checkers once, at start, then check batches
+of files and send back compact tuples instead of pydantic models, with the
+stage durations of every checked file and the trace spans (if tracing), which
+are added to `METRICS` and `TRACER` of the main process. The result cache
+of a checker stays in the main process: files with a cached result are not
+sent to workers, and new results are cached when collected.
+"""
+
+import copy
+import multiprocessing
+import os
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Iterable
+
+from ..util import Config, deadline, file_digest, get_logger
+from ..util.metrics import METRICS, FileMetrics
+from ..util.tracing import TRACER, span
+from .base import CheckerABC, FileCheckResult, FileCheckResultBuilder, FileIssue
+
+logger = get_logger(__name__)
+
+BATCH_SIZE = 64  # files per task, to amortize pickling and IPC
+
+# (check_name, line, message, severity)
+_CompactIssue = tuple[str, int | None, str, int]
+# (file path, was_checked, issues, stage durations if checked)
+_CompactResult = tuple[str, bool, list[_CompactIssue], dict[str, float] | None]
+# (results, trace events)
+_CompactBatch = tuple[list[_CompactResult], list[dict[str, Any]]]
+
+_worker_checkers: list[CheckerABC] = []  # set in every worker process
+
+
+def _init_worker(config: Config, checkers: list[CheckerABC], trace: bool) -> None:
+    _worker_checkers[:] = checkers
+    for checker in _worker_checkers:
+        checker.config = config
+    if trace:
+        TRACER.start()
+
+
+def _check_batch(
+    checker_index: int,
+    paths: list[str],
+    deadline_at: float | None,
+    submitted_at: float,
+) -> _CompactBatch:
+    checker = _worker_checkers[checker_index]
+    name = checker.get_name()
+    builder = FileCheckResultBuilder(name)
+    compact = []
+    for path in paths:
+        file_path = Path(path)
+        durations = None
+        reason = checker.skip_reason(file_path, {})
+        if reason is not None:
+            res = builder.skipped(reason)
+        elif deadline_at is not None and time.monotonic() >= deadline_at:
+            res = builder.ambiguous(deadline.DEADLINE_EXCEEDED)
+        else:
+            with (
+                METRICS.track(name, file_path) as record,
+                span("check", checker=name, file=file_path),
+            ):
+                # the monotonic clock is shared by the processes of the machine
+                record.add_duration("queue_wait", time.monotonic() - submitted_at)
+                try:
+                    res = checker._check_file_impl(file_path)
+                except Exception as e:
+                    logger.warning(f"Failed to check {file_path}: {e}")
+                    res = FileCheckResult(was_checked=False, issues=[])
+            durations = record.durations
+        issues = [
+            (issue.check_name, issue.line, issue.message, int(issue.severity))
+            for issue in res.issues
+        ]
+        compact.append((path, res.was_checked, issues, durations))
+    METRICS.clear()  # sent back with the results
+    return compact, TRACER.take_events()
+
+
+def _expand(compact: _CompactResult) -> tuple[Path, FileCheckResult]:
+    path, was_checked, issues, _ = compact
+    return Path(path), FileCheckResult(
+        was_checked=was_checked,
+        issues=[
+            FileIssue(check_name=name, line=line, message=message, severity=severity)
+            for name, line, message, severity in issues
+        ],
+    )
+
+
+def default_jobs() -> int:
+    """The number of cores available to this process."""
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+class ProcessPoolRunner:
+    """Runs CPU-bound checkers over files in worker processes.
+
+    Files are submitted per checker without waiting, results are collected
+    in the calling thread: on demand with `wait_file` (e.g. for gates of
+    other checkers) or all at once with `drain`.
+    """
+
+    def __init__(self, config: Config, checkers: list[CheckerABC], jobs: int):
+        """Start the worker processes.
+
+        Args:
+            config: The configuration, sent once to every worker.
+            checkers: The CPU-bound checkers to run.
+            jobs: The number of worker processes.
+        """
+        self.checkers = checkers
+        # caches and statistics stay in this process
+        worker_checkers = []
+        for checker in checkers:
+            worker_checker = copy.copy(checker)
+            worker_checker.result_cache = None
+            worker_checker.statistics = []
+            worker_checkers.append(worker_checker)
+
+        self._executor = ProcessPoolExecutor(
+            max_workers=jobs,
+            mp_context=multiprocessing.get_context(),
+            initializer=_init_worker,
+            initargs=(config, worker_checkers, TRACER.enabled),
+        )
+        self._pending: dict[tuple[int, Path], Future] = {}
+        self._digests: dict[tuple[int, Path], str] = {}  # to cache the results
+        self._futures: list[tuple[int, Future]] = []
+        self._traced: set[Future] = set()  # futures with trace events added
+        self._order: list[list[Path]] = [[] for _ in checkers]
+        self._results: list[dict[Path, FileCheckResult]] = [{} for _ in checkers]
+        self._on_result: list[Callable[[str, Path, FileCheckResult], None] | None] = [
+            None for _ in checkers
+        ]
+
+    def submit(
+        self,
+        checker: CheckerABC,
+        file_paths: Iterable[Path],
+        on_result: Callable[[str, Path, FileCheckResult], None] | None = None,
+    ) -> None:
+        """Queue files for a checker, in batches of BATCH_SIZE.
+
+        Args:
+            checker: One of the checkers of the runner.
+            file_paths: The files to check.
+            on_result: Called with (checker name, file path, result) when collected.
+        """
+        index = self.checkers.index(checker)
+        self._on_result[index] = on_result
+        checker._clear_statistics()  # only this run, as in `check_files`
+        batch: list[Path] = []
+        for file_path in file_paths:
+            self._order[index].append(file_path)
+            if self._take_cached(index, file_path):
+                continue
+            batch.append(file_path)
+            if len(batch) >= BATCH_SIZE:
+                self._submit_batch(index, batch)
+                batch = []
+        if batch:
+            self._submit_batch(index, batch)
+
+    def _take_cached(self, index: int, file_path: Path) -> bool:
+        """Use the cached result of a file if its content is unchanged.
+
+        Returns:
+            Whether the result was cached, otherwise the file is to be checked.
+        """
+        checker = self.checkers[index]
+        if checker.result_cache is None:
+            return False
+        digest = file_digest(file_path)
+        cached = checker.result_cache.get(checker.get_cache_namespace(), digest)
+        if cached is None or checker.skip_reason(file_path, {}) is not None:
+            self._digests[(index, file_path)] = digest
+            return False
+        record = FileMetrics(
+            checker=checker.get_name(), file=str(file_path), tier=checker._tier_name()
+        )
+        self._add_result(index, file_path, cached.model_copy(deep=True), record)
+        return True
+
+    def _submit_batch(self, index: int, batch: list[Path]) -> None:
+        # the monotonic clock is shared by the processes of the machine
+        now = time.monotonic()
+        remaining = deadline.remaining()
+        deadline_at = now + remaining if remaining is not None else None
+        future = self._executor.submit(
+            _check_batch, index, [str(p) for p in batch], deadline_at, now
+        )
+        self._futures.append((index, future))
+        for file_path in batch:
+            self._pending[(index, file_path)] = future
+
+    def _collect(self, index: int, future: Future) -> None:
+        checker = self.checkers[index]
+        batch, events = future.result()
+        for compact in batch:
+            file_path, res = _expand(compact)
+            if self._pending.pop((index, file_path), None) is None:
+                continue  # already collected
+            digest = self._digests.pop((index, file_path), None)
+            if digest is not None and res.was_checked:
+                assert checker.result_cache is not None
+                checker.result_cache.put(checker.get_cache_namespace(), digest, res)
+            durations = compact[3]
+            record = None
+            if durations is not None:
+                record = FileMetrics(
+                    checker=checker.get_name(),
+                    file=str(file_path),
+                    tier=checker._tier_name(),
+                    durations=durations,
+                )
+            self._add_result(index, file_path, res, record)
+        if events and future not in self._traced:  # batches may be collected twice
+            self._traced.add(future)
+            TRACER.add_events(events)
+
+    def _add_result(
+        self,
+        index: int,
+        file_path: Path,
+        res: FileCheckResult,
+        record: FileMetrics | None,
+    ) -> None:
+        checker = self.checkers[index]
+        if record is not None:
+            METRICS.add(record)
+            checker.statistics.append(record)
+        self._results[index][file_path] = res
+        on_result = self._on_result[index]
+        if on_result is not None:
+            on_result(checker.get_name(), file_path, res)
+
+    def wait_file(self, file_path: Path) -> dict[str, FileCheckResult]:
+        """Wait for the results of a file by all checkers of the runner.
+
+        Returns:
+            The results by checker name, for the checkers that got the file.
+        """
+        for index in range(len(self.checkers)):
+            future = self._pending.get((index, file_path))
+            if future is not None:
+                self._collect(index, future)
+        return {
+            checker.get_name(): file_results[file_path]
+            for checker, file_results in zip(self.checkers, self._results)
+            if file_path in file_results
+        }
+
+    def drain(self) -> dict[str, dict[Path, FileCheckResult]]:
+        """Wait for all submitted files.
+
+        Returns:
+            The results by checker name and file path, in submission order.
+        """
+        for index, future in self._futures:
+            self._collect(index, future)
+        self._futures = []
+        self._traced = set()
+        return {
+            checker.get_name(): {path: file_results[path] for path in order}
+            for checker, file_results, order in zip(
+                self.checkers, self._results, self._order
+            )
+        }
+
+    def close(self) -> None:
+        """Stop the worker processes, cancelling queued batches."""
+        self._executor.shutdown(cancel_futures=True)
+
+    def __enter__(self) -> "ProcessPoolRunner":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
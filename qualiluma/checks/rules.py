@@ -0,0 +1,219 @@
+"""
+Local rule engine: many cheap deterministic rules evaluated in one pass.
+
+Every file is loaded once (see `util.io.load_file`, shared with gates and
+other checkers), then all enabled rules run over the same text with
+precompiled regular expressions, so scanning happens in C rather than in
+per-line Python loops. Rules are configured in the `local_rules` section
+of the config, see `BUILTIN_RULES` for the rule kinds; `regex` rules add
+new checks without code.
+"""
+
+import functools
+import hashlib
+import json
+import re
+from pathlib import Path
+from typing import Callable, Iterator
+
+from pydantic import BaseModel, ConfigDict
+
+from ..util import Config
+from ..util.io import SourceFile, load_file
+from .base import CheckerABC, CostTier, FileCheckResult, FileIssue, Severity
+
+MAX_ISSUES_PER_RULE = 20  # further matches are summarized in one issue
+
+_TRAILING_WHITESPACE = re.compile(r"[ \t]+$", re.MULTILINE)
+_TAB_INDENT = re.compile(r"^ *\t", re.MULTILINE)
+_SPACE_INDENT = re.compile(r"^ ", re.MULTILINE)
+_MIXED_INDENT = re.compile(r"^(?: +\t|\t+ )", re.MULTILINE)
+
+
+class LocalRule(BaseModel):
+    """A rule of the `local_rules` config section."""
+
+    model_config = ConfigDict(extra="forbid")
+
+    name: str  # also the check name of the issues
+    kind: str  # one of BUILTIN_RULES, or "regex"
+    severity: str = "WARNING"  # Severity name
+    enabled: bool = True
+    languages: list[str] | None = None  # file types to check, all if None
+    max_length: int = 120  # for line_length
+    pattern: str | None = None  # for regex
+    message: str | None = None  # for regex
+
+
+@functools.cache
+def _compile(pattern: str) -> re.Pattern[str]:
+    return re.compile(pattern, re.MULTILINE)
+
+
+RuleMatches = Iterator[tuple[int | None, str]]  # (line, message)
+
+
+def _matches(pattern: re.Pattern[str], source: SourceFile, message: str) -> RuleMatches:
+    for match in pattern.finditer(source.text):
+        yield source.line_at(match.start()), message
+
+
+def _rule_trailing_newline(source: SourceFile, rule: LocalRule) -> RuleMatches:
+    if source.text and not source.text.endswith("\n"):
+        yield len(source.lines), "No newline at end of file"
+
+
+def _rule_line_length(source: SourceFile, rule: LocalRule) -> RuleMatches:
+    pattern = _compile(rf"^[^\n]{{{rule.max_length + 1},}}")
+    for match in pattern.finditer(source.text):
+        yield (
+            source.line_at(match.start()),
+            f"Line too long ({len(match.group())} > {rule.max_length})",
+        )
+
+
+def _rule_trailing_whitespace(source: SourceFile, rule: LocalRule) -> RuleMatches:
+    return _matches(_TRAILING_WHITESPACE, source, "Trailing whitespace")
+
+
+def _rule_tabs(source: SourceFile, rule: LocalRule) -> RuleMatches:
+    return _matches(_TAB_INDENT, source, "Tab used for indentation")
+
+
+def _rule_mixed_indentation(source: SourceFile, rule: LocalRule) -> RuleMatches:
+    yield from _matches(_MIXED_INDENT, source, "Tabs and spaces mixed in line")
+    first_tab = _TAB_INDENT.search(source.text)
+    first_space = _SPACE_INDENT.search(source.text)
+    if first_tab is not None and first_space is not None:
+        pos = max(first_tab.start(), first_space.start())
+        yield (
+            source.line_at(pos),
+            "Indentation style differs from earlier lines (tabs and spaces)",
+        )
+
+
+def _rule_crlf(source: SourceFile, rule: LocalRule) -> RuleMatches:
+    if source.crlf is not None:
+        line, count = source.crlf
+        yield line, f"Windows (CRLF) line endings in {count} lines"
+
+
+def _rule_bom(source: SourceFile, rule: LocalRule) -> RuleMatches:
+    if source.has_bom:
+        yield 1, "Byte order mark at the start of the file"
+
+
+def _rule_non_utf8(source: SourceFile, rule: LocalRule) -> RuleMatches:
+    if source.decode_error is not None:
+        line, byte = source.decode_error
+        yield line, f"Invalid UTF-8 byte 0x{byte:02x}"
+
+
+def _rule_regex(source: SourceFile, rule: LocalRule) -> RuleMatches:
+    assert rule.pattern is not None, f"Rule '{rule.name}' has no pattern"
+    message = rule.message or f"Matches '{rule.pattern}'"
+    return _matches(_compile(rule.pattern), source, message)
+
+
+BUILTIN_RULES: dict[str, Callable[[SourceFile, LocalRule], RuleMatches]] = {
+    "trailing_newline": _rule_trailing_newline,
+    "line_length": _rule_line_length,
+    "trailing_whitespace": _rule_trailing_whitespace,
+    "tabs": _rule_tabs,
+    "mixed_indentation": _rule_mixed_indentation,
+    "crlf": _rule_crlf,
+    "bom": _rule_bom,
+    "non_utf8": _rule_non_utf8,
+    "regex": _rule_regex,
+}
+
+
+def load_rules(config: Config) -> list[LocalRule]:
+    """Get the configured local rules, including disabled ones.
+
+    Raises:
+        ValueError: If a rule has an unknown kind.
+    """
+    rules = [LocalRule(**rule) for rule in config.get_local_rules()]
+    for rule in rules:
+        if rule.kind not in BUILTIN_RULES:
+            raise ValueError(
+                f"Unknown kind '{rule.kind}' of rule '{rule.name}'. "
+                f"Available kinds are: {list(BUILTIN_RULES)}"
+            )
+        Severity[rule.severity]  # fail early on typos
+    return rules
+
+
+class RulesChecker(CheckerABC):
+    """Runs all enabled local rules over each file in a single pass."""
+
+    cost_tier = CostTier.LOCAL
+    cpu_bound = True
+
+    def __init__(
+        self,
+        config: Config,
+        rule_names: list[str] | None = None,
+        name: str = "local rules",
+    ):
+        """Init checker.
+
+        Args:
+            config: The configuration with `local_rules`.
+            rule_names: Rules to run (even if disabled), all enabled if None.
+            name: The name of the checker.
+        """
+        super().__init__(config)
+        self.name = name
+        rules = load_rules(config)
+        if rule_names is None:
+            self.rules = [rule for rule in rules if rule.enabled]
+        else:
+            by_name = {rule.name.lower(): rule for rule in rules}
+            self.rules = [by_name[rule_name.lower()] for rule_name in rule_names]
+
+    def get_name(self) -> str:
+        return self.name
+
+    def get_cache_namespace(self) -> str:
+        rules_json = json.dumps([rule.model_dump() for rule in self.rules])
+        return f"{self.name}:{hashlib.sha256(rules_json.encode()).hexdigest()}"
+
+    def _check_file_impl(self, file_path: Path) -> FileCheckResult:
+        file_type = self.config.get_file_type(file_path.suffix)
+        rules = [
+            rule
+            for rule in self.rules
+            if rule.languages is None or file_type in rule.languages
+        ]
+        if not rules:
+            return FileCheckResult(was_checked=False, issues=[])
+
+        source = load_file(file_path)
+        if source.is_binary:
+            return FileCheckResult(was_checked=False, issues=[])
+        issues = []
+        for rule in rules:
+            severity = Severity[rule.severity]
+            n_matches = 0
+            for line, message in BUILTIN_RULES[rule.kind](source, rule):
+                n_matches += 1
+                if n_matches <= MAX_ISSUES_PER_RULE:
+                    issues.append(
+                        FileIssue(
+                            check_name=rule.name,
+                            line=line,
+                            message=message,
+                            severity=severity,
+                        )
+                    )
+            if n_matches > MAX_ISSUES_PER_RULE:
+                issues.append(
+                    FileIssue(
+                        check_name=rule.name,
+                        message=f"{n_matches - MAX_ISSUES_PER_RULE} more issues",
+                        severity=severity,
+                    )
+                )
+        return FileCheckResult(was_checked=True, issues=issues)
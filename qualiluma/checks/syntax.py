@@ -0,0 +1,43 @@
+"""
+Python syntax checking, a cheap local check gating the LLM checkers.
+"""
+
+from pathlib import Path
+
+from .base import (
+    CheckerABC,
+    FileCheckResult,
+    FileCheckResultBuilder,
+    FileIssue,
+    Severity,
+)
+from .gates import SYNTAX_CHECKER, python_syntax_error
+
+
+class SyntaxChecker(CheckerABC):
+    """Reports Python files that don't parse."""
+
+    cpu_bound = True
+
+    def get_name(self) -> str:
+        return SYNTAX_CHECKER
+
+    def _check_file_impl(self, file_path: Path) -> FileCheckResult:
+        file_res = FileCheckResultBuilder(checker_name=self.get_name())
+        if file_path.suffix != ".py":
+            return file_res.skipped("Not a Python file")
+
+        error = python_syntax_error(file_path)
+        if error is None:
+            return file_res.passed()
+        return FileCheckResult(
+            was_checked=True,
+            issues=[
+                FileIssue(
+                    check_name=self.get_name(),
+                    line=error.lineno,
+                    message=f"Syntax error: {error.msg}",
+                    severity=Severity.ERROR,
+                )
+            ],
+        )
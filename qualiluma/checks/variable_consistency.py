@@ -2,8 +2,10 @@ from pathlib import Path
 
 from pydantic import BaseModel
 
-from ..util import get_llm_client, get_logger, load_numbered
+from ..util import get_llm_client, get_logger, load_numbered, log_payload
+from ..util.metrics import stage
 from .base import (
+    CostTier,
     FileCheckResult,
     FileCheckResultBuilder,
     SimpleCheckerABC,
@@ -23,6 +25,8 @@ class _IdentifiersList(BaseModel):
 
 
 class VariablesConsistencyChecker(SimpleCheckerABC):
+    cost_tier = CostTier.LLM
+
     def __init__(self, thorough: bool = False):
         self.llm_client = get_llm_client("fast" if not thorough else "thorough")
 
@@ -34,26 +38,38 @@ class VariablesConsistencyChecker(SimpleCheckerABC):
             return file_res.ambiguous("LLM client not initialized")
 
         code_numbered = load_numbered(file_path)
-        prompt_detect = checker_config["prompt_detect_variables"].format(
-            code=code_numbered
-        )
+        with stage("prompt_build"):
+            prompt_detect = checker_config["prompt_detect_variables"].format(
+                code=code_numbered
+            )
         list_variables = self.llm_client.structured_output(
             prompt_detect, _IdentifiersList
         )
-        logger.debug(f"prompt_detect: {prompt_detect}")
-        logger.debug(f"list_variables: {list_variables}")
+        log_payload(__name__, "prompt_detect", prompt_detect)
+        logger.debug("Detected {} variables", len(list_variables.variables))
 
         if len(list_variables.variables) == 0:
             return file_res.ambiguous(
                 "No variables detected"
             )  # no variables found, strange
 
-        list_variables_str = "\n".join(
-            f"- {var.name} (line {var.line_defined}): {var.description}"
-            for var in list_variables.variables
-        )
-        logger.debug(f"list_variables_str: {list_variables_str}")
-        prompt_check = checker_config["prompt_check_consistency"].format(
-            variables=list_variables_str
-        )
+        with stage("prompt_build"):
+            list_variables_str = "\n".join(
+                f"- {var.name} (line {var.line_defined}): {var.description}"
+                for var in list_variables.variables
+            )
+            prompt_check = checker_config["prompt_check_consistency"].format(
+                variables=list_variables_str
+            )
+        log_payload(__name__, "prompt_check", prompt_check)
         return self.llm_client.structured_output(prompt_check, FileCheckResult)
+
+    def fused_task(
+        self, file_path: Path, checker_config: dict
+    ) -> str | FileCheckResult | None:
+        """Detect and check the variables in one task, instead of two prompts."""
+        if self.llm_client is None:
+            return FileCheckResultBuilder(
+                checker_name="VariablesConsistencyChecker"
+            ).ambiguous("LLM client not initialized")
+        return checker_config.get("fused_task")
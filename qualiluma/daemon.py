@@ -0,0 +1,162 @@
+"""
+Long-running check server with warm config, LLM clients and result cache.
+
+`qualiluma serve` listens on a Unix socket; `qualiluma --daemon PATH` (or the
+faster to start `python -m qualiluma.daemon_client PATH`) sends a check
+request to it and prints the streamed results. The protocol is
+newline-delimited JSON: one request line, then one line per file result and
+a final "done" line with the exit code and LLM cost.
+"""
+
+import json
+import socketserver
+import threading
+from pathlib import Path
+from typing import Any
+
+from langchain_core.messages.ai import subtract_usage
+
+from .checks import CheckerABC, FileCheckResult
+from .daemon_client import stream_check
+from .main import build_checkers, check_path, contains_errors, visualize_results
+from .util import Config, get_logger
+from .util.cache import ResultCache
+from .util.llm import USAGE_HANDLER, log_llm_pricing
+from .util.metrics import METRICS
+
+logger = get_logger(__name__)
+
+
+class CheckServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Unix socket server running checks with warm state."""
+
+    daemon_threads = True
+
+    def __init__(self, socket_path: Path, cache: ResultCache | None = None):
+        """Init server.
+
+        Args:
+            socket_path: The Unix socket to listen on (replaced if it exists).
+            cache: The result cache shared by all requests.
+        """
+        if socket_path.exists():
+            socket_path.unlink()
+        super().__init__(str(socket_path), _RequestHandler)
+        self.socket_path = socket_path
+        self.config = Config()
+        self.cache = cache if cache is not None else ResultCache()
+        self._checkers: dict[tuple[str | None, bool], list[CheckerABC]] = {}
+        # checkers and usage accounting are shared, so checks run one at a time
+        self.check_lock = threading.Lock()
+
+    def get_checkers(
+        self, filter_checkers: str | None, thorough: bool
+    ) -> list[CheckerABC]:
+        """Get warm checkers for the settings, built on first use."""
+        key = (filter_checkers, thorough)
+        if key not in self._checkers:
+            checkers = build_checkers(self.config, filter_checkers, thorough)
+            for checker in checkers:
+                checker.result_cache = self.cache
+            self._checkers[key] = checkers
+        return self._checkers[key]
+
+    def server_close(self) -> None:
+        super().server_close()
+        if self.socket_path.exists():
+            self.socket_path.unlink()
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    server: CheckServer
+
+    def _send(self, message: dict[str, Any]) -> None:
+        self.wfile.write(json.dumps(message).encode() + b"\n")
+        self.wfile.flush()
+
+    def handle(self) -> None:
+        request = json.loads(self.rfile.readline())
+        try:
+            with self.server.check_lock:
+                self._check(request)
+        except Exception as e:
+            logger.warning(f"Failed to process request {request}: {e}")
+            self._send({"type": "error", "message": str(e)})
+
+    def _check(self, request: dict[str, Any]) -> None:
+        target_path = Path(request["path"])
+        if not target_path.exists():
+            self._send(
+                {"type": "error", "message": f"Path '{target_path}' does not exist"}
+            )
+            return
+
+        checkers = self.server.get_checkers(
+            request.get("checkers"), request.get("thorough", False)
+        )
+        METRICS.clear()  # records of earlier requests, not kept by the server
+        usage_before = dict(USAGE_HANDLER.usage_metadata)
+
+        def send_result(checker_name: str, file_path: Path, res: FileCheckResult):
+            self._send(
+                {
+                    "type": "result",
+                    "checker": checker_name,
+                    "file": str(file_path),
+                    "result": res.model_dump(mode="json"),
+                }
+            )
+
+        results = check_path(target_path, checkers, on_result=send_result)
+        usage = {
+            model: subtract_usage(model_usage, usage_before.get(model))
+            for model, model_usage in USAGE_HANDLER.usage_metadata.items()
+        }
+        self._send(
+            {
+                "type": "done",
+                "exit_code": int(contains_errors(results)),
+                "cost": log_llm_pricing(usage_metadata=usage),
+            }
+        )
+
+
+def serve(socket_path: Path) -> None:
+    """Serve check requests until interrupted."""
+    with CheckServer(socket_path) as server:
+        logger.info(f"Serving checks at {socket_path}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+
+
+def check_with_daemon(
+    target_path: Path,
+    socket_path: Path,
+    filter_checkers: str | None = None,
+    thorough: bool = False,
+) -> int:
+    """Check a path with a running server and show the results.
+
+    Args:
+        target_path: The path to the file or directory to check.
+        socket_path: The socket the server listens on.
+        filter_checkers: Comma-separated list of checkers to run (or no filtering).
+        thorough: Whether to use more thorough (but slower) checks.
+
+    Returns:
+        An integer indicating the result of the check (0 for success, 1 for failure).
+    """
+    results: dict[str, dict[Path, FileCheckResult]] = {}
+    for message in stream_check(socket_path, target_path, filter_checkers, thorough):
+        if message["type"] == "result":
+            res = FileCheckResult.model_validate(message["result"])
+            results.setdefault(message["checker"], {})[Path(message["file"])] = res
+        elif message["type"] == "done":
+            visualize_results(results)
+            logger.info(f"Total LLM Cost: ${message['cost']:.4f}")
+            return message["exit_code"]
+        else:
+            logger.error(f"Check server error: {message['message']}")
+    return 1
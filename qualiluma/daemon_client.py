@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Thin client of `qualiluma serve`, using only the standard library.
+
+It starts much faster than `qualiluma --daemon` (which imports the whole
+checking stack), so editor integrations and pre-commit hooks should use:
+
+    python -m qualiluma.daemon_client [--socket PATH] [-c CHECKERS] path
+"""
+
+import argparse
+import json
+import os
+import socket
+import sys
+import tempfile
+from pathlib import Path
+from typing import Any, Iterator
+
+SEVERITY_NAMES = {1: "INFO", 2: "WARNING", 3: "ERROR"}
+
+
+def default_socket_path() -> Path:
+    """Per-user socket location."""
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR")
+    if runtime_dir:
+        return Path(runtime_dir) / "qualiluma.sock"
+    return Path(tempfile.gettempdir()) / f"qualiluma-{os.getuid()}.sock"
+
+
+def stream_check(
+    socket_path: Path,
+    target_path: Path,
+    filter_checkers: str | None = None,
+    thorough: bool = False,
+) -> Iterator[dict[str, Any]]:
+    """Send a check request to the server and yield its messages.
+
+    Args:
+        socket_path: The socket the server listens on.
+        target_path: The path to the file or directory to check.
+        filter_checkers: Comma-separated list of checkers to run (or no filtering).
+        thorough: Whether to use more thorough (but slower) checks.
+
+    Yields:
+        "result" messages as files are checked, then one "done" or "error" message.
+    """
+    request = {
+        "path": str(target_path.resolve()),
+        "checkers": filter_checkers,
+        "thorough": thorough,
+    }
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(str(socket_path))
+        sock.sendall(json.dumps(request).encode() + b"\n")
+        with sock.makefile("rb") as stream:
+            for line in stream:
+                message = json.loads(line)
+                yield message
+                if message["type"] != "result":
+                    return
+
+    yield {"type": "error", "message": "Check server closed the connection"}
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Check code with a running 'qualiluma serve' process",
+        prog="qualiluma.daemon_client",
+    )
+    parser.add_argument("path", type=Path, help="Path to directory or file to check")
+    parser.add_argument("--socket", type=Path, default=None, help="Server socket")
+    parser.add_argument("-c", "--checkers", type=str, default=None)
+    parser.add_argument("-t", "--thorough", action="store_true")
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    socket_path = args.socket or default_socket_path()
+    for message in stream_check(socket_path, args.path, args.checkers, args.thorough):
+        if message["type"] == "result":
+            for issue in message["result"]["issues"]:
+                line = issue["line"] if issue["line"] is not None else "unknown"
+                severity = SEVERITY_NAMES.get(issue["severity"], issue["severity"])
+                checked = "" if message["result"]["was_checked"] else " (not checked)"
+                print(
+                    f"{message['file']}:{line}: {severity}:"
+                    f" {issue['check_name']} - {issue['message']}{checked}"
+                )
+        elif message["type"] == "done":
+            return message["exit_code"]
+        else:
+            print(f"Check server error: {message['message']}", file=sys.stderr)
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())  # pragma: no cover
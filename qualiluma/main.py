@@ -7,39 +7,70 @@ A tool for checking code quality and formatting rules.
 import argparse
 import sys
 from collections import defaultdict
+from contextlib import nullcontext
+from functools import partial
 from pathlib import Path
+from typing import Callable, Iterable
 
 from .checks import (
     CheckerABC,
     FileCheckResult,
-    FunctionAdapter,
     LLMSimpleChecker,
     PepChecker,
+    RulesChecker,
     SimpleCheckerAdapter,
+    SyntaxChecker,
     VariablesConsistencyChecker,
-    check_trailing_newline,
 )
-from .util import Config, get_logger, init_logging
-from .util.llm import log_llm_pricing
+from .checks.fused import fuse_checkers
+from .checks.pool import ProcessPoolRunner, default_jobs
+from .checks.rules import load_rules
+from .results import load_results, save_results
+from .util import Config, flush_logging, get_logger, init_logging
+from .util.archive import ArchiveSource, is_archive
+from .util.batch import run_batched
+from .util.cache import ResultCache
+from .util.circuit import LLMUnavailableError, fail_fast_mode
+from .util.deadline import run_deadline
+from .util.git import GitError, GitRevisionSource
+from .util.llm import (
+    USAGE_HANDLER,
+    configure_llms,
+    log_llm_pricing,
+    log_usage_breakdown,
+)
+from .util.metrics import METRICS, TOP_FILES
+from .util.sample import STRATA_KEYS, Sample
+from .util.shard import Shard
+from .util.sources import find_source, is_dir, is_file, mount
+from .util.tracing import TRACER, SamplingProfiler
 
 logger = get_logger(__name__)
 results_logger = get_logger(__name__, results_mode=True)  # for cleaner output
 
+EXIT_LLM_UNAVAILABLE = 3  # the run was aborted with --fail-fast
+
 
 def build_checkers(
-    config: Config, filter_checkers: str | None = None, thorough: bool = False
+    config: Config,
+    filter_checkers: str | None = None,
+    thorough: bool = False,
+    fused: bool = False,
 ) -> list[CheckerABC]:
     """Build a list of code quality checks to perform.
     Args:
         config: The configuration object containing settings for the checkers.
         filter_checkers: comma separated list of checkers to run if provided.
+            Names of local rules select checkers running only these rules.
         thorough: Whether to use more thorough (but slower) checks.
+        fused: Whether LLM checkers share one request per file, see fused.py.
 
     Returns:
         A list of code quality checkers.
     """
     checkers = [
-        FunctionAdapter(config, check_trailing_newline, "trailing newline"),
+        RulesChecker(config),
+        SyntaxChecker(config),
         SimpleCheckerAdapter(config, LLMSimpleChecker(thorough)),
         SimpleCheckerAdapter(config, VariablesConsistencyChecker(thorough)),
         SimpleCheckerAdapter(config, PepChecker(thorough)),
@@ -48,21 +79,42 @@ def build_checkers(
     if filter_checkers:
         filter_list = filter_checkers.split(",")
         checkers_dict = {checker.get_name().lower(): checker for checker in checkers}
+        rule_names = {rule.name.lower(): rule.name for rule in load_rules(config)}
 
         checkers = []
         for name in filter_list:
             if name.lower() in checkers_dict:
                 checkers.append(checkers_dict[name.lower()])
 
+            elif name.lower() in rule_names:
+                rule_name = rule_names[name.lower()]
+                checkers.append(RulesChecker(config, [rule_name], name=rule_name))
+
             else:
                 raise ValueError(
                     f"Invalid checker: {name}. "
                     f"Available checkers are: {[c.get_name() for c in checkers_dict.values()]}"
+                    f" and local rules {list(rule_names.values())}"
                 )
 
+    if fused:
+        fuse_checkers(checkers, config.get_fused_template())
     return checkers
 
 
+def order_by_cost(checkers: list[CheckerABC]) -> list[CheckerABC]:
+    """Order checkers to run cheap ones first, so that their results can gate
+    the expensive ones. The order within a cost tier is kept.
+
+    Args:
+        checkers: The checkers to order.
+
+    Returns:
+        The checkers ordered by cost tier.
+    """
+    return sorted(checkers, key=lambda checker: checker.get_cost_tier())
+
+
 def parse_args() -> argparse.Namespace:
     """
     Parse command line arguments.
@@ -79,7 +131,7 @@ def parse_args() -> argparse.Namespace:
         "-v",
         "--verbose",
         action="store_true",
-        help="Show verbose output including all checked files",
+        help="Show verbose output including all checked files and debug logs",
     )
     parser.add_argument(
         "-c",
@@ -94,38 +146,377 @@ def parse_args() -> argparse.Namespace:
         action="store_true",
         help="Use more thorough (but slower) checks",
     )
+    parser.add_argument(
+        "--metrics-json",
+        type=Path,
+        default=None,
+        help="Write per-checker and per-file metrics as JSON to this file",
+    )
+    parser.add_argument(
+        "--metrics-prom",
+        type=Path,
+        default=None,
+        help="Write metrics summary as a Prometheus textfile to this file",
+    )
+    parser.add_argument(
+        "--profile",
+        type=Path,
+        default=None,
+        help="Profile the run and write folded stacks (for flamegraphs) to this file",
+    )
+    parser.add_argument(
+        "--trace",
+        type=Path,
+        default=None,
+        help="Write Chrome trace JSON with per-file spans to this file",
+    )
+    parser.add_argument(
+        "--payload-log",
+        type=str,
+        default=None,
+        help="Log prompts and LLM responses to this (size-capped) file",
+    )
+    parser.add_argument(
+        "--llm-backend",
+        choices=["openai", "fake"],
+        default=None,
+        help="Override the LLM backend of all clients ('fake' needs no network)",
+    )
+    cassette_group = parser.add_mutually_exclusive_group()
+    cassette_group.add_argument(
+        "--record",
+        type=Path,
+        default=None,
+        help="Record all LLM requests and responses to this directory",
+    )
+    cassette_group.add_argument(
+        "--replay",
+        type=Path,
+        default=None,
+        help="Serve LLM responses recorded with --record from this directory",
+    )
+    parser.add_argument(
+        "--shard",
+        type=str,
+        default=None,
+        help="Check only shard i of N (1-based, e.g. '2/4') of the files",
+    )
+    parser.add_argument(
+        "--shard-by-size",
+        action="store_true",
+        help="Balance shards by file sizes instead of path hashes",
+    )
+    parser.add_argument(
+        "--rev",
+        type=str,
+        default=None,
+        help="Check a git revision (commit, branch or tag) of the path,"
+        " read from the repository without a checkout",
+    )
+    parser.add_argument(
+        "--follow-symlinks",
+        action="store_true",
+        default=None,
+        help="Walk into symlinked directories, checking every physical file once",
+    )
+    sample_group = parser.add_mutually_exclusive_group()
+    sample_group.add_argument(
+        "--sample",
+        type=int,
+        default=None,
+        metavar="N",
+        help="Check a random sample of N files, and estimate issue rates",
+    )
+    sample_group.add_argument(
+        "--sample-fraction",
+        type=float,
+        default=None,
+        metavar="P",
+        help="Check a random share P (e.g. 0.01) of the files, and estimate issue rates",
+    )
+    parser.add_argument(
+        "--sample-seed",
+        type=int,
+        default=0,
+        help="Seed of the random sample, the same seed selects the same files",
+    )
+    parser.add_argument(
+        "--stratify",
+        type=str,
+        default=None,
+        help=f"Comma-separated keys to stratify the sample by: {', '.join(STRATA_KEYS)}",
+    )
+    parser.add_argument(
+        "--results-json",
+        type=Path,
+        default=None,
+        help="Write machine-readable results (e.g. for 'qualiluma merge') to this file",
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=1,
+        help="Worker processes for CPU-bound local checkers (0: one per core)",
+    )
+    parser.add_argument(
+        "--deadline",
+        type=float,
+        default=None,
+        help="Seconds for the whole run, files not checked by then are reported"
+        " as 'deadline exceeded'",
+    )
+    parser.add_argument(
+        "--request-timeout",
+        type=float,
+        default=None,
+        help="Seconds to wait for an LLM response before retrying",
+    )
+    parser.add_argument(
+        "--fail-fast",
+        action="store_true",
+        help="Abort the run (exit code 3) once an LLM client is unavailable,"
+        " instead of reporting the remaining files as 'LLM unavailable'",
+    )
+    parser.add_argument(
+        "--fused",
+        action="store_true",
+        help="Check every file for all LLM checkers with one LLM request"
+        " (checkers with a fused_task in the config)",
+    )
+    parser.add_argument(
+        "--batch-mode",
+        action="store_true",
+        help="Send LLM requests through the Batch API (cheaper, slower), waiting"
+        " for the batches of every step of the checks",
+    )
+    parser.add_argument(
+        "--batch-state",
+        type=Path,
+        default=None,
+        help="Keep submitted batches and answers in this file, to resume"
+        " an interrupted --batch-mode run",
+    )
+    parser.add_argument(
+        "--top-files",
+        type=int,
+        default=TOP_FILES,
+        help="Number of files with the most LLM cost to list (0: none)",
+    )
+    parser.add_argument(
+        "--daemon",
+        action="store_true",
+        help="Send the check to a running 'qualiluma serve' process",
+    )
+    parser.add_argument(
+        "--socket",
+        type=Path,
+        default=None,
+        help="Socket of the 'qualiluma serve' process (per-user default)",
+    )
 
     return parser.parse_args()
 
 
+def parse_serve_args(argv: list[str]) -> argparse.Namespace:
+    """
+    Parse command line arguments of the serve command.
+
+    Args:
+        argv: Arguments after the command name.
+
+    Returns:
+        Parsed arguments as Namespace object
+    """
+    parser = argparse.ArgumentParser(
+        description="Serve checks over a Unix socket, keeping clients and caches warm",
+        prog="qualiluma serve",
+    )
+    parser.add_argument("--socket", type=Path, default=None, help="Socket to listen on")
+    parser.add_argument(
+        "-v", "--verbose", action="store_true", help="Show verbose output"
+    )
+    parser.add_argument(
+        "--llm-backend",
+        choices=["openai", "fake"],
+        default=None,
+        help="Override the LLM backend of all clients ('fake' needs no network)",
+    )
+    return parser.parse_args(argv)
+
+
+def parse_watch_args(argv: list[str]) -> argparse.Namespace:
+    """
+    Parse command line arguments of the watch command.
+
+    Args:
+        argv: Arguments after the command name.
+
+    Returns:
+        Parsed arguments as Namespace object
+    """
+    parser = argparse.ArgumentParser(
+        description="Check code and re-check changed files continuously",
+        prog="qualiluma watch",
+    )
+    parser.add_argument("path", type=Path, help="Path to directory or file to watch")
+    parser.add_argument(
+        "-v", "--verbose", action="store_true", help="Show verbose output"
+    )
+    parser.add_argument(
+        "-c",
+        "--checkers",
+        type=str,
+        default=None,
+        help="Comma-separated list of checkers to run (or all if not specified)",
+    )
+    parser.add_argument(
+        "-t",
+        "--thorough",
+        action="store_true",
+        help="Use more thorough (but slower) checks",
+    )
+    parser.add_argument(
+        "--debounce",
+        type=float,
+        default=0.3,
+        help="Seconds without new changes before re-checking",
+    )
+    parser.add_argument(
+        "--poll",
+        action="store_true",
+        help="Poll for changes instead of using inotify",
+    )
+    parser.add_argument(
+        "--llm-backend",
+        choices=["openai", "fake"],
+        default=None,
+        help="Override the LLM backend of all clients ('fake' needs no network)",
+    )
+    return parser.parse_args(argv)
+
+
+def parse_merge_args(argv: list[str]) -> argparse.Namespace:
+    """
+    Parse command line arguments of the merge command.
+
+    Args:
+        argv: Arguments after the command name.
+
+    Returns:
+        Parsed arguments as Namespace object
+    """
+    parser = argparse.ArgumentParser(
+        description="Merge results of several (sharded) runs written with --results-json",
+        prog="qualiluma merge",
+    )
+    parser.add_argument("results", type=Path, nargs="+", help="Results files to merge")
+    return parser.parse_args(argv)
+
+
 def check_path(
-    target_path: Path, checkers: list[CheckerABC]
+    target_path: Path,
+    checkers: list[CheckerABC],
+    shard: Shard | None = None,
+    on_result: Callable[[str, Path, FileCheckResult], None] | None = None,
+    jobs: int = 1,
+    sample: Sample | None = None,
 ) -> dict[str, dict[Path, FileCheckResult]]:
     """Calculate the results of the code quality checks.
 
     Args:
-        target_path: The path to the file or directory to check.
+        target_path: The path to the file or directory to check. Archives
+            (see archive.py) are checked as directories, without extraction.
         checkers: A list of code quality checkers to apply.
+        shard: Check only the files of this shard, if provided.
+        on_result: Called with (checker name, file path, result) for every
+            result when ready, e.g. to stream results.
+        jobs: Worker processes for CPU-bound checkers of a directory, which
+            then run alongside the other checkers (in this process if 1).
+        sample: Check only a random sample of the files of a directory
+            (of the shard, if sharded), if provided.
 
     Returns:
         A dictionary mapping checker names to file paths and their check status.
     """
-    if target_path.is_file():
+    if find_source(target_path) is None and is_archive(target_path):
+        with mount(ArchiveSource(target_path)) as archive:
+            return check_path(archive.root, checkers, shard, on_result, jobs, sample)
+
+    names = [checker.get_name() for checker in checkers]
+    results: dict[str, dict[Path, FileCheckResult]] = {name: {} for name in names}
+
+    def prior_results(file_path: Path) -> dict[str, FileCheckResult]:
+        return {
+            name: results[name][file_path]
+            for name in names
+            if file_path in results[name]
+        }
+
+    if is_file(target_path):
+        if shard is not None and not shard.select([target_path], target_path):
+            logger.info(f"File {target_path} is not in shard {shard}")
+            return results
+
         # Check single file
         logger.info(f"Checking file: {target_path}")
-        results = {
-            checker.get_name(): {target_path: checker.check_file(target_path)}
-            for checker in checkers
-        }
+        for checker in order_by_cost(checkers):
+            res = checker.check_file(target_path, prior_results(target_path))
+            results[checker.get_name()] = {target_path: res}
+            if on_result is not None:
+                on_result(checker.get_name(), target_path, res)
 
     else:
-        assert target_path.is_dir(), "Target path is neither file nor directory"
-        # Check directory recursively
+        assert is_dir(target_path), "Target path is neither file nor directory"
+        # Check directory recursively, cheap checkers first to gate the others
         logger.info(f"Checking files in: {target_path}")
-        results = {
-            checker.get_name(): checker.check_directory(target_path)
-            for checker in checkers
-        }
+
+        def iter_files(checker: CheckerABC) -> Iterable[Path]:
+            files: Iterable[Path] = checker.iter_files(target_path)
+            if shard is not None:
+                files = shard.select(files, target_path)
+            if sample is not None:
+                files = sample.select(files, target_path)
+            return files
+
+        # workers read files from the disk, not from mounted sources
+        if jobs > 1 and find_source(target_path) is None:
+            pool_checkers = [c for c in checkers if c.cpu_bound]
+        else:
+            pool_checkers = []
+        if not pool_checkers:
+            for checker in order_by_cost(checkers):
+                name = checker.get_name()
+                checker_on_result = (
+                    partial(on_result, name) if on_result is not None else None
+                )
+                results[name] = checker.check_files(
+                    iter_files(checker), checker_on_result, prior_results
+                )
+                checker.add_aliases(results[name])
+            return results
+
+        config = pool_checkers[0].config
+        with ProcessPoolRunner(config, pool_checkers, jobs) as runner:
+            for checker in pool_checkers:
+                runner.submit(checker, iter_files(checker), on_result)
+
+            def pool_prior_results(file_path: Path) -> dict[str, FileCheckResult]:
+                return {**runner.wait_file(file_path), **prior_results(file_path)}
+
+            for checker in order_by_cost(checkers):
+                if checker in pool_checkers:
+                    continue
+                name = checker.get_name()
+                checker_on_result = (
+                    partial(on_result, name) if on_result is not None else None
+                )
+                results[name] = checker.check_files(
+                    iter_files(checker), checker_on_result, pool_prior_results
+                )
+            results.update(runner.drain())
+        for checker in checkers:
+            checker.add_aliases(results[checker.get_name()])
 
     return results
 
@@ -153,12 +544,14 @@ def visualize_results(results: dict[str, dict[Path, FileCheckResult]]) -> None:
         results: A dictionary mapping checker names to file paths and their check status.
     """
     problems_by_checker = defaultdict(list)
+    skipped_by_checker: dict[str, int] = defaultdict(int)
     for checker_name, file_status in results.items():
         results_logger.info("")
         results_logger.info(f" Checker {checker_name} ".center(80, "="))
         for file_path, status in file_status.items():
             if not status.was_checked:
                 if len(status.issues) == 0:
+                    skipped_by_checker[checker_name] += 1
                     results_logger.debug(f"⏭️  {file_path} - not checked")
                 else:
                     results_logger.warning(
@@ -173,7 +566,7 @@ def visualize_results(results: dict[str, dict[Path, FileCheckResult]]) -> None:
                 if len(status.issues) > 0:
                     problems_by_checker[checker_name].append(file_path)
                     results_logger.info(f"❌ {file_path} - issues found:")
-                    for issue in sorted(status.issues, key=lambda x: (x.line or 0)):
+                    for issue in sorted(status.issues, key=lambda x: x.line or 0):
                         line = issue.line if issue.line is not None else "unknown"
                         err_msg = (
                             f"    - {file_path}:{line}: {issue.severity.name}:"
@@ -203,6 +596,11 @@ def visualize_results(results: dict[str, dict[Path, FileCheckResult]]) -> None:
                 f" {len(problems_by_checker[checker_name])}"
                 f" files by '{checker_name}'."
             )
+        if skipped_by_checker[checker_name]:
+            # e.g. by gates, listed with -v
+            results_logger.info(
+                f"    ⏭️  {skipped_by_checker[checker_name]} files skipped"
+            )
     results_logger.info("")
 
 
@@ -212,6 +610,22 @@ def check(
     verbose: bool = True,
     thorough: bool = False,
     config: Config | None = None,
+    metrics_json: Path | None = None,
+    metrics_prom: Path | None = None,
+    profile: Path | None = None,
+    trace: Path | None = None,
+    shard: Shard | None = None,
+    results_json: Path | None = None,
+    jobs: int = 1,
+    deadline: float | None = None,
+    fail_fast: bool = False,
+    top_files: int = TOP_FILES,
+    fused: bool = False,
+    batch_mode: bool = False,
+    batch_state: Path | None = None,
+    sample: Sample | None = None,
+    rev: str | None = None,
+    follow_symlinks: bool | None = None,
 ) -> int:
     """Check the specified file or directory for code quality issues.
 
@@ -221,31 +635,266 @@ def check(
         verbose: Whether to show verbose output.
         thorough: Whether to use more thorough (but slower) checks.
         config: The configuration object containing settings for the checkers.
+        metrics_json: Path to export collected metrics as JSON, if provided.
+        metrics_prom: Path to export collected metrics as Prometheus textfile.
+        profile: Path to write sampling profiler stacks, if provided.
+        trace: Path to write Chrome trace JSON, if provided.
+        shard: Check only the files of this shard, if provided.
+        results_json: Path to write machine-readable results, if provided.
+        jobs: Worker processes for CPU-bound checkers (0: one per core).
+        deadline: Seconds for the whole check, `run_deadline` of the config if None.
+        fail_fast: Whether to abort once an LLM client is unavailable.
+        top_files: Number of files with the most LLM cost to list.
+        fused: Whether LLM checkers share one request per file.
+        batch_mode: Whether to send LLM requests through the Batch API.
+        batch_state: File to resume batch mode runs from, if provided.
+        sample: Check only a random sample of the files, and estimate the
+            issue rates of the whole directory, if provided.
+        rev: Check this git revision of the path (read from the repository
+            objects, without a checkout), if provided.
+        follow_symlinks: Whether to walk into symlinked directories,
+            `follow_symlinks` of the config if None.
 
     Returns:
-        An integer indicating the result of the check (0 for success, 1 for failure).
+        An integer indicating the result of the check (0 for success, 1 for failure,
+        EXIT_LLM_UNAVAILABLE if aborted by fail_fast).
     """
     if config is None:
         config = Config()
-
-    if not target_path.exists():
+    if deadline is None:
+        deadline = config.get_run_deadline()
+    if follow_symlinks is None:
+        follow_symlinks = config.get_follow_symlinks()
+
+    source: GitRevisionSource | None = None
+    if rev is not None:
+        try:
+            source = GitRevisionSource(target_path, rev)
+        except GitError as e:
+            logger.error(f"Cannot check revision '{rev}' of '{target_path}': {e}")
+            return 1
+        target_path = source.virtual_path(target_path)
+        exists = source.is_file(target_path) or source.is_dir(target_path)
+    else:
+        exists = target_path.exists()
+    if not exists:
         logger.error(f"Path '{target_path}' does not exist")
         return 1
 
-    checkers = build_checkers(config, filter_checkers, thorough)
-    check_results = check_path(target_path, checkers)
-    visualize_results(check_results)
+    if trace is not None:
+        TRACER.start()
+    profiler = SamplingProfiler() if profile is not None else None
+
+    aborted: LLMUnavailableError | None = None
+    with profiler or nullcontext(), mount(source) if source else nullcontext():
+        checkers = build_checkers(config, filter_checkers, thorough, fused)
+        for checker in checkers:
+            checker.follow_symlinks = follow_symlinks
+        if source is not None:
+            # blob SHAs key the results, files with the same content are checked once
+            cache = ResultCache()
+            for checker in checkers:
+                checker.result_cache = cache
+
+        def run() -> dict[str, dict[Path, FileCheckResult]]:
+            METRICS.clear()  # batch mode runs the checks again in every round
+            return check_path(
+                target_path,
+                checkers,
+                shard,
+                jobs=jobs if jobs > 0 else default_jobs(),
+                sample=sample,
+            )
+
+        try:
+            with run_deadline(deadline), fail_fast_mode(fail_fast):
+                if batch_mode:
+                    check_results = run_batched(
+                        run, batch_state, **config.get_batch_settings()
+                    )
+                else:
+                    check_results = run()
+        except LLMUnavailableError as e:
+            aborted = e
+            check_results = {}
+        else:
+            visualize_results(check_results)
+            if sample is not None and (is_dir(target_path) or is_archive(target_path)):
+                visualize_estimates(check_results, sample)
+    log_usage_breakdown(top_files)
     log_llm_pricing()
+    if results_json is not None and aborted is None:
+        save_results(
+            check_results,
+            results_json,
+            dict(USAGE_HANDLER.usage_metadata),
+            shard=str(shard) if shard is not None else None,
+        )
+
+    if profiler is not None and profile is not None:
+        profiler.export(profile)
+    if trace is not None:
+        TRACER.stop()
+        TRACER.export(trace)
+    if metrics_json is not None:
+        METRICS.export_json(metrics_json)
+    if metrics_prom is not None:
+        METRICS.export_prometheus(metrics_prom)
+    if aborted is not None:
+        logger.error(f"Check aborted (--fail-fast): {aborted}")
+        return EXIT_LLM_UNAVAILABLE
     return int(contains_errors(check_results))
 
 
+def visualize_estimates(
+    results: dict[str, dict[Path, FileCheckResult]], sample: Sample
+) -> None:
+    """Log the issue rates of the checkers estimated from a sample.
+
+    Args:
+        results: A dictionary mapping checker names to the sampled file paths
+            and their check status.
+        sample: The sample the files were selected with.
+    """
+    results_logger.info("")
+    results_logger.info(f" Estimates from a sample of {sample} ".center(80, "="))
+    for checker_name, file_status in results.items():
+        outcomes = {
+            file_path: len(status.issues) > 0 if status.was_checked else None
+            for file_path, status in file_status.items()
+        }
+        estimate = sample.estimate(outcomes)
+        if not estimate.checked:
+            results_logger.info(f"  - '{checker_name}': no sampled files checked")
+            continue
+        results_logger.info(
+            f"  - '{checker_name}': {estimate.rate:.1%} of files with issues"
+            f" ({estimate.confidence:.0%} CI {estimate.low:.1%} - {estimate.high:.1%}),"
+            f" {estimate.with_issues} of {estimate.checked} checked sampled files,"
+            f" ~{estimate.rate * estimate.population:.0f}"
+            f" of ~{estimate.population:.0f} files"
+        )
+    results_logger.info("")
+
+
+def merge(results_files: list[Path]) -> int:
+    """Merge results of several runs, e.g. shards, into one summary.
+
+    Args:
+        results_files: Files written with `--results-json`.
+
+    Returns:
+        An integer indicating the result of the check (0 for success, 1 for failure).
+    """
+    check_results, usage = load_results(results_files)
+    visualize_results(check_results)
+    log_llm_pricing(usage_metadata=usage)
+    return int(contains_errors(check_results))
+
+
+def parse_sample(args: argparse.Namespace) -> Sample | None:
+    """Build the sample of --sample / --sample-fraction, None if not sampling."""
+    if args.sample is None and args.sample_fraction is None:
+        return None
+    strata = args.stratify.split(",") if args.stratify else []
+    return Sample(args.sample, args.sample_fraction, args.sample_seed, strata)
+
+
 def main() -> int:
     """Main entry point for the script."""
+    if sys.argv[1:2] == ["merge"]:
+        merge_args = parse_merge_args(sys.argv[2:])
+        init_logging("qualiluma.log")
+        res = merge(merge_args.results)
+        flush_logging()
+        return res
+
+    # imported here, as these modules use this one
+    from .daemon import check_with_daemon, serve
+    from .daemon_client import default_socket_path
+    from .watch import watch
+
+    if sys.argv[1:2] == ["watch"]:
+        watch_args = parse_watch_args(sys.argv[2:])
+        level = "DEBUG" if watch_args.verbose else "INFO"
+        init_logging("qualiluma.log", file_log_level=level, console_log_level=level)
+        if watch_args.llm_backend is not None:
+            configure_llms(backend=watch_args.llm_backend)
+        res = watch(
+            watch_args.path,
+            watch_args.checkers,
+            watch_args.thorough,
+            debounce=watch_args.debounce,
+            polling=watch_args.poll,
+        )
+        flush_logging()
+        return res
+
+    if sys.argv[1:2] == ["serve"]:
+        serve_args = parse_serve_args(sys.argv[2:])
+        level = "DEBUG" if serve_args.verbose else "INFO"
+        init_logging("qualiluma.log", file_log_level=level, console_log_level=level)
+        if serve_args.llm_backend is not None:
+            configure_llms(backend=serve_args.llm_backend)
+        serve(serve_args.socket or default_socket_path())
+        flush_logging()
+        return 0
+
     args = parse_args()
-    # Set console log level based on verbose flag
-    console_level = "DEBUG" if args.verbose else "INFO"
-    init_logging("qualiluma.log", console_log_level=console_level)
-    return check(args.path, args.checkers, args.verbose, args.thorough)
+    # Set log levels based on verbose flag, debug messages are not even
+    # formatted without it
+    level = "DEBUG" if args.verbose else "INFO"
+    init_logging(
+        "qualiluma.log",
+        file_log_level=level,
+        console_log_level=level,
+        payload_log_file=args.payload_log,
+    )
+    if args.daemon:
+        res = check_with_daemon(
+            args.path,
+            args.socket or default_socket_path(),
+            args.checkers,
+            args.thorough,
+        )
+        flush_logging()
+        return res
+
+    llm_overrides = {
+        "backend": args.llm_backend,
+        "record": args.record,
+        "replay": args.replay,
+        "timeout": args.request_timeout,
+    }
+    configure_llms(**{k: v for k, v in llm_overrides.items() if v is not None})
+    res = check(
+        args.path,
+        args.checkers,
+        args.verbose,
+        args.thorough,
+        metrics_json=args.metrics_json,
+        metrics_prom=args.metrics_prom,
+        profile=args.profile,
+        trace=args.trace,
+        shard=(
+            Shard.parse(args.shard, args.shard_by_size)
+            if args.shard is not None
+            else None
+        ),
+        results_json=args.results_json,
+        jobs=args.jobs,
+        deadline=args.deadline,
+        fail_fast=args.fail_fast,
+        top_files=args.top_files,
+        fused=args.fused,
+        batch_mode=args.batch_mode,
+        batch_state=args.batch_state,
+        sample=parse_sample(args),
+        rev=args.rev,
+        follow_symlinks=args.follow_symlinks,
+    )
+    flush_logging()
+    return res
 
 
 if __name__ == "__main__":
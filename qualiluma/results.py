@@ -0,0 +1,70 @@
+"""
+Machine-readable check results, e.g. to merge results of several shards.
+"""
+
+import json
+from pathlib import Path
+from typing import Any
+
+from langchain_core.messages.ai import UsageMetadata, add_usage
+
+from .checks import FileCheckResult
+
+RESULTS_VERSION = 1
+
+
+def save_results(
+    results: dict[str, dict[Path, FileCheckResult]],
+    file_path: Path,
+    usage_metadata: dict[str, UsageMetadata],
+    shard: str | None = None,
+) -> None:
+    """Write check results and LLM usage as JSON.
+
+    Args:
+        results: A dictionary mapping checker names to file paths and their check status.
+        file_path: The file to write.
+        usage_metadata: LLM usage by model.
+        shard: The shard specification ("i/N") if the run was sharded.
+    """
+    data = {
+        "version": RESULTS_VERSION,
+        "shard": shard,
+        "usage": usage_metadata,
+        "results": {
+            checker_name: {
+                str(path): status.model_dump(mode="json")
+                for path, status in file_status.items()
+            }
+            for checker_name, file_status in results.items()
+        },
+    }
+    file_path.write_text(json.dumps(data))
+
+
+def load_results(
+    file_paths: list[Path],
+) -> tuple[dict[str, dict[Path, FileCheckResult]], dict[str, UsageMetadata]]:
+    """Read and merge results written by `save_results`.
+
+    Args:
+        file_paths: The files to merge.
+
+    Returns:
+        Merged results and LLM usage by model summed over all files.
+    """
+    results: dict[str, dict[Path, FileCheckResult]] = {}
+    usage: dict[str, Any] = {}
+    for file_path in file_paths:
+        data = json.loads(file_path.read_text())
+        if data.get("version") != RESULTS_VERSION:
+            raise ValueError(
+                f"Unsupported results version in {file_path}: {data.get('version')}"
+            )
+        for checker_name, file_status in data["results"].items():
+            checker_results = results.setdefault(checker_name, {})
+            for path, status in file_status.items():
+                checker_results[Path(path)] = FileCheckResult.model_validate(status)
+        for model, model_usage in data["usage"].items():
+            usage[model] = add_usage(usage.get(model), model_usage)
+    return results, usage
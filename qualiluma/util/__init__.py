@@ -1,12 +1,15 @@
 from .config import Config
-from .io import load_numbered
+from .io import file_digest, load_numbered
 from .llm import get_llm_client
-from .logs import get_logger, init_logging
+from .logs import flush_logging, get_logger, init_logging, log_payload
 
 __all__ = [
     "Config",
     "get_logger",
     "init_logging",
+    "flush_logging",
+    "log_payload",
     "get_llm_client",
     "load_numbered",
+    "file_digest",
 ]
@@ -0,0 +1,155 @@
+"""
+Tar and zip archives as file sources, to check them without extraction.
+
+Members appear under `<archive>!`, e.g. `pkg.tar.gz!/src/x.py`, and are
+read on demand. Zip archives and plain tars are read at random. Compressed
+tars are one stream: members are read going forward, and the members
+passed over on the way are kept in a bounded buffer, as reads ahead (see
+prefetch.py) may ask for them slightly out of order. Going backward, e.g.
+for the next checker, restarts the stream.
+"""
+
+import bz2
+import gzip
+import lzma
+import tarfile
+import threading
+import zipfile
+from collections import OrderedDict
+from pathlib import Path, PurePosixPath
+
+from .logs import get_logger
+from .sources import FileSourceABC
+
+logger = get_logger(__name__)
+
+ARCHIVE_SUFFIXES = (
+    ".zip",
+    ".tar",
+    ".tar.gz",
+    ".tgz",
+    ".tar.bz2",
+    ".tbz2",
+    ".tar.xz",
+    ".txz",
+)
+ARCHIVE_SEPARATOR = "!"  # between the archive and member paths
+PASSED_BYTES = 16_000_000  # members passed over in compressed tars, kept at most
+PASSED_MEMBER_BYTES = 1_000_000  # larger members passed over are not kept
+
+
+def is_archive(path: Path) -> bool:
+    """Check if a path is an archive file on the disk, by its name."""
+    return path.name.lower().endswith(ARCHIVE_SUFFIXES) and path.is_file()
+
+
+def _member_path(name: str) -> PurePosixPath | None:
+    """Get the relative path of a member, None if it would escape the root."""
+    parts = [part for part in PurePosixPath(name).parts if part not in ("/", ".")]
+    if not parts or ".." in parts:
+        return None
+    return PurePosixPath(*parts)
+
+
+class ArchiveSource(FileSourceABC):
+    """The regular files of a tar or zip archive, under `<archive>!`."""
+
+    def __init__(self, archive_path: Path):
+        """Init source, listing the members of the archive.
+
+        Args:
+            archive_path: The archive, see ARCHIVE_SUFFIXES.
+
+        Raises:
+            tarfile.TarError, zipfile.BadZipFile: If the archive is corrupt.
+        """
+        super().__init__(Path(f"{archive_path}{ARCHIVE_SEPARATOR}"))
+        self.archive_path = archive_path
+        mtime_ns = archive_path.stat().st_mtime_ns
+        self._lock = threading.Lock()
+        self._zip: zipfile.ZipFile | None = None
+        self._tar: tarfile.TarFile | None = None
+        self._zip_members: dict[Path, zipfile.ZipInfo] = {}
+        self._tar_members: dict[Path, tarfile.TarInfo] = {}
+
+        if zipfile.is_zipfile(archive_path):
+            self._zip = zipfile.ZipFile(archive_path)
+            for info in self._zip.infolist():
+                rel = _member_path(info.filename)
+                if rel is not None and not info.is_dir():
+                    self._zip_members[self.root / rel] = info
+                    self.add_file(self.root / rel, (mtime_ns, info.file_size))
+        else:
+            self._tar = tarfile.open(archive_path, "r:*")
+            for member in self._tar.getmembers():  # a pass over the whole stream
+                rel = _member_path(member.name)
+                if rel is not None and member.isreg():
+                    self._tar_members[self.root / rel] = member
+                    self.add_file(self.root / rel, (mtime_ns, member.size))
+        logger.info(f"Archive {archive_path}: {len(self)} files")
+
+        # compressed tars: members by stream order, and the position in it
+        self._is_stream = self._tar is not None and isinstance(
+            self._tar.fileobj, (gzip.GzipFile, bz2.BZ2File, lzma.LZMAFile)
+        )
+        self._order = sorted(self._tar_members, key=self._offset)
+        self._index = {path: i for i, path in enumerate(self._order)}
+        self._next = 0  # index of the member after the last one read
+        self._passed: OrderedDict[Path, bytes] = OrderedDict()
+        self._passed_bytes = 0
+        self.restarts = 0  # backward reads of the stream
+
+    def __str__(self) -> str:
+        return f"archive {self.archive_path}"
+
+    def _offset(self, path: Path) -> int:
+        return self._tar_members[path].offset_data
+
+    def read_bytes(self, path: Path) -> bytes:
+        if not self.is_file(path):
+            raise FileNotFoundError(f"No file {path} in {self}")
+        with self._lock:
+            if self._zip is not None:
+                return self._zip.read(self._zip_members[path])
+            if not self._is_stream:
+                return self._extract(path)
+
+            data = self._passed.pop(path, None)
+            if data is not None:
+                self._passed_bytes -= len(data)
+                return data
+            index = self._index[path]
+            if index < self._next:
+                self.restarts += 1
+                logger.debug("Reading {} from the start for {}", self, path)
+            else:
+                for passed in self._order[self._next : index]:
+                    self._keep_passed(passed)
+            self._next = index + 1
+            return self._extract(path)
+
+    def _extract(self, path: Path) -> bytes:
+        assert self._tar is not None
+        f = self._tar.extractfile(self._tar_members[path])
+        assert f is not None, f"{path} is not a regular file"
+        return f.read()
+
+    def _keep_passed(self, path: Path) -> None:
+        """Keep a member passed over in a compressed tar, within PASSED_BYTES."""
+        if self._tar_members[path].size > PASSED_MEMBER_BYTES:
+            return
+        data = self._extract(path)
+        self._passed[path] = data
+        self._passed_bytes += len(data)
+        while self._passed_bytes > PASSED_BYTES:
+            _, dropped = self._passed.popitem(last=False)
+            self._passed_bytes -= len(dropped)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._zip is not None:
+                self._zip.close()
+            if self._tar is not None:
+                self._tar.close()
+            self._passed.clear()
+            self._passed_bytes = 0
@@ -0,0 +1,209 @@
+"""
+Load balancing of LLM requests over the endpoints of an `llms` entry.
+
+An entry may list several OpenAI-compatible endpoints, e.g. the OpenAI API
+and on-prem inference servers. Every request goes to the endpoint with the
+fewest outstanding requests relative to its weight, within its concurrency
+limit; ties (e.g. all idle, when requests are sent one at a time) are broken
+by smooth weighted round-robin, so the weights also hold then. Endpoints
+failing with transient errors are taken out for a cooldown that grows with
+consecutive failures, then a single request probes them before they get
+their full share again.
+"""
+
+import threading
+import time
+from typing import Any, Callable
+
+from langchain_core.runnables import Runnable, RunnableSequence
+
+from .logs import get_logger
+
+logger = get_logger(__name__)
+
+HEALTH_COOLDOWN = 1.0  # seconds out after a failure, doubled per consecutive one
+MAX_COOLDOWN = 60.0  # seconds
+ACQUIRE_POLL_INTERVAL = 0.05  # seconds between stop checks while all are busy
+
+
+class Endpoint:
+    """One backend of an `llms` entry, with its load and health."""
+
+    def __init__(
+        self,
+        name: str,
+        client: Any,
+        model_name: str = "",
+        weight: float = 1.0,
+        max_concurrency: int | None = None,
+    ):
+        """Init endpoint.
+
+        Args:
+            name: The name in logs, e.g. the base URL.
+            client: The chat model (or any runnable answering messages).
+            model_name: The model of the endpoint.
+            weight: The share of requests relative to other endpoints.
+            max_concurrency: Outstanding requests at most (no limit if None).
+        """
+        assert weight > 0, f"Weight of endpoint {name} must be positive"
+        self.name = name
+        self.client = client
+        self.model_name = model_name
+        self.weight = weight
+        self.max_concurrency = max_concurrency
+        self.outstanding = 0
+        self.failures = 0  # consecutive
+        self.down_until = 0.0  # time.monotonic() value
+        self.current_weight = 0.0  # of smooth weighted round-robin
+        self.reported = 0  # requests marked failed before they ended
+        self._structured: dict[type, tuple[Runnable, Runnable | None]] = {}
+
+    def runnable(self, schema: type | None = None) -> tuple[Any, Runnable | None]:
+        """Get the runnable sending requests and the parser of its output.
+
+        Args:
+            schema: The pydantic model of structured output, plain text if None.
+
+        Returns:
+            The model part, and the parser part if it can run separately
+            (to measure parsing), None otherwise.
+        """
+        if schema is None:
+            return self.client, None
+        if schema not in self._structured:
+            structured = self.client.with_structured_output(schema)
+            if isinstance(structured, RunnableSequence):
+                parser: Runnable = structured.last
+                if structured.middle:
+                    parser = RunnableSequence(*structured.middle, parser)
+                self._structured[schema] = (structured.first, parser)
+            else:
+                self._structured[schema] = (structured, None)
+        return self._structured[schema]
+
+    def has_capacity(self) -> bool:
+        # an endpoint recovering from failures gets a single probe request
+        limit = 1 if self.failures else self.max_concurrency
+        return limit is None or self.outstanding < limit
+
+    def is_up(self, now: float) -> bool:
+        return now >= self.down_until
+
+
+class EndpointBalancer:
+    """Spreads requests over endpoints by least outstanding requests."""
+
+    def __init__(self, endpoints: list[Endpoint]):
+        assert endpoints, "No endpoints to balance"
+        self.endpoints = endpoints
+        self._lock = threading.Condition()
+
+    def acquire(
+        self,
+        avoid: Endpoint | None = None,
+        wait: bool = True,
+        check_stopped: Callable[[], None] | None = None,
+    ) -> Endpoint | None:
+        """Take a request slot of the best endpoint, release it with `release`.
+
+        Args:
+            avoid: An endpoint to use only if no other is available,
+                e.g. the one of the request being hedged.
+            wait: Whether to wait while all endpoints are at their limit.
+            check_stopped: Called while waiting, raises to stop waiting.
+
+        Returns:
+            The endpoint, None if all are busy and not waiting.
+        """
+        with self._lock:
+            while True:
+                endpoint = self._choose(avoid)
+                if endpoint is not None:
+                    endpoint.outstanding += 1
+                    return endpoint
+                if not wait:
+                    return None
+                self._lock.wait(ACQUIRE_POLL_INTERVAL)
+                if check_stopped is not None:
+                    check_stopped()
+
+    def _choose(self, avoid: Endpoint | None) -> Endpoint | None:
+        free = [endpoint for endpoint in self.endpoints if endpoint.has_capacity()]
+        if not free:
+            return None
+        now = time.monotonic()
+        up = [endpoint for endpoint in free if endpoint.is_up(now)]
+        if not up:  # try the one back first, rather than failing the request
+            return min(free, key=lambda endpoint: endpoint.down_until)
+        candidates = [endpoint for endpoint in up if endpoint is not avoid] or up
+        load = min(endpoint.outstanding / endpoint.weight for endpoint in candidates)
+        tied = [
+            endpoint
+            for endpoint in candidates
+            if endpoint.outstanding / endpoint.weight == load
+        ]
+        for endpoint in tied:
+            endpoint.current_weight += endpoint.weight
+        chosen = max(tied, key=lambda endpoint: endpoint.current_weight)
+        chosen.current_weight -= sum(endpoint.weight for endpoint in tied)
+        return chosen
+
+    def any_up(self) -> bool:
+        """Check if any endpoint is up (not in a cooldown after failures)."""
+        now = time.monotonic()
+        with self._lock:
+            return any(endpoint.is_up(now) for endpoint in self.endpoints)
+
+    def release(
+        self, endpoint: Endpoint, ok: bool | None, retry_after: float | None = None
+    ) -> None:
+        """Return a request slot.
+
+        Args:
+            endpoint: The endpoint of the request.
+            ok: Whether the request succeeded, None if that says nothing about
+                the endpoint health (e.g. an invalid request).
+            retry_after: Seconds a failed (rate limited) request asked to wait,
+                the endpoint is out at least that long.
+        """
+        with self._lock:
+            endpoint.outstanding -= 1
+            if endpoint.reported:  # its failure is counted already
+                endpoint.reported -= 1
+                if ok is False:
+                    ok = None
+            if ok is True:
+                if endpoint.failures:
+                    logger.info(f"LLM endpoint {endpoint.name} is back")
+                endpoint.failures = 0
+                endpoint.down_until = 0.0
+            elif ok is False:
+                self._mark_failed(endpoint, retry_after)
+            self._lock.notify_all()
+
+    def report_failure(self, endpoint: Endpoint) -> None:
+        """Mark an endpoint failed before its request ends, e.g. on a timeout.
+
+        The failure is counted once: the release of the request does not
+        count it again.
+        """
+        with self._lock:
+            endpoint.reported += 1
+            self._mark_failed(endpoint)
+            self._lock.notify_all()
+
+    def _mark_failed(
+        self, endpoint: Endpoint, retry_after: float | None = None
+    ) -> None:
+        if len(self.endpoints) == 1:
+            return  # nowhere to fail over, the retry delays apply
+        endpoint.failures += 1
+        cooldown = min(HEALTH_COOLDOWN * 2 ** (endpoint.failures - 1), MAX_COOLDOWN)
+        cooldown = max(cooldown, retry_after or 0.0)
+        endpoint.down_until = time.monotonic() + cooldown
+        log = logger.warning if endpoint.failures == 1 else logger.debug
+        log(
+            f"LLM endpoint {endpoint.name} failed {endpoint.failures} times in a row,"
+            f" out for {cooldown:.1f}s"
+        )
@@ -0,0 +1,303 @@
+"""
+Batch API execution of LLM requests, for runs where cost matters more than latency.
+
+`run_batched()` repeats a run in rounds. In every round, LLM requests with
+a batch answer get it, and the others are queued while their files are
+reported as "batch pending". The queued requests are then sent as one
+JSONL batch per LLM client, and the next round runs once the batches
+complete. Multi-step checkers (e.g. variables detection, then their check)
+take a round per step.
+
+The submitted batches and their answers are saved to a state file, so that
+an interrupted run resumes waiting for its batches instead of paying again.
+"""
+
+import json
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, Callable, Iterator, TypeVar
+
+from pydantic import BaseModel
+
+from . import deadline
+from .logs import get_logger
+
+logger = get_logger(__name__)
+
+BATCH_PENDING = "batch pending"
+BATCH_SUFFIX = "@batch"  # usage of batched requests is kept per model + suffix
+BATCH_PRICE_FACTOR = 0.5  # batch prices relative to the usual ones
+BATCH_POLL_INTERVAL = 30.0  # seconds between batch status checks
+BATCH_MAX_ROUNDS = 4  # runs at most, every step of a checker needs one
+BATCH_ENDPOINT = "/v1/chat/completions"
+BATCH_COMPLETION_WINDOW = "24h"
+_FINAL_STATUSES = {"completed", "failed", "expired", "cancelled"}
+
+_SESSION: ContextVar["BatchSession | None"] = ContextVar("batch_session", default=None)
+
+T = TypeVar("T")
+
+
+class BatchPendingError(Exception):
+    """The LLM request is queued for the next batch, its answer comes later."""
+
+
+class BatchRequestError(Exception):
+    """The batch API failed an LLM request."""
+
+
+class BatchSession:
+    """Queued LLM requests and batch answers of a batched run."""
+
+    def __init__(
+        self, state_path: Path | None = None, poll_interval: float = BATCH_POLL_INTERVAL
+    ):
+        """Init session, loading the state of an interrupted run if any.
+
+        Args:
+            state_path: The file keeping submitted batches and answers.
+            poll_interval: Seconds between batch status checks.
+        """
+        self.state_path = state_path
+        self.poll_interval = poll_interval
+        self._lock = threading.Lock()
+        # request key -> {"body": response body} or {"error": message}
+        self.answers: dict[str, dict[str, Any]] = {}
+        # batch id -> {"client": LLM client name, "keys": request keys}
+        self.batches: dict[str, dict[str, Any]] = {}
+        # request key -> (LLM client name, request body), for the next batch
+        self.pending: dict[str, tuple[str, dict[str, Any]]] = {}
+        self._consumed: set[str] = set()
+        if state_path is not None and state_path.exists():
+            state = json.loads(state_path.read_text())
+            self.answers = state["answers"]
+            self.batches = state["batches"]
+            logger.info(
+                f"Resuming batches from {state_path}: {len(self.answers)} answers,"
+                f" {len(self.batches)} batches in progress"
+            )
+
+    def answer(self, key: str) -> tuple[dict[str, Any], bool] | None:
+        """Get the response body of a request, None if not answered yet.
+
+        Returns:
+            The response body, and whether it is used for the first time
+            (to count its usage once over all rounds).
+
+        Raises:
+            BatchRequestError: If the batch API failed the request.
+        """
+        with self._lock:
+            answer = self.answers.get(key)
+            if answer is None:
+                return None
+            if "error" in answer:
+                raise BatchRequestError(answer["error"])
+            first = key not in self._consumed
+            self._consumed.add(key)
+            return answer["body"], first
+
+    def add(self, key: str, client_name: str, body: dict[str, Any]) -> None:
+        """Queue a request for the next batch of its LLM client."""
+        with self._lock:
+            self.pending[key] = (client_name, body)
+
+    def submit(self, get_api: Callable[[str], Any]) -> None:
+        """Send the queued requests as one batch per LLM client.
+
+        Args:
+            get_api: Get the OpenAI API (`openai.OpenAI`) of an LLM client.
+        """
+        with self._lock:
+            pending, self.pending = self.pending, {}
+        by_client: dict[str, dict[str, dict[str, Any]]] = {}
+        for key, (client_name, body) in pending.items():
+            by_client.setdefault(client_name, {})[key] = body
+
+        for client_name, bodies in by_client.items():
+            api = get_api(client_name)
+            lines = [
+                json.dumps(
+                    {
+                        "custom_id": key,
+                        "method": "POST",
+                        "url": BATCH_ENDPOINT,
+                        "body": body,
+                    }
+                )
+                for key, body in bodies.items()
+            ]
+            with tempfile.TemporaryDirectory() as tmp:
+                input_path = Path(tmp) / f"qualiluma-{client_name}.jsonl"
+                input_path.write_text("\n".join(lines) + "\n")
+                with input_path.open("rb") as f:
+                    input_file = api.files.create(file=f, purpose="batch")
+            batch = api.batches.create(
+                input_file_id=input_file.id,
+                endpoint=BATCH_ENDPOINT,
+                completion_window=BATCH_COMPLETION_WINDOW,
+                metadata={"source": "qualiluma"},
+            )
+            logger.info(
+                f"Submitted batch {batch.id} of {len(bodies)} requests"
+                f" for LLM client '{client_name}'"
+            )
+            self.batches[batch.id] = {"client": client_name, "keys": list(bodies)}
+            self._save()
+
+    def wait(self, get_api: Callable[[str], Any]) -> bool:
+        """Wait for the submitted batches and collect their answers.
+
+        Waiting stops at the run deadline, the batches are kept in the state
+        file for a later run.
+
+        Args:
+            get_api: Get the OpenAI API (`openai.OpenAI`) of an LLM client.
+
+        Returns:
+            bool: Whether all batches finished.
+        """
+        while self.batches:
+            for batch_id, info in list(self.batches.items()):
+                api = get_api(info["client"])
+                batch = api.batches.retrieve(batch_id)
+                if batch.status not in _FINAL_STATUSES:
+                    continue
+                self._collect(api, batch, info["keys"])
+                del self.batches[batch_id]
+                self._save()
+            if not self.batches:
+                break
+
+            remaining = deadline.remaining()
+            if remaining is not None and remaining <= self.poll_interval:
+                logger.warning(
+                    f"Run deadline before {len(self.batches)} batches finished,"
+                    f" resume them with the same batch state file"
+                )
+                return False
+            logger.debug(f"Waiting for {len(self.batches)} batches")
+            time.sleep(self.poll_interval)
+        return True
+
+    def _collect(self, api: Any, batch: Any, keys: list[str]) -> None:
+        """Store the answers and errors of a finished batch."""
+        counts = batch.request_counts
+        logger.info(
+            f"Batch {batch.id} {batch.status}"
+            + (f": {counts.completed} done, {counts.failed} failed" if counts else "")
+        )
+        for file_id in (batch.output_file_id, batch.error_file_id):
+            if not file_id:
+                continue
+            for line in api.files.content(file_id).text.splitlines():
+                if not line.strip():
+                    continue
+                result = json.loads(line)
+                response = result.get("response") or {}
+                if response.get("status_code") == 200:
+                    self.answers[result["custom_id"]] = {"body": response["body"]}
+                else:
+                    error = result.get("error") or response.get("body", {}).get("error")
+                    self.answers[result["custom_id"]] = {"error": str(error)}
+
+        if batch.status == "failed":
+            errors = batch.errors.data if batch.errors else []
+            message = "; ".join(str(e.message) for e in errors) or "batch failed"
+            for key in keys:
+                self.answers.setdefault(key, {"error": message})
+        # requests of expired or cancelled batches are sent again next round
+
+    def _save(self) -> None:
+        if self.state_path is None:
+            return
+        state = {"answers": self.answers, "batches": self.batches}
+        tmp_path = self.state_path.with_name(self.state_path.name + ".tmp")
+        tmp_path.write_text(json.dumps(state))
+        tmp_path.replace(self.state_path)
+
+
+@contextmanager
+def batch_mode(session: BatchSession) -> Iterator[None]:
+    """Answer LLM requests in the block from batches of the session."""
+    token = _SESSION.set(session)
+    try:
+        yield
+    finally:
+        _SESSION.reset(token)
+
+
+def current_session() -> BatchSession | None:
+    """Get the batch session of the current run, None if not batched."""
+    return _SESSION.get()
+
+
+def run_batched(
+    run: Callable[[], T],
+    state_path: Path | None = None,
+    max_rounds: int = BATCH_MAX_ROUNDS,
+    poll_interval: float = BATCH_POLL_INTERVAL,
+) -> T:
+    """Repeat a run until all its LLM requests are answered by batches.
+
+    Args:
+        run: The run, e.g. checking a directory.
+        state_path: The file keeping batches and answers, to resume runs.
+        max_rounds: Runs at most, requests of the last one stay pending.
+        poll_interval: Seconds between batch status checks.
+
+    Returns:
+        The result of the last run.
+    """
+    # imported here, as the LLM module answers requests from sessions
+    from .llm import get_batch_api
+
+    session = BatchSession(state_path, poll_interval)
+    finished = session.wait(get_batch_api)  # batches of an interrupted run
+    for round_number in range(1, max_rounds + 1):
+        with batch_mode(session):
+            result = run()
+        if not session.pending or not finished:
+            break
+        if round_number == max_rounds:
+            logger.warning(
+                f"{len(session.pending)} LLM requests left pending"
+                f" after {max_rounds} batch rounds"
+            )
+            break
+        logger.info(f"Batch round {round_number}: {len(session.pending)} requests")
+        session.submit(get_batch_api)
+        finished = session.wait(get_batch_api)
+    return result
+
+
+def parse_output(body: dict[str, Any], schema: type[BaseModel]) -> BaseModel:
+    """Parse the structured answer of a chat completion response body.
+
+    Raises:
+        BatchRequestError: If the response has no answer (e.g. a refusal).
+    """
+    message = body["choices"][0]["message"]
+    tool_calls = message.get("tool_calls")
+    raw = tool_calls[0]["function"]["arguments"] if tool_calls else message["content"]
+    if raw is None:
+        raise BatchRequestError(f"No answer in batch response: {message}")
+    return schema.model_validate_json(raw)
+
+
+def usage_metadata(body: dict[str, Any]) -> dict[str, Any]:
+    """Convert the usage of a chat completion response body, as langchain does."""
+    usage = body.get("usage") or {}
+    input_tokens = usage.get("prompt_tokens", 0)
+    output_tokens = usage.get("completion_tokens", 0)
+    cached = (usage.get("prompt_tokens_details") or {}).get("cached_tokens", 0)
+    return {
+        "input_tokens": input_tokens,
+        "output_tokens": output_tokens,
+        "total_tokens": input_tokens + output_tokens,
+        "input_token_details": {"cache_read": cached or 0},
+    }
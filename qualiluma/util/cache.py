@@ -0,0 +1,52 @@
+"""In-memory cache of check results keyed by file content."""
+
+import threading
+from collections import OrderedDict
+from typing import Any
+
+DEFAULT_MAX_ENTRIES = 100_000
+
+
+class ResultCache:
+    """Thread-safe LRU cache of check results.
+
+    Keys combine a checker namespace (name and settings) with a digest of the
+    file content, so results survive file renames and are invalidated by
+    any content change.
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[tuple[str, str], Any] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, namespace: str, digest: str) -> Any | None:
+        """Get a cached result, or None if not cached."""
+        key = (namespace, digest)
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, namespace: str, digest: str, value: Any) -> None:
+        """Store a result, evicting the least recently used one if full."""
+        key = (namespace, digest)
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """Drop all cached results."""
+        with self._lock:
+            self._entries.clear()
@@ -0,0 +1,113 @@
+"""Record/replay storage of LLM requests and responses.
+
+A cassette is a directory with an append-only JSONL file. Every line stores
+one response keyed by the hash of (model, answer schema, prompt), with its
+usage metadata. Prompts themselves are not stored, only their hashes.
+"""
+
+import hashlib
+import json
+import threading
+from pathlib import Path
+from typing import Any
+
+CASSETTE_FILE = "cassette.jsonl"
+
+_CASSETTES: dict[Path, "Cassette"] = {}
+_CASSETTES_LOCK = threading.Lock()
+
+
+class CassetteMissError(KeyError):
+    """The replayed request was not recorded."""
+
+
+def request_key(model: str, schema_name: str, schema: str, prompt: str) -> str:
+    """Hash identifying an LLM request.
+
+    Args:
+        model: The model name.
+        schema_name: The answer schema name ("" for text answers).
+        schema: The answer schema definition, so that schema changes aren't
+            served stale answers.
+        prompt: The prompt.
+
+    Returns:
+        Hex digest of the request.
+    """
+    digest = hashlib.sha256()
+    for part in (model, schema_name, schema, prompt):
+        digest.update(part.encode())
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class Cassette:
+    """Thread-safe store of recorded LLM responses in a directory."""
+
+    def __init__(self, directory: Path):
+        self.directory = directory
+        self.file_path = directory / CASSETTE_FILE
+        self._lock = threading.Lock()
+        self._entries: dict[str, dict[str, Any]] = {}
+        if self.file_path.exists():
+            with self.file_path.open("r") as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self._entries[entry["key"]] = entry
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> dict[str, Any]:
+        """Get a recorded entry.
+
+        Raises:
+            CassetteMissError: If the request was not recorded.
+        """
+        try:
+            return self._entries[key]
+        except KeyError:
+            raise CassetteMissError(
+                f"Request {key[:12]} not recorded in {self.file_path}"
+            ) from None
+
+    def record(
+        self,
+        key: str,
+        model: str,
+        schema_name: str,
+        output: Any,
+        usage: dict[str, Any],
+    ) -> None:
+        """Store a response (replacing a previous one with the same key).
+
+        Args:
+            key: The request key (see `request_key`).
+            model: The model name.
+            schema_name: The answer schema name ("" for text answers).
+            output: JSON-serializable response.
+            usage: Usage metadata by model.
+        """
+        entry = {
+            "key": key,
+            "model": model,
+            "schema": schema_name,
+            "output": output,
+            "usage": usage,
+        }
+        line = json.dumps(entry, separators=(",", ":"))
+        with self._lock:
+            self._entries[key] = entry
+            self.directory.mkdir(parents=True, exist_ok=True)
+            with self.file_path.open("a") as f:
+                f.write(line + "\n")
+
+
+def get_cassette(directory: Path | str) -> Cassette:
+    """Get the cassette of a directory, shared by all LLM clients."""
+    directory = Path(directory).resolve()
+    with _CASSETTES_LOCK:
+        if directory not in _CASSETTES:
+            _CASSETTES[directory] = Cassette(directory)
+        return _CASSETTES[directory]
@@ -0,0 +1,134 @@
+"""
+Circuit breaker for LLM provider outages.
+
+Every `LLMClient` has a breaker shared by all checkers using the client.
+After `threshold` consecutive failed calls (after their retries) it opens:
+calls fail at once with LLMUnavailableError, so the remaining files are
+reported as "LLM unavailable" instead of each waiting through its retries.
+Every `probe_interval` seconds one call is let through, and the breaker
+closes again if it succeeds.
+
+With `fail_fast_mode()`, checkers re-raise LLMUnavailableError to abort the run.
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator
+
+from .logs import get_logger
+
+logger = get_logger(__name__)
+
+LLM_UNAVAILABLE = "LLM unavailable"
+CIRCUIT_THRESHOLD = 5  # consecutive failed calls opening the circuit
+CIRCUIT_PROBE_INTERVAL = 30.0  # seconds between probe calls while open
+
+_FAIL_FAST: ContextVar[bool] = ContextVar("fail_fast", default=False)
+
+
+class LLMUnavailableError(Exception):
+    """LLM calls are not attempted, as the circuit of the client is open."""
+
+
+class CircuitBreaker:
+    """Stops calls to a failing LLM provider, probing it until it recovers."""
+
+    def __init__(
+        self,
+        name: str,
+        threshold: int = CIRCUIT_THRESHOLD,
+        probe_interval: float = CIRCUIT_PROBE_INTERVAL,
+    ):
+        """Init breaker.
+
+        Args:
+            name: The name of the LLM client, for logs.
+            threshold: Consecutive failed calls opening the circuit.
+            probe_interval: Seconds between probe calls while open.
+        """
+        self.name = name
+        self.threshold = threshold
+        self.probe_interval = probe_interval
+        self.failures = 0  # consecutive
+        self.opened_at: float | None = None  # time.monotonic(), None if closed
+        self._next_probe = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self) -> bool:
+        return self.opened_at is not None
+
+    def before_call(self) -> bool:
+        """Let a call through, as a probe if the circuit is open.
+
+        Returns:
+            bool: Whether the call is a probe, to pass to `record`.
+
+        Raises:
+            LLMUnavailableError: If the circuit is open and no probe is due.
+        """
+        with self._lock:
+            if self.opened_at is None:
+                return False
+            now = time.monotonic()
+            if self._probing or now < self._next_probe:
+                raise LLMUnavailableError(
+                    f"{LLM_UNAVAILABLE}: client '{self.name}' failed"
+                    f" {self.failures} times in a row"
+                )
+            self._probing = True
+            logger.info(f"Probing LLM client '{self.name}'")
+            return True
+
+    def record(self, ok: bool | None, probe: bool = False) -> None:
+        """Record the result of a call let through by `before_call`.
+
+        Args:
+            ok: Whether the call succeeded, None if that says nothing about
+                the provider (e.g. the call was cancelled).
+            probe: Whether the call was a probe.
+        """
+        with self._lock:
+            if probe:
+                self._probing = False
+            if ok is None:
+                return
+            if ok:
+                if self.opened_at is not None:
+                    downtime = time.monotonic() - self.opened_at
+                    logger.warning(
+                        f"LLM client '{self.name}' is available again"
+                        f" after {downtime:.0f}s"
+                    )
+                self.failures = 0
+                self.opened_at = None
+                return
+
+            self.failures += 1
+            if probe or (self.opened_at is None and self.failures >= self.threshold):
+                if self.opened_at is None:
+                    self.opened_at = time.monotonic()
+                    logger.error(
+                        f"LLM client '{self.name}' failed {self.failures} times in"
+                        f" a row, files are reported as '{LLM_UNAVAILABLE}' until"
+                        f" it recovers (probing every {self.probe_interval:.0f}s)"
+                    )
+                self._next_probe = time.monotonic() + self.probe_interval
+
+
+@contextmanager
+def fail_fast_mode(enabled: bool = True) -> Iterator[None]:
+    """Abort checks in the block once an LLM client is unavailable."""
+    token = _FAIL_FAST.set(enabled)
+    try:
+        yield
+    finally:
+        _FAIL_FAST.reset(token)
+
+
+def fail_fast_enabled() -> bool:
+    """Check if LLMUnavailableError should abort the current run."""
+    return _FAIL_FAST.get()
@@ -1,9 +1,19 @@
+import copy
+import fnmatch
+import functools
+import re
 from pathlib import Path
-from typing import Any
+from typing import Any, NamedTuple
 
 import yaml
 
 CONFIG_PATH = Path(__file__).parents[1] / "conf" / "config.yaml"
+CHECKED_LABELS = ("code", "docs")  # files with these labels are checked
+_GLOB_CHARS = re.compile(r"[*?\[]")
+
+
+class ConfigError(ValueError):
+    """The config file is invalid."""
 
 
 def _yaml_read(file_path: Path) -> dict[Any, Any]:
@@ -19,25 +29,132 @@ def _yaml_read(file_path: Path) -> dict[Any, Any]:
         return yaml.safe_load(f)
 
 
-class Config:
-    def __init__(self):
-        self._config = _yaml_read(CONFIG_PATH)
+@functools.cache
+def read_config_file(file_path: Path = CONFIG_PATH) -> dict[Any, Any]:
+    """Reads the config file once per process, all readers share the result.
+
+    Args:
+        file_path (Path): The path to the config file.
+
+    Returns:
+        dict: The contents of the config file.
+    """
+    return _yaml_read(file_path)
+
 
-        self._ext_to_type: dict[str, str] = {}
-        for type_, extensions in self._config["files"]["type"].items():
-            for ext in extensions:
-                assert ext not in self._ext_to_type, (
+class _CompiledConfig(NamedTuple):
+    """Lookup tables of the config, computed once and only read afterwards."""
+
+    ext_to_type: dict[str, str]
+    ext_to_labels: dict[str, tuple[str, ...]]
+    checked_extensions: frozenset[str]
+    ignored_names: frozenset[str]
+    ignored_pattern: re.Pattern[str] | None  # glob entries of directories.ignore
+    checkers_extra: dict[str, dict[Any, Any]]
+    checker_extensions: dict[str, frozenset[str] | None]
+
+
+def _str_list(value: Any, where: str) -> list[str]:
+    if not isinstance(value, list) or not all(isinstance(v, str) for v in value):
+        raise ConfigError(f"{where} must be a list of strings, got {value!r}")
+    return value
+
+
+@functools.cache
+def _compile(file_path: Path) -> _CompiledConfig:
+    """Validate the config and build its lookup tables.
+
+    Raises:
+        ConfigError: If the config is invalid, e.g. an extension has two types.
+    """
+    config = read_config_file(file_path)
+
+    ext_to_type: dict[str, str] = {}
+    for type_, extensions in config["files"]["type"].items():
+        for ext in _str_list(extensions, f"files.type.{type_}"):
+            if not ext.startswith("."):
+                raise ConfigError(f"Extension {ext!r} of {type_} must start with '.'")
+            if ext in ext_to_type:
+                raise ConfigError(
                     f"Extension {ext} is mapped to several"
-                    f" types: {self._ext_to_type[ext]}, {type_}"
+                    f" types: {ext_to_type[ext]}, {type_}"
                 )
-                self._ext_to_type[ext] = type_
+            ext_to_type[ext] = type_
+    type_to_exts: dict[str, set[str]] = {}
+    for ext, type_ in ext_to_type.items():
+        type_to_exts.setdefault(type_, set()).add(ext)
+
+    type_to_labels: dict[str, list[str]] = {}
+    for label, types in config["files"]["labels"].items():
+        for type_ in _str_list(types, f"files.labels.{label}"):
+            if type_ not in type_to_exts:
+                raise ConfigError(f"Unknown file type {type_} in files.labels.{label}")
+            type_to_labels.setdefault(type_, []).append(label)
+    ext_to_labels = {
+        ext: tuple(type_to_labels.get(type_, [])) for ext, type_ in ext_to_type.items()
+    }
+
+    ignored = _str_list(config["directories"]["ignore"], "directories.ignore")
+    globs = [name for name in ignored if _GLOB_CHARS.search(name)]
 
-        self._type_to_labels: dict[str, list[str]] = {}
-        for label, types in self._config["files"]["labels"].items():
-            for type_ in types:
-                if type_ not in self._type_to_labels:
-                    self._type_to_labels[type_] = []
-                self._type_to_labels[type_].append(label)
+    checkers_extra: dict[str, dict[Any, Any]] = {}
+    checker_extensions: dict[str, frozenset[str] | None] = {}
+    for checker in config.get("checkers_extra") or []:
+        name = checker.get("name")
+        if not isinstance(name, str):
+            raise ConfigError(f"Entry of checkers_extra without a name: {checker}")
+        if name in checkers_extra:
+            raise ConfigError(f"Checker {name} is in checkers_extra twice")
+        checkers_extra[name] = copy.deepcopy(checker)
+
+        # extensions of the languages, and of available_extensions
+        extensions: set[str] | None = None
+        if checker.get("languages") is not None:
+            extensions = set()
+            for type_ in _str_list(checker["languages"], f"{name}.languages"):
+                if type_ not in type_to_exts:
+                    raise ConfigError(f"Unknown file type {type_} in {name}.languages")
+                extensions |= type_to_exts[type_]
+        if checker.get("available_extensions") is not None:
+            available = set(
+                _str_list(
+                    checker["available_extensions"], f"{name}.available_extensions"
+                )
+            )
+            extensions = available if extensions is None else extensions & available
+        checker_extensions[name] = (
+            frozenset(extensions) if extensions is not None else None
+        )
+
+    return _CompiledConfig(
+        ext_to_type=ext_to_type,
+        ext_to_labels=ext_to_labels,
+        checked_extensions=frozenset(
+            ext
+            for ext, labels in ext_to_labels.items()
+            if any(label in CHECKED_LABELS for label in labels)
+        ),
+        ignored_names=frozenset(ignored),
+        ignored_pattern=(
+            re.compile("|".join(fnmatch.translate(name) for name in globs))
+            if globs
+            else None
+        ),
+        checkers_extra=checkers_extra,
+        checker_extensions=checker_extensions,
+    )
+
+
+class Config:
+    """The settings of qualiluma, read from conf/config.yaml.
+
+    The file is parsed and validated once per process. File discovery uses
+    precomputed lookups, e.g. `is_checked_extension` and `is_ignored_directory`.
+    """
+
+    def __init__(self):
+        self._config = read_config_file(CONFIG_PATH)
+        self._compiled = _compile(CONFIG_PATH)
 
     def get_labels(self, file_extension: str) -> list[str]:
         """Returns a list of labels associated with a given file extension.
@@ -49,18 +166,92 @@ class Config:
             list[str]: A list of labels associated with the file extension,
                 e.g. ['code'] or ['docs'].
         """
-        type_ = self._ext_to_type.get(file_extension, "")
-        labels = self._type_to_labels.get(type_, [])
-        return labels
+        return list(self._compiled.ext_to_labels.get(file_extension, ()))
+
+    def is_checked_extension(self, file_extension: str) -> bool:
+        """Returns whether files with an extension are checked.
+
+        Args:
+            file_extension (str): The file extension to look up.
+
+        Returns:
+            bool: True if the extension has one of CHECKED_LABELS.
+        """
+        return file_extension in self._compiled.checked_extensions
+
+    def get_file_type(self, file_extension: str) -> str | None:
+        """Returns the file type of a given file extension.
+
+        Args:
+            file_extension (str): The file extension to look up.
+
+        Returns:
+            str | None: The file type, e.g. 'python', or None if unknown.
+        """
+        return self._compiled.ext_to_type.get(file_extension)
 
     def get_ignored_directories(self) -> list[str]:
         """Returns a list of directories to ignore.
 
         Returns:
-            list[str]: A list of directory names to ignore.
+            list[str]: A list of directory names (or glob patterns) to ignore.
         """
         return self._config["directories"]["ignore"]
 
+    def is_ignored_directory(self, dir_name: str) -> bool:
+        """Returns whether a directory is ignored.
+
+        Args:
+            dir_name (str): The name of the directory.
+
+        Returns:
+            bool: True if the name or a glob pattern is in `directories.ignore`.
+        """
+        if dir_name in self._compiled.ignored_names:
+            return True
+        pattern = self._compiled.ignored_pattern
+        return pattern is not None and pattern.match(dir_name) is not None
+
+    def get_follow_symlinks(self) -> bool:
+        """Returns whether directory walks follow symlinks.
+
+        Returns:
+            bool: True to follow symlinked directories, checking every file once.
+        """
+        return bool(self._config["directories"].get("follow_symlinks", False))
+
+    def get_local_rules(self) -> list[dict[Any, Any]]:
+        """Returns the configuration of the local rules.
+
+        Returns:
+            list[dict]: The rules, see `checks/rules.py` for the keys.
+        """
+        return self._config.get("local_rules", [])
+
+    def get_run_deadline(self) -> float | None:
+        """Returns the time limit of a run.
+
+        Returns:
+            float | None: The limit in seconds, or None if there is no limit.
+        """
+        return self._config.get("run_deadline")
+
+    def get_batch_settings(self) -> dict[str, Any]:
+        """Returns the settings of batch mode runs.
+
+        Returns:
+            dict: Keyword arguments of `batch.run_batched`, e.g. poll_interval.
+        """
+        return self._config.get("batch") or {}
+
+    def get_fused_template(self) -> str | None:
+        """Returns the prompt of fused LLM checks.
+
+        Returns:
+            str | None: The template with {tasks} and {code}, None for the default.
+        """
+        return self._config.get("fused_template")
+
     def get_checker_extra(self, checker_name: str) -> dict[Any, Any]:
         """Returns extra configuration for a given checker.
 
@@ -68,9 +259,18 @@ class Config:
             checker_name (str): The name of the checker to look up.
 
         Returns:
-            dict: The extra configuration for the checker.
+            dict: The extra configuration for the checker (a copy).
+        """
+        return copy.deepcopy(self._compiled.checkers_extra.get(checker_name, {}))
+
+    def get_checker_extensions(self, checker_name: str) -> frozenset[str] | None:
+        """Returns the file extensions a checker accepts.
+
+        Args:
+            checker_name (str): The name of the checker to look up.
+
+        Returns:
+            frozenset[str] | None: The extensions of its `languages`, limited
+                to its `available_extensions`, or None if it accepts all files.
         """
-        for checker in self._config.get("checkers_extra", []):
-            if checker.get("name") == checker_name:
-                return checker
-        return {}
+        return self._compiled.checker_extensions.get(checker_name)
@@ -0,0 +1,61 @@
+"""
+Run deadline: a wall-clock limit for a whole check run.
+
+Code running under `run_deadline()` (including threads started with a copy
+of the context, e.g. LLM requests) can ask for the remaining time and stop
+waiting once it is over. Files not checked by then are reported as
+ambiguous instead of blocking the run.
+"""
+
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator
+
+DEADLINE_EXCEEDED = "deadline exceeded"
+
+# time.monotonic() value of the deadline of the current run
+_DEADLINE: ContextVar[float | None] = ContextVar("run_deadline", default=None)
+
+
+class DeadlineExceededError(Exception):
+    """The run deadline was reached before the work finished."""
+
+
+@contextmanager
+def run_deadline(seconds: float | None) -> Iterator[None]:
+    """Limit the code in the block to a number of seconds (no limit if None).
+
+    Nested deadlines can only shorten the current one.
+    """
+    if seconds is None:
+        yield
+        return
+    deadline = time.monotonic() + seconds
+    current = _DEADLINE.get()
+    if current is not None:
+        deadline = min(deadline, current)
+    token = _DEADLINE.set(deadline)
+    try:
+        yield
+    finally:
+        _DEADLINE.reset(token)
+
+
+def remaining() -> float | None:
+    """Get the seconds left until the deadline (at least 0), None if no deadline."""
+    deadline = _DEADLINE.get()
+    if deadline is None:
+        return None
+    return max(deadline - time.monotonic(), 0.0)
+
+
+def expired() -> bool:
+    """Check if the deadline of the current run is reached."""
+    return remaining() == 0.0
+
+
+def check_deadline() -> None:
+    """Raise DeadlineExceededError if the deadline is reached."""
+    if expired():
+        raise DeadlineExceededError(DEADLINE_EXCEEDED)
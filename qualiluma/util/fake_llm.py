@@ -0,0 +1,180 @@
+"""Deterministic fake LLM backend.
+
+`FakeChatModel` answers like a real chat model (usage metadata, callbacks,
+structured output) without network access, with configurable latency and
+error injection. It is used to measure qualiluma's own overhead and in tests.
+
+Enable it with `backend: fake` in an `llms` config entry, options are read
+from the `fake` section of the entry:
+
+    llms:
+      fast:
+        model: gpt-4.1-mini-2025-04-14
+        max_tokens: 16_384
+        backend: fake
+        fake:
+          latency: {distribution: lognormal, median: 0.8, sigma: 0.5}
+          error_rate: 0.01
+          rate_limit_rate: 0.05
+          seed: 0
+          responses:
+            FileCheckResult: {was_checked: true, issues: []}
+"""
+
+import json
+import math
+import random
+import threading
+import time
+from typing import Any
+
+import httpx
+import openai
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.runnables import Runnable, RunnableLambda
+from pydantic import BaseModel, ConfigDict, Field, PrivateAttr
+
+DEFAULT_RESPONSES: dict[str, Any] = {
+    "FileCheckResult": {"was_checked": True, "issues": []},
+    "_IdentifiersList": {
+        "variables": [
+            {"name": "value", "line_defined": 1, "description": "fake variable"}
+        ]
+    },
+}
+
+CHARS_PER_TOKEN = 4  # rough estimate for usage metadata
+
+
+class FakeLatency(BaseModel):
+    """Latency distribution of fake responses, in seconds."""
+
+    model_config = ConfigDict(extra="forbid")
+
+    distribution: str = "constant"  # constant, uniform, exponential, lognormal
+    value: float = 0.0  # for constant
+    low: float = 0.0  # for uniform
+    high: float = 0.0  # for uniform
+    mean: float = 0.0  # for exponential
+    median: float = 0.0  # for lognormal
+    sigma: float = 0.5  # for lognormal
+
+    def sample(self, rng: random.Random) -> float:
+        """Sample a latency."""
+        if self.distribution == "constant":
+            return self.value
+        if self.distribution == "uniform":
+            return rng.uniform(self.low, self.high)
+        if self.distribution == "exponential":
+            return rng.expovariate(1 / self.mean) if self.mean > 0 else 0.0
+        if self.distribution == "lognormal":
+            if self.median <= 0:
+                return 0.0
+            return rng.lognormvariate(math.log(self.median), self.sigma)
+        raise ValueError(f"Unknown latency distribution: {self.distribution}")
+
+
+class FakeSettings(BaseModel):
+    """Settings of the fake backend (the `fake` section of an `llms` entry)."""
+
+    model_config = ConfigDict(extra="forbid")
+
+    latency: FakeLatency = Field(default_factory=FakeLatency)
+    error_rate: float = 0.0  # probability of a server error (500)
+    rate_limit_rate: float = 0.0  # probability of a rate limit error (429)
+    seed: int = 0
+    responses: dict[str, Any] = Field(default_factory=dict)  # schema name -> answer
+
+
+def _api_error(status_code: int) -> openai.APIStatusError:
+    """Build the error the openai client raises for an HTTP status code."""
+    request = httpx.Request("POST", "https://fake-llm.local/v1/chat/completions")
+    response = httpx.Response(status_code, request=request)
+    if status_code == 429:
+        return openai.RateLimitError("Fake rate limit", response=response, body=None)
+    return openai.InternalServerError("Fake server error", response=response, body=None)
+
+
+class FakeChatModel(BaseChatModel):
+    """Chat model returning canned answers after a simulated latency."""
+
+    model_name: str = "fake"
+    settings: FakeSettings = Field(default_factory=FakeSettings)
+
+    _rng: random.Random = PrivateAttr()
+    _lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+
+    def model_post_init(self, context: Any) -> None:
+        self._rng = random.Random(self.settings.seed)
+
+    @property
+    def _llm_type(self) -> str:
+        return "qualiluma-fake"
+
+    def _draw(self) -> tuple[float, float]:
+        """Draw (latency, error dice) from the shared seeded generator."""
+        with self._lock:
+            return self.settings.latency.sample(self._rng), self._rng.random()
+
+    def _answer(self, schema: type | None) -> str:
+        if schema is None:
+            return "good"
+        return json.dumps(self._answer_object(schema))
+
+    def _answer_object(self, schema: type) -> Any:
+        """Answer for a schema, composed of the answers of its required models."""
+        name = schema.__name__
+        answer = self.settings.responses.get(name, DEFAULT_RESPONSES.get(name))
+        if answer is not None:
+            return answer
+        assert issubclass(schema, BaseModel), f"Unsupported schema {schema}"
+        nested = {
+            field_name: self._answer_object(field.annotation)
+            for field_name, field in schema.model_fields.items()
+            if field.is_required()
+            and isinstance(field.annotation, type)
+            and issubclass(field.annotation, BaseModel)
+        }
+        return schema(**nested).model_dump(mode="json")
+
+    def _generate(
+        self,
+        messages: list[BaseMessage],
+        stop: list[str] | None = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        latency, dice = self._draw()
+        if latency > 0:
+            time.sleep(latency)
+        if dice < self.settings.rate_limit_rate:
+            raise _api_error(429)
+        if dice < self.settings.rate_limit_rate + self.settings.error_rate:
+            raise _api_error(500)
+
+        content = self._answer(kwargs.get("schema"))
+        prompt_chars = sum(len(str(m.content)) for m in messages)
+        input_tokens = prompt_chars // CHARS_PER_TOKEN + 1
+        output_tokens = len(content) // CHARS_PER_TOKEN + 1
+        message = AIMessage(
+            content=content,
+            usage_metadata={
+                "input_tokens": input_tokens,
+                "output_tokens": output_tokens,
+                "total_tokens": input_tokens + output_tokens,
+            },
+            response_metadata={"model_name": self.model_name},
+        )
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def with_structured_output(  # type: ignore[override]
+        self, schema: Any, **kwargs: Any
+    ) -> Runnable:
+        """Model answering with JSON for the schema, followed by a parser."""
+
+        def parse(message: AIMessage) -> Any:
+            return schema.model_validate_json(message.content)
+
+        return self.bind(schema=schema) | RunnableLambda(parse)
@@ -0,0 +1,126 @@
+"""
+Git revisions as file sources, to check a commit without checking it out.
+
+Files are listed once with `git ls-tree -r` and read through one
+long-running `git cat-file --batch` process, so checking a revision costs
+neither a working tree on the disk nor a process per file. The blob SHA of
+a file is its content key: result caches reuse results of identical files,
+within and across revisions.
+"""
+
+import subprocess
+import threading
+from pathlib import Path
+
+from .logs import get_logger
+from .sources import FileSourceABC
+
+logger = get_logger(__name__)
+
+SHORT_SHA = 12  # commit SHA characters in virtual roots
+_REGULAR_MODES = {"100644", "100755"}  # not symlinks (120000) or submodules
+
+
+class GitError(Exception):
+    """A git command failed, e.g. for an unknown revision."""
+
+
+def _git(repo: Path, *args: str) -> bytes:
+    try:
+        result = subprocess.run(
+            ["git", "-C", str(repo), *args], capture_output=True, check=True
+        )
+    except FileNotFoundError:
+        raise GitError("git is not installed") from None
+    except subprocess.CalledProcessError as e:
+        raise GitError(e.stderr.decode(errors="replace").strip()) from None
+    return result.stdout
+
+
+class GitRevisionSource(FileSourceABC):
+    """The files of a git revision, under `<repository>@<short commit SHA>`."""
+
+    def __init__(self, repo: Path, rev: str):
+        """Init source, listing the files of the revision.
+
+        Args:
+            repo: The repository, or any path inside its working tree.
+            rev: The revision, e.g. a commit SHA, a branch or a tag.
+
+        Raises:
+            GitError: If the path is not in a repository or the revision is unknown.
+        """
+        start = repo if repo.is_dir() else repo.parent
+        self.repo = Path(_git(start, "rev-parse", "--show-toplevel").decode().strip())
+        self.rev = rev
+        self.commit, commit_time = (
+            _git(self.repo, "show", "-s", "--format=%H %ct", f"{rev}^{{commit}}")
+            .decode()
+            .split()
+        )
+        mtime_ns = int(commit_time) * 1_000_000_000
+        super().__init__(Path(f"{self.repo}@{self.commit[:SHORT_SHA]}"))
+
+        self._blobs: dict[Path, str] = {}
+        listing = _git(self.repo, "ls-tree", "-r", "-z", "--long", self.commit)
+        for entry in listing.split(b"\0"):
+            if not entry:
+                continue
+            info, name = entry.split(b"\t", 1)
+            mode, kind, sha, size = info.decode().split()
+            if kind != "blob" or mode not in _REGULAR_MODES:
+                continue
+            path = self.root / name.decode(errors="surrogateescape")
+            self._blobs[path] = sha
+            self.add_file(path, (mtime_ns, int(size)))
+        logger.info(f"Revision {rev} ({self.commit[:SHORT_SHA]}): {len(self)} files")
+
+        self._lock = threading.Lock()
+        self._process: subprocess.Popen | None = None
+
+    def __str__(self) -> str:
+        return f"revision {self.rev} of {self.repo}"
+
+    def virtual_path(self, path: Path) -> Path:
+        """Get the path of the revision for a path of the working tree."""
+        return self.root / path.resolve().relative_to(self.repo.resolve())
+
+    def content_key(self, path: Path) -> str | None:
+        sha = self._blobs.get(path)
+        return f"git-blob:{sha}" if sha is not None else None
+
+    def read_bytes(self, path: Path) -> bytes:
+        sha = self._blobs.get(path)
+        if sha is None:
+            raise FileNotFoundError(f"No file {path} in {self}")
+        with self._lock:
+            process = self._cat_file()
+            assert process.stdin is not None and process.stdout is not None
+            process.stdin.write(sha.encode() + b"\n")
+            process.stdin.flush()
+            header = process.stdout.readline().split()
+            if len(header) != 3:
+                raise GitError(f"Cannot read {path} ({sha}): {header}")
+            data = process.stdout.read(int(header[2]))
+            process.stdout.read(1)  # the newline after the content
+        return data
+
+    def _cat_file(self) -> subprocess.Popen:
+        """Get the `git cat-file --batch` process, started on first use."""
+        if self._process is None or self._process.poll() is not None:
+            self._process = subprocess.Popen(
+                ["git", "-C", str(self.repo), "cat-file", "--batch"],
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+            )
+        return self._process
+
+    def close(self) -> None:
+        with self._lock:
+            if self._process is not None:
+                assert self._process.stdin is not None
+                assert self._process.stdout is not None
+                self._process.stdin.close()
+                self._process.wait()
+                self._process.stdout.close()
+                self._process = None
@@ -1,19 +1,372 @@
 """Utility functions for file operations."""
 
+import bisect
+import codecs
+import hashlib
+import itertools
+import mmap
+import os
+import re
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
 from pathlib import Path
+from typing import NamedTuple
+
+from .metrics import stage
+from .sources import FileKey, find_source, stat_key
+
+MMAP_MIN_BYTES = 1_000_000  # larger files are memory-mapped
+SNIFF_BYTES = 8192  # file head used to detect binary content and the encoding
+FALLBACK_ENCODING = "cp1252"  # for text that is not valid UTF-8
+RECENT_FILES = 16  # loaded files kept for the next loads of the same file
+
+# longer BOMs first, the UTF-32 LE one starts with the UTF-16 LE one
+_BOMS = [
+    (codecs.BOM_UTF32_LE, "utf-32"),
+    (codecs.BOM_UTF32_BE, "utf-32"),
+    (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16"),
+]
+# PEP 263, in the first two lines
+_CODING_COOKIE = re.compile(rb"^[ \t\f]*#.*?coding[:=][ \t]*([-\w.]+)", re.MULTILINE)
+
+
+class BinaryFileError(ValueError):
+    """The file content is not text."""
+
+
+class _Decoded(NamedTuple):
+    """A decoded content, with what decoding removed from the text."""
+
+    encoding: str  # the encoding used, FALLBACK_ENCODING if the detected one failed
+    text: str  # newlines translated to "\n"
+    decode_error: tuple[int, int] | None  # (line, byte value) of the first bad byte
+    crlf: tuple[int, int] | None  # (first line, count) of "\r\n" line ends
+
+
+def detect_encoding(head: bytes) -> str | None:
+    """Detect the encoding of a file from its head.
+
+    Args:
+        head: The first bytes of the file, see SNIFF_BYTES.
+
+    Returns:
+        The encoding name, None if the content is binary.
+    """
+    for bom, encoding in _BOMS:
+        if head.startswith(bom):
+            return encoding
+    if b"\0" in head:
+        return None
+    first_lines = b"\n".join(head.split(b"\n", 2)[:2])
+    match = _CODING_COOKIE.search(first_lines)
+    if match is not None:
+        try:
+            return codecs.lookup(match.group(1).decode("ascii")).name
+        except LookupError:
+            pass  # unknown cookies are ignored, as by editors
+    return "utf-8"
+
+
+class SourceFile:
+    """The content of a file, read once and decoded on demand.
+
+    The text, its lines and the numbered text are computed once and shared
+    by all users of the file, e.g. hashing for caches and LLM prompts.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        key: FileKey,
+        encoding: str | None,
+        data: bytes | None = None,
+        decoded: _Decoded | None = None,
+        digest: str | None = None,
+    ):
+        """Init source file. Give either data, or both decoded and digest.
+
+        Args:
+            path: The path of the file.
+            key: (mtime_ns, size) of the file when read.
+            encoding: The detected encoding, None for binary content.
+            data: The raw content.
+            decoded: The decoded content (or None if binary).
+            digest: The SHA-256 hex digest of the raw content, or another
+                content key of the file source (e.g. a git blob SHA).
+        """
+        self.path = path
+        self.key = key
+        self.encoding = encoding
+        # detected by the BOM (the text is without it), see `detect_encoding`
+        self.has_bom = encoding in ("utf-8-sig", "utf-16", "utf-32")
+        self._data = data
+        self._decoded = decoded
+        if decoded is not None:
+            self.encoding = decoded.encoding
+        self._digest = digest
+        self._lines: list[str] | None = None
+        self._line_offsets: list[int] | None = None
+        self._numbered: str | None = None
+
+    @property
+    def is_binary(self) -> bool:
+        return self.encoding is None
+
+    @property
+    def size(self) -> int:
+        return self.key[1]
+
+    @property
+    def digest(self) -> str:
+        """The content key, e.g. for cache keys: SHA-256 hex digest by default."""
+        if self._digest is None:
+            assert self._data is not None
+            self._digest = hashlib.sha256(self._data).hexdigest()
+        return self._digest
+
+    @property
+    def text(self) -> str:
+        """The decoded content, with newlines translated to "\\n".
+
+        Raises:
+            BinaryFileError: If the content is binary.
+        """
+        if self.encoding is None:
+            raise BinaryFileError(f"Binary file: {self.path}")
+        return self._decode().text
+
+    @property
+    def decode_error(self) -> tuple[int, int] | None:
+        """(line, byte value) of the first byte invalid in the detected encoding."""
+        return self._decode().decode_error
+
+    @property
+    def crlf(self) -> tuple[int, int] | None:
+        """(first line, count) of Windows line ends, translated in the text."""
+        return self._decode().crlf
+
+    def _decode(self) -> _Decoded:
+        if self.encoding is None:
+            raise BinaryFileError(f"Binary file: {self.path}")
+        if self._decoded is None:
+            assert self._data is not None
+            self._decoded = _decode(self._data, self.encoding)
+            self.encoding = self._decoded.encoding
+        return self._decoded
+
+    @property
+    def lines(self) -> list[str]:
+        """The lines of the text, without newlines."""
+        if self._lines is None:
+            self._lines = _split_lines(self.text)
+        return self._lines
+
+    @property
+    def line_offsets(self) -> list[int]:
+        """The text offsets of the line starts, line N starts at [N - 1]."""
+        if self._line_offsets is None:
+            lengths = (len(line) + 1 for line in self.lines)
+            self._line_offsets = list(itertools.accumulate(lengths, initial=0))[:-1]
+        return self._line_offsets
+
+    def line_at(self, offset: int) -> int:
+        """Get the 1-based line number of a text offset."""
+        return max(bisect.bisect_right(self.line_offsets, offset), 1)
+
+    @property
+    def numbered(self) -> str:
+        """The text with line numbers and without trailing whitespace."""
+        if self._numbered is None:
+            # the lines are kept only if something else needed them already
+            lines = self._lines if self._lines is not None else _split_lines(self.text)
+            self._numbered = "\n".join(
+                f"{i}: {line.rstrip()}" for i, line in enumerate(lines, 1)
+            )
+        return self._numbered
+
+
+def _split_lines(text: str) -> list[str]:
+    """Split a text into lines without newlines, a final newline ends the last."""
+    lines = text.split("\n") if text else []
+    if text.endswith("\n"):
+        lines.pop()
+    return lines
+
+
+def _decode(data: bytes | mmap.mmap, encoding: str) -> _Decoded:
+    """Decode a content, falling back to FALLBACK_ENCODING for invalid UTF-8."""
+    decode_error = None
+    try:
+        text = codecs.decode(data, encoding)
+    except UnicodeDecodeError as e:
+        bad = e.object  # the content after the BOM, for "utf-8-sig"
+        decode_error = (bad.count(b"\n", 0, e.start) + 1, bad[e.start])
+        encoding = FALLBACK_ENCODING
+        text = codecs.decode(bad, encoding, "replace")
+    crlf = None
+    if "\r" in text:  # as in text mode, with universal newlines
+        first = text.find("\r\n")
+        if first >= 0:
+            crlf = (text.count("\n", 0, first) + 1, text.count("\r\n"))
+        text = text.replace("\r\n", "\n").replace("\r", "\n")
+    return _Decoded(encoding, text, decode_error, crlf)
+
+
+def read_file(file_path: Path) -> SourceFile:
+    """Read a file once, without metrics and caching.
+
+    Large files are memory-mapped, then decoded and hashed straight from
+    the mapping, without copying them to a bytes object first. Files of
+    mounted sources (see sources.py) are read through their source.
+
+    Args:
+        file_path (Path): The path to the file to read.
+
+    Returns:
+        SourceFile: The content of the file.
+    """
+    source = find_source(file_path)
+    if source is not None:
+        data = source.read_bytes(file_path)
+        return SourceFile(
+            file_path,
+            source.stat_key(file_path),
+            detect_encoding(data[:SNIFF_BYTES]),
+            data,
+            digest=source.content_key(file_path),
+        )
+
+    with file_path.open("rb") as f:
+        stat = os.fstat(f.fileno())
+        key = (stat.st_mtime_ns, stat.st_size)
+        if stat.st_size < MMAP_MIN_BYTES:
+            data = f.read()
+            return SourceFile(file_path, key, detect_encoding(data[:SNIFF_BYTES]), data)
+
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            encoding = detect_encoding(mm[:SNIFF_BYTES])
+            decoded = _decode(mm, encoding) if encoding is not None else None
+            digest = hashlib.sha256(mm).hexdigest()
+        return SourceFile(file_path, key, encoding, decoded=decoded, digest=digest)
+
+
+class _PrefetchBuffer:
+    """Files read ahead by `prefetch.Prefetcher`, by path."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._futures: dict[Path, Future[SourceFile]] = {}
+
+    def put(self, file_path: Path, future: Future[SourceFile]) -> None:
+        with self._lock:
+            self._futures[file_path] = future
+
+    def take(self, file_path: Path) -> Future[SourceFile] | None:
+        """Take a file out of the buffer, None if not there."""
+        with self._lock:
+            return self._futures.pop(file_path, None)
+
+    def discard(self, file_path: Path, future: Future[SourceFile]) -> None:
+        """Drop a file, unless replaced by another read."""
+        with self._lock:
+            if self._futures.get(file_path) is future:
+                del self._futures[file_path]
+
+
+PREFETCH_BUFFER = _PrefetchBuffer()
+
+
+class _RecentFiles:
+    """The last loaded files, valid while their mtime and size are unchanged."""
+
+    def __init__(self, max_files: int):
+        self.max_files = max_files
+        self._lock = threading.Lock()
+        self._files: OrderedDict[Path, SourceFile] = OrderedDict()
+
+    def get(self, file_path: Path, key: FileKey) -> SourceFile | None:
+        with self._lock:
+            source = self._files.get(file_path)
+            if source is None or source.key != key:
+                return None
+            self._files.move_to_end(file_path)
+            return source
+
+    def put(self, source: SourceFile) -> None:
+        with self._lock:
+            self._files[source.path] = source
+            self._files.move_to_end(source.path)
+            while len(self._files) > self.max_files:
+                self._files.popitem(last=False)
+
+
+_RECENT_FILES = _RecentFiles(RECENT_FILES)
+
+
+def load_file(file_path: Path) -> SourceFile:
+    """Load a file, reusing a read ahead or a recent load of the same content.
+
+    Args:
+        file_path (Path): The path to the file to load.
+
+    Returns:
+        SourceFile: The content of the file.
+    """
+    with stage("read"):
+        key = stat_key(file_path)
+        source = _RECENT_FILES.get(file_path, key)
+        if source is not None:
+            return source
+
+        prefetched = PREFETCH_BUFFER.take(file_path)
+        if prefetched is not None and not prefetched.cancelled():
+            source = prefetched.result()  # re-raises read errors
+        if source is None or source.key != key:  # changed since read ahead
+            source = read_file(file_path)
+        _RECENT_FILES.put(source)
+        return source
 
 
 def load_numbered(file_path: Path) -> str:
     """Load a file and return its content with line numbers.
 
-    This function preserves the original indentation of the code by using
-    rstrip() instead of strip(), which is important for Python code.
+    This function preserves the original indentation of the code by
+    stripping trailing whitespace only, which is important for Python code.
+    The encoding is detected (BOM, coding cookie, UTF-8 or FALLBACK_ENCODING).
 
     Args:
         file_path (Path): The path to the file to load.
 
     Returns:
         str: The content of the file with line numbers.
+
+    Raises:
+        BinaryFileError: If the file content is binary.
+    """
+    source = load_file(file_path)
+    with stage("read"):
+        return source.numbered
+
+
+def file_digest(file_path: Path) -> str:
+    """Get the SHA-256 hex digest of a file content, e.g. for cache keys.
+
+    The content is kept for a following `load_numbered` of the same file.
+    Files of sources knowing their content key (e.g. git blob SHAs) are
+    not read.
+
+    Args:
+        file_path (Path): The path to the file to hash.
+
+    Returns:
+        str: The hex digest.
     """
-    with file_path.open("r") as f:
-        return "\n".join(f"{i}: {line.rstrip()}" for i, line in enumerate(f, start=1))
+    source = find_source(file_path)
+    if source is not None:
+        key = source.content_key(file_path)
+        if key is not None:
+            return key
+    return load_file(file_path).digest
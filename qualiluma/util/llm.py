@@ -1,27 +1,132 @@
 """Module for LLMs usage"""
 
+import collections
+import concurrent.futures
+import contextvars
+import email.utils
+import functools
+import json
 import os
+import threading
+import time
 import typing as tp
 import warnings
+from contextlib import contextmanager
+from functools import partial
 from pathlib import Path
 
 import dotenv
+import openai
 from langchain_core.callbacks import UsageMetadataCallbackHandler
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, LLMResult
 from langchain_openai import ChatOpenAI
-
-from ..util.config import CONFIG_PATH, _yaml_read
-from .logs import get_logger
-
-CONFIG = _yaml_read(CONFIG_PATH)
+from openai.lib._parsing import type_to_response_format_param
+from pydantic import BaseModel
+
+from ..util.config import read_config_file
+from . import batch, deadline, metrics
+from .balancer import Endpoint, EndpointBalancer
+from .cassette import Cassette, get_cassette, request_key
+from .circuit import CIRCUIT_PROBE_INTERVAL, CIRCUIT_THRESHOLD, CircuitBreaker
+from .fake_llm import FakeChatModel, FakeSettings
+from .logs import get_logger, log_payload
+
+CONFIG = read_config_file()
 _LLM_CLIENTS: dict[str, "LLMClient"] = {}
+_LLM_OVERRIDES: dict[str, tp.Any] = {}  # applied to every `llms` config entry
 USAGE_HANDLER = UsageMetadataCallbackHandler()
 
 logger = get_logger(__name__)
 
 
+class LLMCancelledError(Exception):
+    """LLM request was cancelled, e.g. because its file changed meanwhile."""
+
+
+class LLMTimeoutError(Exception):
+    """LLM request took longer than the timeout of its client."""
+
+
+# errors worth retrying, the rest (e.g. authentication) fail immediately
+RETRYABLE_ERRORS = (
+    openai.APIConnectionError,
+    openai.APITimeoutError,
+    openai.RateLimitError,
+    openai.InternalServerError,
+    LLMTimeoutError,
+)
+# errors of the provider rather than of a request, counted by the circuit breaker
+OUTAGE_ERRORS = RETRYABLE_ERRORS + (
+    openai.AuthenticationError,
+    openai.PermissionDeniedError,
+)
+RETRY_BASE_DELAY = 0.5  # seconds, doubled on every retry
+MAX_RETRY_AFTER = 60.0  # seconds, longer Retry-After headers are capped
+CANCEL_POLL_INTERVAL = 0.02  # seconds between cancellation checks
+DEFAULT_TIMEOUT = 120.0  # seconds per request, `timeout` of an `llms` entry
+HEDGE_QUANTILE = 0.95  # a duplicate is sent once a request is slower than this
+HEDGE_MIN_SAMPLES = 20  # latencies observed before hedging starts
+HEDGE_WINDOW = 200  # latest latencies used for the quantile
+LLM_POOL_WORKERS = 32
+
+# set by `cancellable()`, requests of the current context stop once it is set
+_CANCEL_EVENT: contextvars.ContextVar[threading.Event | None] = contextvars.ContextVar(
+    "llm_cancel_event", default=None
+)
+# runs requests, so that callers can stop waiting for them
+_LLM_POOL = concurrent.futures.ThreadPoolExecutor(
+    max_workers=LLM_POOL_WORKERS, thread_name_prefix="qualiluma-llm"
+)
+
+_PRICING_KEYS = {
+    "input_noncached_per_1m",
+    "output_per_1m",
+    "input_cached_per_1m",
+}
+
 T = tp.TypeVar("T")
 
 
+@contextmanager
+def cancellable(event: threading.Event) -> tp.Iterator[None]:
+    """Cancel LLM requests made in the block once the event is set.
+
+    A cancelled request raises LLMCancelledError in the caller immediately.
+    The HTTP request itself is abandoned, its response is ignored and its
+    usage is counted when it arrives.
+
+    Args:
+        event: The event to set to cancel the requests.
+    """
+    token = _CANCEL_EVENT.set(event)
+    try:
+        yield
+    finally:
+        _CANCEL_EVENT.reset(token)
+
+
+class LatencyTracker:
+    """Latencies of the latest successful requests of a client."""
+
+    def __init__(self, window: int = HEDGE_WINDOW):
+        self._lock = threading.Lock()
+        self._latencies: collections.deque[float] = collections.deque(maxlen=window)
+
+    def add(self, seconds: float) -> None:
+        with self._lock:
+            self._latencies.append(seconds)
+
+    def quantile(self, q: float) -> float | None:
+        """Get a quantile of the latencies, None if too few were observed."""
+        with self._lock:
+            values = sorted(self._latencies)
+        if len(values) < HEDGE_MIN_SAMPLES:
+            return None
+        return values[min(int(len(values) * q), len(values) - 1)]
+
+
 class LLMClient(tp.Generic[T]):
     """Simple wrapper to use only our simple for now logic"""
 
@@ -32,46 +137,269 @@ class LLMClient(tp.Generic[T]):
             name: The name of the LLM client to use (e.g. default if we have more)
         """
 
+        self.name = name
         self.llm_config: tp.Any = CONFIG["llms"].get(name, {})
-        self.client: ChatOpenAI | None = None
+        if self.llm_config:
+            self.llm_config = {**self.llm_config, **_LLM_OVERRIDES}
+        self.client: BaseChatModel | None = None  # of the first endpoint
+        self.balancer: EndpointBalancer | None = None
+        # retries are done by us (not by ChatOpenAI) to count them in metrics
+        self.max_retries: int = self.llm_config.get("max_retries", 2)
+        self.model_name: str = self.llm_config.get("model", "")
+        # seconds to wait for a response (None: no limit), then retried
+        self.timeout: float | None = self.llm_config.get("timeout", DEFAULT_TIMEOUT)
+        # send a duplicate of requests slower than the observed HEDGE_QUANTILE
+        self.hedge: bool = self.llm_config.get("hedge", False)
+        self.latencies = LatencyTracker()
+        # shared by all checkers using the client, see get_llm_client()
+        self.circuit = CircuitBreaker(
+            name,
+            threshold=self.llm_config.get("circuit_threshold", CIRCUIT_THRESHOLD),
+            probe_interval=self.llm_config.get(
+                "circuit_probe_interval", CIRCUIT_PROBE_INTERVAL
+            ),
+        )
+        # responses are recorded to / replayed from the cassette if set
+        self.cassette: Cassette | None = None
+        self.replay = False
 
         if not self.llm_config:
             warnings.warn(f"No configuration found for LLM client '{name}'")
             return
 
+        if self.llm_config.get("replay"):
+            # no backend is needed to replay recorded responses
+            self.cassette = get_cassette(self.llm_config["replay"])
+            self.replay = True
+            return
+        if self.llm_config.get("record"):
+            self.cassette = get_cassette(self.llm_config["record"])
+
+        endpoints = []
+        entry = {k: v for k, v in self.llm_config.items() if k != "endpoints"}
+        for index, endpoint_config in enumerate(self.llm_config.get("endpoints", [{}])):
+            # endpoint keys override the entry ones, overrides apply to all
+            config = {**entry, **endpoint_config, **_LLM_OVERRIDES}
+            client = self._create_client(config)
+            if client is None:
+                continue
+            endpoints.append(
+                Endpoint(
+                    config.get("base_url") or f"{name}[{index}]",
+                    client,
+                    model_name=config.get("model", ""),
+                    weight=config.get("weight", 1.0),
+                    max_concurrency=config.get("max_concurrency"),
+                )
+            )
+        if endpoints:
+            self.balancer = EndpointBalancer(endpoints)
+            self.client = endpoints[0].client
+
+    def _create_client(self, config: dict) -> BaseChatModel | None:
+        """Create the chat model of an endpoint, or None if not configured."""
+        backend = config.get("backend", "openai")
+        if backend == "fake":
+            return FakeChatModel(
+                model_name=config.get("model", "fake"),
+                settings=FakeSettings(**config.get("fake", {})),
+            )
+        if backend == "openai":
+            return self._create_openai_client(config)
+        raise ValueError(f"Unknown LLM backend '{backend}' for client '{self.name}'")
+
+    def _create_openai_client(self, config: dict) -> ChatOpenAI | None:
+        """Create the OpenAI client, or None if the API key is not set."""
         dotenv.load_dotenv(Path(__file__).parents[2] / ".env")
-        OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", None)
+        # local OpenAI-compatible servers may set any key in the config
+        OPENAI_API_KEY = config.get("api_key") or os.getenv("OPENAI_API_KEY", None)
 
         if not OPENAI_API_KEY:
             warnings.warn(
                 "OPENAI_API_KEY is not set. Please set it to use the LLM checker."
             )
-            return
-
-        self.client = ChatOpenAI(
-            model=self.llm_config.get("model"),
-            timeout=None,
-            max_retries=2,
-            max_tokens=self.llm_config["max_tokens"],
+            return None
+
+        return ChatOpenAI(
+            model=config.get("model"),
+            api_key=OPENAI_API_KEY,
+            base_url=config.get("base_url"),
+            timeout=config.get("timeout", DEFAULT_TIMEOUT),
+            max_retries=0,
+            max_tokens=config["max_tokens"],
         )
 
     def is_initialized(self) -> bool:
         """Check if the LLM client is initialized"""
-        return self.client is not None
+        return self.balancer is not None or self.replay
 
-    def __call__(self, query: str) -> str:
-        assert self.client, "LLM client is not initialized"
+    def _invoke(
+        self, query: str, schema: type | None = None
+    ) -> tuple[tp.Any, dict, Endpoint]:
+        """Send a query with retries, recording usage and latency metrics.
 
-        response = self.client.invoke(
-            [("user", query)],  # or system?
-            # max_tokens=self.llm_config["max_tokens"],
-            config={"callbacks": [USAGE_HANDLER]},
+        Retries go to another endpoint without waiting if one is up. Failed
+        calls (after retries) are counted by the circuit breaker of the client.
+
+        Args:
+            query: The prompt to send.
+            schema: The pydantic model of structured output, plain text if None.
+
+        Returns:
+            The model output, the usage metadata of the call by model, and the
+            endpoint that answered.
+
+        Raises:
+            LLMUnavailableError: If the circuit of the client is open.
+        """
+        assert self.balancer is not None, "LLM client has no endpoints"
+        probe = self.circuit.before_call()
+        retries = 0
+        ok: bool | None = None
+        try:
+            with metrics.stage("llm_latency"):
+                while True:
+                    try:
+                        res = self._request(query, schema)
+                        ok = True
+                        return res
+                    except RETRYABLE_ERRORS as e:
+                        if retries >= self.max_retries or _is_quota_error(e):
+                            raise
+                        if len(self.balancer.endpoints) > 1 and self.balancer.any_up():
+                            delay = 0.0  # fail over, a rate limited one stays out
+                        else:
+                            delay = max(
+                                RETRY_BASE_DELAY * 2**retries, _retry_after(e) or 0.0
+                            )
+                        retries += 1
+                        logger.debug("LLM request failed ({}), retry in {}s", e, delay)
+                        _sleep(delay)
+        except OUTAGE_ERRORS:
+            ok = False
+            raise
+        finally:
+            self.circuit.record(ok, probe)
+            metrics.add_llm_usage(retries=retries)  # tokens come with requests
+
+    def _request(
+        self, query: str, schema: type | None
+    ) -> tuple[tp.Any, dict, Endpoint]:
+        """Send a request, and a duplicate of it if it is slow and hedging is on.
+
+        The first successful response wins. The duplicate goes to another
+        endpoint if possible. Waiting stops at the timeout, at the run
+        deadline or on cancellation; abandoned requests still record their
+        usage to the current file when they finish.
+
+        Raises:
+            LLMTimeoutError: If no response came within the timeout.
+            LLMCancelledError: If the request was cancelled.
+            DeadlineExceededError: If the run deadline was reached.
+        """
+        assert self.balancer is not None
+        cancel = _CANCEL_EVENT.get()
+        _check_stopped(cancel)
+        endpoint = self.balancer.acquire(check_stopped=lambda: _check_stopped(cancel))
+        assert endpoint is not None
+        start = time.monotonic()
+        hedge_after = self.latencies.quantile(HEDGE_QUANTILE) if self.hedge else None
+        futures = {self._submit(endpoint, query, schema): endpoint}
+        try:
+            while True:
+                for future, endpoint in futures.items():
+                    if future.done() and future.exception() is None:
+                        return (*future.result(), endpoint)
+                pending = [future for future in futures if not future.done()]
+                if not pending:
+                    future = next(iter(futures))
+                    return (*future.result(), endpoint)  # raises the error
+
+                elapsed = time.monotonic() - start
+                waits = [deadline.remaining()]
+                if self.timeout is not None:
+                    waits.append(self.timeout - elapsed)
+                if hedge_after is not None and len(futures) == 1:
+                    waits.append(hedge_after - elapsed)
+                if cancel is not None:
+                    waits.append(CANCEL_POLL_INTERVAL)
+                limits = [wait for wait in waits if wait is not None]
+                concurrent.futures.wait(
+                    pending,
+                    timeout=max(min(limits), 0.0) if limits else None,
+                    return_when=concurrent.futures.FIRST_COMPLETED,
+                )
+                if any(future.done() for future in pending):
+                    continue
+
+                _check_stopped(cancel)
+                elapsed = time.monotonic() - start
+                if self.timeout is not None and elapsed >= self.timeout:
+                    for future in pending:
+                        self.balancer.report_failure(futures[future])
+                    raise LLMTimeoutError(f"No LLM response in {self.timeout}s")
+                hedge_due = hedge_after is not None and elapsed >= hedge_after
+                if hedge_due and len(futures) == 1:
+                    first = next(iter(futures.values()))
+                    other = self.balancer.acquire(avoid=first, wait=False)
+                    if other is not None:
+                        logger.debug(
+                            "LLM request slower than {:.2f}s, hedging", hedge_after
+                        )
+                        futures[self._submit(other, query, schema, hedges=1)] = other
+                    else:
+                        hedge_after = None  # no capacity left for a duplicate
+        finally:
+            for future, endpoint in futures.items():
+                # requests not started yet are dropped, running ones abandoned
+                if future.cancel():
+                    self.balancer.release(endpoint, None)
+
+    def _submit(
+        self, endpoint: Endpoint, query: str, schema: type | None, hedges: int = 0
+    ) -> concurrent.futures.Future:
+        """Start a request in the pool, in a copy of the current context."""
+        assert self.balancer is not None
+        runnable, _parser = endpoint.runnable(schema)
+        context = contextvars.copy_context()
+        return _LLM_POOL.submit(
+            context.run,
+            _attempt,
+            runnable,
+            query,
+            self.latencies,
+            hedges,
+            partial(self.balancer.release, endpoint),
         )
+
+    def _replay(self, key: str) -> tp.Any:
+        """Get the recorded output of a request.
+
+        Raises:
+            CassetteMissError: If the request was not recorded.
+        """
+        assert self.cassette is not None, "No cassette to replay"
+        entry = self.cassette.get(key)
+        metrics.add_llm_usage()  # the call is counted, but nothing is spent
+        return entry["output"]
+
+    def __call__(self, query: str) -> str:
+        assert self.is_initialized(), "LLM client is not initialized"
+
+        key = request_key(self.model_name, "", "", query)
+        if self.replay:
+            return self._replay(key)
+
+        response, usage, _endpoint = self._invoke(query)
         res = response.content
         assert isinstance(res, str), f"LLM response is not a string: {type(res)}"
-        logger.debug(f"Usage: {response.usage_metadata}")
+        logger.debug("Usage: {}", response.usage_metadata)
+        log_payload(__name__, "response", res)
 
-        return res.strip()
+        res = res.strip()
+        if self.cassette is not None:
+            self.cassette.record(key, self.model_name, "", res, usage)
+        return res
 
     def structured_output(self, query: str, answer_schema: type[T]) -> T:
         """Get structured output from the LLM client using pydantic
@@ -82,18 +410,217 @@ class LLMClient(tp.Generic[T]):
         Returns:
             The structured output from the LLM client
         """
-        assert self.client, "LLM client is not initialized"
-
-        client_structured = self.client.with_structured_output(answer_schema)
-        res = client_structured.invoke(
-            [("user", query)],
-            config={"callbacks": [USAGE_HANDLER]},
+        assert self.is_initialized(), "LLM client is not initialized"
+        assert issubclass(answer_schema, BaseModel), "Schema must be a pydantic model"
+
+        key = request_key(
+            self.model_name,
+            answer_schema.__name__,
+            _schema_signature(answer_schema),
+            query,
+        )
+        if self.replay:
+            output = self._replay(key)
+            with metrics.stage("parse"):
+                return answer_schema.model_validate(output)  # type: ignore
+        session = batch.current_session()
+        if session is not None:
+            return self._batched(session, key, query, answer_schema)
+
+        res, usage, endpoint = self._invoke(query, answer_schema)
+        _runnable, parser = endpoint.runnable(answer_schema)
+        if parser is not None:
+            # the model and the output parser run separately to measure parsing
+            with metrics.stage("parse"):
+                res = parser.invoke(res)
+        assert isinstance(res, answer_schema), (
+            f"LLM structured response is not of type {answer_schema}: {res}"
         )
-        assert isinstance(
-            res, answer_schema
-        ), f"LLM structured response is not of type {answer_schema}: {res}"
+        log_payload(__name__, "response", res)
+
+        if self.cassette is not None:
+            self.cassette.record(
+                key,
+                self.model_name,
+                answer_schema.__name__,
+                res.model_dump(mode="json"),
+                usage,
+            )
         return res
 
+    def _batched(
+        self,
+        session: batch.BatchSession,
+        key: str,
+        query: str,
+        answer_schema: type[T],
+    ) -> T:
+        """Get the answer of a request from a batch, or queue it for the next one.
+
+        Raises:
+            BatchPendingError: If the request is queued.
+            BatchRequestError: If the batch API failed the request.
+        """
+        answer = session.answer(key)
+        if answer is None:
+            session.add(key, self.name, self._batch_body(query, answer_schema))
+            raise batch.BatchPendingError(batch.BATCH_PENDING)
+
+        body, first_use = answer
+        model = body.get("model", self.model_name) + batch.BATCH_SUFFIX
+        usage = batch.usage_metadata(body)
+        if first_use:  # later rounds use the answer again, for the same file
+            message = AIMessage(
+                content="",
+                usage_metadata=usage,
+                response_metadata={"model_name": model},
+            )
+            USAGE_HANDLER.on_llm_end(
+                LLMResult(generations=[[ChatGeneration(message=message)]])
+            )
+        metrics.add_llm_usage()
+        _record_usage({model: usage})
+        with metrics.stage("parse"):
+            res = batch.parse_output(body, answer_schema)
+        log_payload(__name__, "response", res)
+        return res  # type: ignore
+
+    def _batch_body(self, query: str, answer_schema: type) -> dict[str, tp.Any]:
+        """Build the chat completion request body of a batch line.
+
+        Raises:
+            ValueError: If the client has no OpenAI backend.
+        """
+        assert self.balancer is not None, "LLM client has no endpoints"
+        runnable, _parser = self.balancer.endpoints[0].runnable(answer_schema)
+        chat_model = getattr(runnable, "bound", runnable)
+        if not isinstance(chat_model, ChatOpenAI):
+            raise ValueError(f"Batch mode needs the openai backend ({self.name})")
+        kwargs = {
+            name: value
+            for name, value in getattr(runnable, "kwargs", {}).items()
+            if not name.startswith("ls_")  # tracing metadata
+        }
+        body = chat_model._get_request_payload([("user", query)], **kwargs)
+        body.pop("stream", None)
+        if isinstance(body.get("response_format"), type):
+            body["response_format"] = type_to_response_format_param(
+                body["response_format"]
+            )
+        return body
+
+    def batch_api(self) -> openai.OpenAI:
+        """Get the OpenAI API of the first endpoint, to send batches.
+
+        Raises:
+            ValueError: If the client has no OpenAI backend.
+        """
+        client = self.client
+        if not isinstance(client, ChatOpenAI):
+            raise ValueError(f"Batch mode needs the openai backend ({self.name})")
+        return client.root_client
+
+
+def _attempt(
+    runnable: tp.Any,
+    query: str,
+    latencies: LatencyTracker,
+    hedges: int,
+    release: tp.Callable[[bool | None, float | None], None],
+) -> tuple[tp.Any, dict]:
+    """Send one request, recording its usage to the current file when it ends.
+
+    Args:
+        runnable: The model of the endpoint (or its structured output part).
+        query: The prompt to send.
+        latencies: Gets the latency of a successful request.
+        hedges: 1 if the request is a hedged duplicate.
+        release: Returns the endpoint slot, with the endpoint health and the
+            delay asked for by a rate limited response.
+
+    Returns:
+        The runnable output and the usage metadata of the request by model.
+    """
+    usage = UsageMetadataCallbackHandler()
+    start = time.monotonic()
+    ok: bool | None = None
+    retry_after = None
+    try:
+        res = runnable.invoke(
+            [("user", query)],  # or system?
+            config={"callbacks": [USAGE_HANDLER, usage]},
+        )
+        ok = True
+        latencies.add(time.monotonic() - start)
+        return res, dict(usage.usage_metadata)
+    except RETRYABLE_ERRORS as e:
+        ok = False
+        retry_after = _retry_after(e)
+        raise
+    finally:
+        release(ok, retry_after)
+        _record_usage(usage.usage_metadata, hedges=hedges)
+
+
+def _is_quota_error(error: Exception) -> bool:
+    """Check if an error means that the quota of the API key is used up."""
+    return getattr(error, "code", None) == "insufficient_quota"
+
+
+def _retry_after(error: Exception) -> float | None:
+    """Get the delay a rate limited response asks for, from its headers.
+
+    Reads `retry-after-ms` (OpenAI) or `Retry-After` in seconds or as an HTTP
+    date, capped at MAX_RETRY_AFTER.
+
+    Returns:
+        The delay in seconds, None if the error is no rate limit or has none.
+    """
+    if not isinstance(error, openai.RateLimitError):
+        return None
+    headers = error.response.headers
+    seconds = None
+    try:
+        if "retry-after-ms" in headers:
+            seconds = float(headers["retry-after-ms"]) / 1000
+        elif "retry-after" in headers:
+            seconds = float(headers["retry-after"])
+    except ValueError:
+        try:
+            date = email.utils.parsedate_to_datetime(headers.get("retry-after", ""))
+            seconds = date.timestamp() - time.time()
+        except (TypeError, ValueError):
+            pass
+    if seconds is None:
+        return None
+    return min(max(seconds, 0.0), MAX_RETRY_AFTER)
+
+
+def _check_stopped(cancel: threading.Event | None) -> None:
+    """Raise if the requests of the current context should stop."""
+    if cancel is not None and cancel.is_set():
+        raise LLMCancelledError("LLM request cancelled")
+    deadline.check_deadline()
+
+
+def _sleep(seconds: float) -> None:
+    """Sleep, waking up early on cancellation or at the run deadline."""
+    cancel = _CANCEL_EVENT.get()
+    remaining = deadline.remaining()
+    if remaining is not None:
+        seconds = min(seconds, remaining)
+    if cancel is None:
+        time.sleep(seconds)
+    else:
+        cancel.wait(seconds)
+    _check_stopped(cancel)
+
+
+@functools.cache
+def _schema_signature(answer_schema: type[BaseModel]) -> str:
+    """Canonical JSON of a schema, to invalidate recordings on schema changes."""
+    return json.dumps(answer_schema.model_json_schema(), sort_keys=True)
+
 
 def get_llm_client(name: str = "fast") -> LLMClient | None:
     """
@@ -111,37 +638,110 @@ def get_llm_client(name: str = "fast") -> LLMClient | None:
     return _LLM_CLIENTS.get(name, None)
 
 
-def log_llm_pricing(config: dict | None = None) -> float:
+def get_batch_api(name: str) -> openai.OpenAI:
+    """Get the OpenAI API of an LLM client, to send batches."""
+    client = get_llm_client(name)
+    assert client is not None, f"LLM client '{name}' is not initialized"
+    return client.batch_api()
+
+
+def configure_llms(**overrides: tp.Any) -> None:
+    """Override settings of all configured LLM clients, e.g. `backend="fake"`.
+
+    Already created clients are dropped, so that the next `get_llm_client()`
+    call creates them with the new settings.
+
+    Args:
+        overrides: Settings replacing values of every `llms` config entry.
+    """
+    _LLM_OVERRIDES.clear()
+    _LLM_OVERRIDES.update(overrides)
+    _LLM_CLIENTS.clear()
+
+
+def _split_usage(usage: tp.Mapping[str, tp.Any]) -> tuple[int, int, int]:
+    """Split usage metadata into (non-cached input, cached input, output) tokens."""
+    input_cached = usage.get("input_token_details", {}).get("cache_read", 0)
+    input_non_cached = usage.get("input_tokens", 0) - input_cached
+    output_tokens = usage.get("output_tokens", 0)  # includes reasoning
+    return input_non_cached, input_cached, output_tokens
+
+
+def _usage_cost(usage: tp.Mapping[str, tp.Any], model_config: dict) -> float:
+    """Compute the cost of usage with the model pricing configuration."""
+    input_non_cached, input_cached, output_tokens = _split_usage(usage)
+    return (
+        input_non_cached * model_config["input_noncached_per_1m"] / 1_000_000
+        + output_tokens * model_config["output_per_1m"] / 1_000_000
+        + input_cached * model_config["input_cached_per_1m"] / 1_000_000
+    )
+
+
+def _model_pricing(pricing: dict, model: str) -> dict:
+    """Get the pricing of a model, scaled for batched usage (BATCH_SUFFIX)."""
+    if model in pricing:
+        return pricing[model]
+    base_model = model.removesuffix(batch.BATCH_SUFFIX)
+    if base_model != model and base_model in pricing:
+        return {
+            name: price * batch.BATCH_PRICE_FACTOR
+            for name, price in pricing[base_model].items()
+        }
+    return {}
+
+
+def _record_usage(usage_by_model: tp.Mapping[str, tp.Any], hedges: int = 0) -> None:
+    """Attribute the usage of a single LLM request to the currently checked file.
+
+    The call itself is counted by the caller, once for all its retries.
+    """
+    pricing = CONFIG.get("llm_pricing", {})
+    if hedges:
+        metrics.add_llm_usage(calls=0, hedges=hedges)
+    for model, usage in usage_by_model.items():
+        input_non_cached, input_cached, output = _split_usage(usage)
+        cost = 0.0
+        model_config = _model_pricing(pricing, model)
+        if _PRICING_KEYS <= set(model_config):
+            cost = _usage_cost(usage, model_config)
+        metrics.add_llm_usage(
+            input_tokens=input_non_cached + input_cached,
+            output_tokens=output,
+            cached_tokens=input_cached,
+            cost=cost,
+            calls=0,
+            model=model,
+        )
+
+
+def log_llm_pricing(
+    config: dict | None = None,
+    usage_metadata: tp.Mapping[str, tp.Any] | None = None,
+) -> float:
     """Log the LLM usage and pricing information.
 
     Args:
         config: The pricing configuration for LLM usage.
+        usage_metadata: Usage by model, usage of this process if not provided.
 
     Returns:
         The total cost of LLM usage.
     """
     if config is None:
         config = CONFIG.get("llm_pricing", {})
+    if usage_metadata is None:
+        usage_metadata = USAGE_HANDLER.usage_metadata
 
     incomplete_info = False
     cost_by_model = {}
-    for model, usage in USAGE_HANDLER.usage_metadata.items():
-        input_cached = usage.get("input_cached_details", {}).get("cache_read", 0)
-        input_non_cached = usage.get("input_tokens", 0) - input_cached
-        output_tokens = usage.get("output_tokens", 0)  # includes reasoning
-
-        if model not in config:
+    for model, usage in usage_metadata.items():
+        model_config = _model_pricing(config, model)
+        if not model_config:
             logger.warning(f"No pricing configuration found for model '{model}'")
             incomplete_info = True
             continue
 
-        model_config = config.get(model, {})
-        required_keys = {
-            "input_noncached_per_1m",
-            "output_per_1m",
-            "input_cached_per_1m",
-        }
-        missing_keys = required_keys - set(model_config.keys())
+        missing_keys = _PRICING_KEYS - set(model_config.keys())
         if missing_keys:
             logger.warning(
                 f"Incomplete pricing configuration for model '{model}', missing keys: {missing_keys}"
@@ -149,11 +749,7 @@ def log_llm_pricing(config: dict | None = None) -> float:
             incomplete_info = True
             continue
 
-        cost_by_model[model] = (
-            input_non_cached * model_config["input_noncached_per_1m"] / 1_000_000
-            + output_tokens * model_config["output_per_1m"] / 1_000_000
-            + input_cached * model_config["input_cached_per_1m"] / 1_000_000
-        )
+        cost_by_model[model] = _usage_cost(usage, model_config)
 
     incomplete_str = " (INCOMPLETE info)" if incomplete_info else ""
     for model, cost in cost_by_model.items():
@@ -161,3 +757,25 @@ def log_llm_pricing(config: dict | None = None) -> float:
     total_cost = sum(cost_by_model.values())
     logger.info(f"Total LLM Cost{incomplete_str}: ${total_cost:.4f}")
     return total_cost
+
+
+def log_usage_breakdown(top_files: int = metrics.TOP_FILES) -> None:
+    """Log the LLM usage of this process by checker and model, and the top files.
+
+    Args:
+        top_files: The number of most expensive files to list (0 for none).
+    """
+    for row in metrics.METRICS.usage_breakdown(("checker", "tier", "model")):
+        logger.info(
+            f"LLM usage of {row['checker']} ({row['tier']}) with {row['model']}:"
+            f" {row['input_tokens']} input tokens ({row['cached_tokens']} cached),"
+            f" {row['output_tokens']} output tokens, ${row['cost']:.4f}"
+        )
+    files = metrics.METRICS.top_files(top_files) if top_files > 0 else []
+    if files:
+        logger.info(f"Most expensive {len(files)} files:")
+    for row in files:
+        logger.info(
+            f"  ${row['cost']:.4f} {row['file']}"
+            f" ({row['input_tokens'] + row['output_tokens']} tokens)"
+        )
@@ -1,30 +1,50 @@
 from __future__ import annotations
 
 import sys
+from typing import Any
 
 import loguru
 from loguru import logger
 
+PAYLOAD_LOG_MAX_BYTES = 50_000_000
+
+_payload_logging_enabled = False
+
 
 def init_logging(
-    log_file: str, file_log_level: str = "DEBUG", console_log_level: str = "INFO"
+    log_file: str,
+    file_log_level: str = "INFO",
+    console_log_level: str = "INFO",
+    payload_log_file: str | None = None,
+    payload_log_max_bytes: int = PAYLOAD_LOG_MAX_BYTES,
 ) -> None:
     """Set logging configuration.
 
+    File sinks write through a background queue, so that logging doesn't block
+    checking threads on disk I/O. Call `flush_logging()` to wait for them.
+
     Args:
         log_file (str): Path to the log file.
         file_log_level (str): Logging level for the file.
         console_log_level (str): Logging level for the console.
+        payload_log_file (str | None): Path to the log of large payloads (prompts,
+            responses). Payloads are not logged if not provided.
+        payload_log_max_bytes (int): Size of the payload log to rotate at.
+            Only one rotated file is kept, so it takes at most twice that size.
     """
+    global _payload_logging_enabled
     logger.remove()  # Remove default logger
 
     def filter_simplified(record):
         return record["extra"].get("logger_type") == "results"
 
     def filter_default(record):
-        return record["extra"].get("logger_type") not in ["results"]
+        return record["extra"].get("logger_type") not in ["results", "payload"]
+
+    def filter_payload(record):
+        return record["extra"].get("logger_type") == "payload"
 
-    logger.add(log_file, level=file_log_level, filter=filter_default)
+    logger.add(log_file, level=file_log_level, filter=filter_default, enqueue=True)
     logger.add(sys.stdout, level=console_log_level, filter=filter_default)
 
     logger.add(
@@ -32,6 +52,7 @@ def init_logging(
         format="...:<cyan>{line}</cyan> | <level>{level: <8}</level> | {message}",
         filter=filter_simplified,
         level=file_log_level,
+        enqueue=True,
     )
     logger.add(
         sys.stdout,
@@ -40,6 +61,23 @@ def init_logging(
         level=console_log_level,
     )
 
+    _payload_logging_enabled = payload_log_file is not None
+    if payload_log_file is not None:
+        logger.add(
+            payload_log_file,
+            format="{time:YYYY-MM-DD HH:mm:ss.SSS} | {extra[name]} | {message}",
+            filter=filter_payload,
+            level="DEBUG",
+            rotation=payload_log_max_bytes,
+            retention=1,
+            enqueue=True,
+        )
+
+
+def flush_logging() -> None:
+    """Wait until queued log messages are written."""
+    logger.complete()
+
 
 def get_logger(name: str, results_mode: bool = False) -> loguru.Logger:
     """Get a logger with the specified name.
@@ -52,3 +90,18 @@ def get_logger(name: str, results_mode: bool = False) -> loguru.Logger:
         loguru.Logger: A logger instance.
     """
     return logger.bind(name=name, logger_type="results" if results_mode else "default")
+
+
+def log_payload(name: str, kind: str, payload: Any) -> None:
+    """Log a large payload (prompt, response) to the separate payload log.
+
+    Does nothing (and doesn't format the payload) if the payload log is disabled.
+
+    Args:
+        name (str): Name of the logger, e.g. module name.
+        kind (str): Short payload description, e.g. "prompt".
+        payload (Any): The payload, converted to string only if logged.
+    """
+    if not _payload_logging_enabled:
+        return
+    logger.bind(name=name, logger_type="payload").debug("{}:\n{}", kind, payload)
@@ -0,0 +1,338 @@
+"""Per-checker, per-file metrics collection and export.
+
+Every checked file gets a `FileMetrics` record. Code running while the file is
+checked (file loading, prompt building, LLM calls) adds its measurements to the
+current record with `stage()` and `add_llm_usage()`, without passing the record
+around explicitly.
+
+LLM usage is kept per model in every record, so that tokens and cost can be
+broken down by (checker, file, directory, model, tier) with `usage_breakdown()`.
+"""
+
+import json
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, Iterator, Sequence
+
+from pydantic import BaseModel, Field
+
+from .tracing import TRACER
+
+STAGES = ("queue_wait", "read", "prompt_build", "llm_latency", "parse")
+QUANTILES = (0.5, 0.95, 0.99)
+USAGE_KEYS = ("checker", "file", "directory", "model", "tier")  # breakdown keys
+TOP_FILES = 10  # most expensive files in reports
+
+
+class ModelUsage(BaseModel):
+    """LLM usage of one model."""
+
+    input_tokens: int = 0
+    output_tokens: int = 0
+    cached_tokens: int = 0
+    cost: float = 0.0
+
+    def add(self, other: "ModelUsage") -> None:
+        self.input_tokens += other.input_tokens
+        self.output_tokens += other.output_tokens
+        self.cached_tokens += other.cached_tokens
+        self.cost += other.cost
+
+
+class FileMetrics(BaseModel):
+    """Measurements collected while one checker processed one file."""
+
+    checker: str
+    file: str
+    tier: str | None = None  # cost tier of the checker
+    durations: dict[str, float] = Field(default_factory=dict)  # seconds per stage
+    llm_calls: int = 0
+    retries: int = 0
+    hedges: int = 0  # duplicates of slow requests, their usage is included
+    input_tokens: int = 0
+    output_tokens: int = 0
+    cached_tokens: int = 0
+    cost: float = 0.0
+    models: dict[str, ModelUsage] = Field(default_factory=dict)  # usage by model
+
+    def add_duration(self, stage_name: str, seconds: float) -> None:
+        """Accumulate time spent in a stage (stages may repeat, e.g. LLM calls)."""
+        self.durations[stage_name] = self.durations.get(stage_name, 0.0) + seconds
+
+
+_CURRENT: ContextVar[FileMetrics | None] = ContextVar("current_metrics", default=None)
+# hedged and abandoned requests may add usage to a record from other threads
+_USAGE_LOCK = threading.Lock()
+
+
+def current() -> FileMetrics | None:
+    """Get the metrics record of the file being checked, if any."""
+    return _CURRENT.get()
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """Measure the wall time of a code block as a stage of the current file.
+
+    The stage is also recorded as a trace span if tracing is enabled.
+    """
+    record = _CURRENT.get()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        end = time.perf_counter()
+        if record is not None:
+            record.add_duration(name, end - start)
+        if TRACER.enabled:
+            args = {"checker": record.checker, "file": record.file} if record else {}
+            TRACER.add_span(name, start, end, args)
+
+
+def add_llm_usage(
+    input_tokens: int = 0,
+    output_tokens: int = 0,
+    cached_tokens: int = 0,
+    cost: float = 0.0,
+    retries: int = 0,
+    calls: int = 1,
+    hedges: int = 0,
+    model: str | None = None,
+) -> None:
+    """Attribute the usage of one LLM call to the current file.
+
+    The requests of a call (retries, hedged duplicates) add their usage
+    separately with `calls=0`, per model.
+    """
+    record = _CURRENT.get()
+    if record is None:
+        return
+    with _USAGE_LOCK:
+        record.llm_calls += calls
+        record.retries += retries
+        record.hedges += hedges
+        record.input_tokens += input_tokens
+        record.output_tokens += output_tokens
+        record.cached_tokens += cached_tokens
+        record.cost += cost
+        if model is not None:
+            record.models.setdefault(model, ModelUsage()).add(
+                ModelUsage(
+                    input_tokens=input_tokens,
+                    output_tokens=output_tokens,
+                    cached_tokens=cached_tokens,
+                    cost=cost,
+                )
+            )
+
+
+def _percentile(sorted_values: list[float], q: float) -> float:
+    """Percentile with linear interpolation between closest ranks."""
+    if not sorted_values:
+        return 0.0
+    pos = (len(sorted_values) - 1) * q
+    low = int(pos)
+    high = min(low + 1, len(sorted_values) - 1)
+    return sorted_values[low] + (sorted_values[high] - sorted_values[low]) * (pos - low)
+
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class MetricsRegistry:
+    """Thread-safe storage of file metrics with aggregation and export."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.records: list[FileMetrics] = []
+
+    @contextmanager
+    def track(
+        self,
+        checker: str,
+        file_path: Path,
+        queued_at: float | None = None,
+        tier: str | None = None,
+    ) -> Iterator[FileMetrics]:
+        """Make a new record current for the duration of a file check.
+
+        Args:
+            checker: The name of the checker.
+            file_path: The file being checked.
+            queued_at: `time.perf_counter()` value when the file was scheduled,
+                used to compute the queue wait.
+            tier: The cost tier of the checker, for usage breakdowns.
+        """
+        record = FileMetrics(checker=checker, file=str(file_path), tier=tier)
+        if queued_at is not None:
+            record.add_duration("queue_wait", time.perf_counter() - queued_at)
+
+        token = _CURRENT.set(record)
+        try:
+            yield record
+        finally:
+            _CURRENT.reset(token)
+            with self._lock:
+                self.records.append(record)
+
+    def add(self, record: FileMetrics) -> None:
+        """Add a record collected elsewhere, e.g. in a worker process."""
+        with self._lock:
+            self.records.append(record)
+
+    def clear(self) -> None:
+        """Drop all collected records."""
+        with self._lock:
+            self.records = []
+
+    def summary(self) -> dict[str, Any]:
+        """Aggregate records per checker into totals and duration histograms.
+
+        Returns:
+            dict: checker name -> totals and p50/p95/p99 for each stage.
+        """
+        with self._lock:
+            records = list(self.records)
+
+        by_checker: dict[str, list[FileMetrics]] = {}
+        for record in records:
+            by_checker.setdefault(record.checker, []).append(record)
+
+        summary: dict[str, Any] = {}
+        for checker, checker_records in by_checker.items():
+            stages = {}
+            for stage_name in STAGES:
+                values = sorted(
+                    r.durations[stage_name]
+                    for r in checker_records
+                    if stage_name in r.durations
+                )
+                if not values:
+                    continue
+                stages[stage_name] = {
+                    "count": len(values),
+                    "sum": sum(values),
+                    **{f"p{int(q * 100)}": _percentile(values, q) for q in QUANTILES},
+                }
+
+            summary[checker] = {
+                "files": len(checker_records),
+                "llm_calls": sum(r.llm_calls for r in checker_records),
+                "retries": sum(r.retries for r in checker_records),
+                "hedges": sum(r.hedges for r in checker_records),
+                "input_tokens": sum(r.input_tokens for r in checker_records),
+                "output_tokens": sum(r.output_tokens for r in checker_records),
+                "cached_tokens": sum(r.cached_tokens for r in checker_records),
+                "cost": sum(r.cost for r in checker_records),
+                "stages": stages,
+            }
+        return summary
+
+    def _usage_rows(self) -> list[dict[str, Any]]:
+        """Get the LLM usage of every (record, model) pair as a flat row."""
+        with self._lock, _USAGE_LOCK:
+            records = [r.model_copy(deep=True) for r in self.records]
+        rows = []
+        for record in records:
+            for model, usage in record.models.items():
+                rows.append(
+                    {
+                        "checker": record.checker,
+                        "file": record.file,
+                        "directory": str(Path(record.file).parent),
+                        "model": model,
+                        "tier": record.tier,
+                        **usage.model_dump(),
+                    }
+                )
+        return rows
+
+    def usage_breakdown(
+        self, by: Sequence[str] = ("checker", "model")
+    ) -> list[dict[str, Any]]:
+        """Aggregate LLM usage by some of USAGE_KEYS.
+
+        Args:
+            by: The keys to group by, e.g. ("directory",) or ("checker", "tier").
+
+        Returns:
+            list[dict]: One row per group, with the keys, tokens and cost,
+                the most expensive first.
+        """
+        unknown = set(by) - set(USAGE_KEYS)
+        assert not unknown, f"Unknown usage keys {unknown}, expected {USAGE_KEYS}"
+        groups: dict[tuple, ModelUsage] = {}
+        for row in self._usage_rows():
+            group = tuple(row[key] for key in by)
+            groups.setdefault(group, ModelUsage()).add(ModelUsage.model_validate(row))
+        breakdown = [
+            {**dict(zip(by, group)), **usage.model_dump()}
+            for group, usage in groups.items()
+        ]
+        breakdown.sort(key=lambda row: (-row["cost"], -row["input_tokens"]))
+        return breakdown
+
+    def top_files(self, n: int = TOP_FILES) -> list[dict[str, Any]]:
+        """Get the n files with the most LLM cost (then tokens), all checkers included."""
+        return self.usage_breakdown(("file",))[:n]
+
+    def export_json(self, file_path: Path) -> None:
+        """Write the summary, the usage breakdown and all per-file records as JSON."""
+        with self._lock:
+            records = [r.model_dump() for r in self.records]
+        data = {
+            "checkers": self.summary(),
+            "usage": self.usage_breakdown(("checker", "tier", "model")),
+            "top_files": self.top_files(),
+            "files": records,
+        }
+        file_path.write_text(json.dumps(data, indent=2))
+
+    def export_prometheus(self, file_path: Path) -> None:
+        """Write the summary in the Prometheus textfile exposition format."""
+        summary = self.summary()
+        lines = [
+            "# HELP qualiluma_stage_seconds Time spent per file in a check stage.",
+            "# TYPE qualiluma_stage_seconds summary",
+        ]
+        for checker, info in summary.items():
+            checker_label = f'checker="{_escape_label(checker)}"'
+            for stage_name, hist in info["stages"].items():
+                labels = f'{checker_label},stage="{stage_name}"'
+                for q in QUANTILES:
+                    value = hist[f"p{int(q * 100)}"]
+                    lines.append(
+                        f'qualiluma_stage_seconds{{{labels},quantile="{q}"}} {value}'
+                    )
+                lines.append(f"qualiluma_stage_seconds_sum{{{labels}}} {hist['sum']}")
+                lines.append(
+                    f"qualiluma_stage_seconds_count{{{labels}}} {hist['count']}"
+                )
+
+        counters = {
+            "files": ("files", "Files processed by the checker."),
+            "llm_calls": ("llm_calls", "LLM requests sent by the checker."),
+            "retries": ("llm_retries", "LLM request retries."),
+            "hedges": ("llm_hedges", "Duplicates sent for slow LLM requests."),
+            "input_tokens": ("input_tokens", "LLM input tokens (including cached)."),
+            "output_tokens": ("output_tokens", "LLM output tokens."),
+            "cached_tokens": ("cached_tokens", "LLM input tokens read from cache."),
+            "cost": ("cost_dollars", "LLM cost in dollars."),
+        }
+        for key, (name, help_text) in counters.items():
+            lines.append(f"# HELP qualiluma_{name}_total {help_text}")
+            lines.append(f"# TYPE qualiluma_{name}_total counter")
+            for checker, info in summary.items():
+                lines.append(
+                    f'qualiluma_{name}_total{{checker="{_escape_label(checker)}"}}'
+                    f" {info[key]}"
+                )
+
+        file_path.write_text("\n".join(lines) + "\n")
+
+
+METRICS = MetricsRegistry()
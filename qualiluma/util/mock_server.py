@@ -0,0 +1,461 @@
+#!/usr/bin/env python3
+"""
+Lightweight OpenAI-compatible mock server for end-to-end load testing.
+
+Serves `POST /v1/chat/completions` (plain, structured output and tool-call
+answers with usage metadata) and `GET /v1/models`, with configurable latency,
+rate limiting and errors. A stand-in of the Batch API (`/v1/files`,
+`/v1/batches`) answers batches of chat completions after `batch_latency`.
+Point an `llms` config entry to it with `base_url`:
+
+    llms:
+      fast:
+        model: gpt-4.1-mini-2025-04-14
+        max_tokens: 16_384
+        base_url: http://127.0.0.1:8000/v1
+        api_key: not-needed
+
+Usage:
+    python -m qualiluma.util.mock_server --port 8000 --latency 0.5
+"""
+
+import argparse
+import email.parser
+import email.policy
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+
+from pydantic import BaseModel, ConfigDict, Field
+
+from .fake_llm import CHARS_PER_TOKEN, DEFAULT_RESPONSES, FakeLatency
+
+
+class MockServerSettings(BaseModel):
+    """Behaviour of the mock server."""
+
+    model_config = ConfigDict(extra="forbid")
+
+    latency: FakeLatency = Field(default_factory=FakeLatency)
+    error_rate: float = 0.0  # probability of a server error (500)
+    rate_limit_rate: float = 0.0  # probability of a rate limit error (429)
+    max_concurrency: int | None = None  # more concurrent requests get 429
+    retry_after: float = 0.0  # seconds, sent with 429 responses
+    batch_latency: float = 0.0  # seconds until a batch completes
+    seed: int = 0
+    responses: dict[str, Any] = Field(default_factory=dict)  # schema name -> answer
+
+
+def example_from_schema(
+    schema: dict[str, Any], defs: dict[str, Any] | None = None
+) -> Any:
+    """Build a minimal value valid for a JSON schema.
+
+    Arrays are empty, optional fields are skipped and enums take their first
+    value, which for checker schemas means a "no issues" answer.
+    """
+    defs = defs if defs is not None else schema.get("$defs", {})
+    if "$ref" in schema:
+        return example_from_schema(defs[schema["$ref"].split("/")[-1]], defs)
+    if "enum" in schema:
+        return schema["enum"][0]
+    if "const" in schema:
+        return schema["const"]
+    for key in ("anyOf", "oneOf", "allOf"):
+        if key in schema:
+            return example_from_schema(schema[key][0], defs)
+
+    type_ = schema.get("type", "object")
+    if isinstance(type_, list):
+        type_ = type_[0]
+    if type_ == "object":
+        properties = schema.get("properties", {})
+        return {
+            name: example_from_schema(properties[name], defs)
+            for name in schema.get("required", [])
+        }
+    return {
+        "array": [],
+        "string": "mock",
+        "integer": 1,
+        "number": 1.0,
+        "boolean": True,
+        "null": None,
+    }[type_]
+
+
+class MockOpenAIServer(ThreadingHTTPServer):
+    """HTTP server answering like the OpenAI chat completions API."""
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        settings: MockServerSettings | None = None,
+    ):
+        """Init server, port 0 selects a free port.
+
+        Args:
+            host: The host to listen on.
+            port: The port to listen on.
+            settings: The server behaviour.
+        """
+        super().__init__((host, port), _Handler)
+        self.settings = settings or MockServerSettings()
+        self.requests_count = 0
+        self.batch_requests_count = 0  # chat completions answered in batches
+        self.files: dict[str, bytes] = {}
+        self.batches: dict[str, dict[str, Any]] = {}
+        self._in_flight = 0
+        self._lock = threading.Lock()
+        self._rng = random.Random(self.settings.seed)
+        self._thread: threading.Thread | None = None
+
+    @property
+    def url(self) -> str:
+        """Base URL for the OpenAI client."""
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self) -> "MockOpenAIServer":
+        """Serve in a background thread."""
+        self._thread = threading.Thread(
+            target=self.serve_forever, name="qualiluma-mock-server", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Stop serving and close the socket."""
+        self.shutdown()
+        self.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self) -> "MockOpenAIServer":
+        return self.start()
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.stop()
+
+    def admit(self) -> tuple[int | None, float]:
+        """Decide how to answer a new request.
+
+        Returns:
+            (error status code or None, latency in seconds)
+        """
+        with self._lock:
+            self.requests_count += 1
+            latency = self.settings.latency.sample(self._rng)
+            dice = self._rng.random()
+            limit = self.settings.max_concurrency
+            if limit is not None and self._in_flight >= limit:
+                return 429, 0.0
+            self._in_flight += 1
+
+        if dice < self.settings.rate_limit_rate:
+            status = 429
+        elif dice < self.settings.rate_limit_rate + self.settings.error_rate:
+            status = 500
+        else:
+            return None, latency
+        self.release()
+        return status, latency
+
+    def release(self) -> None:
+        with self._lock:
+            self._in_flight -= 1
+
+    def completion(self, request: dict[str, Any]) -> dict[str, Any]:
+        """Build a chat completion answer for a request body."""
+        message: dict[str, Any] = {
+            "role": "assistant",
+            "content": None,
+            "refusal": None,
+        }
+        response_format = request.get("response_format") or {}
+        tools = request.get("tools") or []
+
+        if response_format.get("type") == "json_schema":
+            json_schema = response_format["json_schema"]
+            message["content"] = json.dumps(
+                self._answer(json_schema["name"], json_schema.get("schema", {}))
+            )
+        elif tools:
+            function = tools[0]["function"]
+            arguments = self._answer(function["name"], function.get("parameters", {}))
+            message["tool_calls"] = [
+                {
+                    "id": f"call_{uuid.uuid4().hex[:24]}",
+                    "type": "function",
+                    "function": {
+                        "name": function["name"],
+                        "arguments": json.dumps(arguments),
+                    },
+                }
+            ]
+        else:
+            message["content"] = "good"
+
+        prompt_chars = sum(len(str(m.get("content", ""))) for m in request["messages"])
+        prompt_tokens = prompt_chars // CHARS_PER_TOKEN + 1
+        output = message["content"] or json.dumps(message.get("tool_calls"))
+        completion_tokens = len(output) // CHARS_PER_TOKEN + 1
+        return {
+            "id": f"chatcmpl-{uuid.uuid4().hex}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", "mock"),
+            "choices": [
+                {
+                    "index": 0,
+                    "message": message,
+                    "finish_reason": "tool_calls" if tools else "stop",
+                    "logprobs": None,
+                }
+            ],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+                "prompt_tokens_details": {"cached_tokens": 0},
+            },
+        }
+
+    def create_file(self, filename: str, content: bytes, purpose: str) -> dict:
+        """Store an uploaded file, return the file object."""
+        file_id = f"file-{uuid.uuid4().hex[:24]}"
+        with self._lock:
+            self.files[file_id] = content
+        return {
+            "id": file_id,
+            "object": "file",
+            "bytes": len(content),
+            "created_at": int(time.time()),
+            "filename": filename,
+            "purpose": purpose,
+            "status": "processed",
+        }
+
+    def create_batch(self, request: dict[str, Any]) -> dict[str, Any]:
+        """Register a batch of the requests in an uploaded file."""
+        batch_id = f"batch_{uuid.uuid4().hex[:24]}"
+        batch = {
+            "id": batch_id,
+            "object": "batch",
+            "endpoint": request["endpoint"],
+            "completion_window": request["completion_window"],
+            "input_file_id": request["input_file_id"],
+            "metadata": request.get("metadata"),
+            "status": "in_progress",
+            "created_at": int(time.time()),
+            "request_counts": {"total": 0, "completed": 0, "failed": 0},
+        }
+        due = time.monotonic() + self.settings.batch_latency
+        with self._lock:
+            self.batches[batch_id] = {**batch, "_due": due}
+        return batch
+
+    def get_batch(self, batch_id: str) -> dict[str, Any] | None:
+        """Get a batch, answering its requests once it is due."""
+        with self._lock:
+            batch = self.batches.get(batch_id)
+            if batch is None:
+                return None
+            if batch["status"] == "in_progress" and time.monotonic() >= batch["_due"]:
+                self._run_batch(batch)
+            return {k: v for k, v in batch.items() if not k.startswith("_")}
+
+    def _run_batch(self, batch: dict[str, Any]) -> None:
+        """Answer the requests of a batch, with errors at `error_rate`."""
+        outputs, errors = [], []
+        for line in self.files[batch["input_file_id"]].decode().splitlines():
+            if not line.strip():
+                continue
+            request = json.loads(line)
+            self.batch_requests_count += 1
+            result: dict[str, Any] = {
+                "id": f"batch_req_{uuid.uuid4().hex[:24]}",
+                "custom_id": request["custom_id"],
+            }
+            if self._rng.random() < self.settings.error_rate:
+                error = {"message": "Mock error", "type": "mock_error"}
+                result["response"] = {"status_code": 500, "body": {"error": error}}
+                errors.append(result)
+            else:
+                body = self.completion(request["body"])
+                result["response"] = {"status_code": 200, "body": body}
+                outputs.append(result)
+
+        for key, results in (("output_file_id", outputs), ("error_file_id", errors)):
+            if results:
+                file_id = f"file-{uuid.uuid4().hex[:24]}"
+                self.files[file_id] = "".join(
+                    json.dumps(result) + "\n" for result in results
+                ).encode()
+                batch[key] = file_id
+        batch["status"] = "completed"
+        batch["completed_at"] = int(time.time())
+        batch["request_counts"] = {
+            "total": len(outputs) + len(errors),
+            "completed": len(outputs),
+            "failed": len(errors),
+        }
+
+    def _answer(self, name: str, schema: dict[str, Any]) -> Any:
+        if name in self.settings.responses:
+            return self.settings.responses[name]
+        if name in DEFAULT_RESPONSES:
+            return DEFAULT_RESPONSES[name]
+        return example_from_schema(schema)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: MockOpenAIServer
+    protocol_version = "HTTP/1.1"  # keep-alive, to exercise connection reuse
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass  # no per-request output
+
+    def _send_json(
+        self, status: int, body: Any, headers: dict[str, str] | None = None
+    ) -> None:
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_error(self, status: int, message: str) -> None:
+        headers = {}
+        if status == 429:
+            headers["Retry-After"] = str(self.server.settings.retry_after)
+        error = {"message": message, "type": "mock_error", "code": str(status)}
+        self._send_json(status, {"error": error}, headers)
+
+    def do_GET(self) -> None:
+        path = self.path.split("?")[0].rstrip("/")
+        parts = ["", "", *path.split("/")]  # the API prefix may be missing
+        if path.endswith("/models"):
+            self._send_json(200, {"object": "list", "data": []})
+        elif parts[-2] == "batches":
+            batch = self.server.get_batch(parts[-1])
+            if batch is None:
+                self._send_error(404, f"Unknown batch {parts[-1]}")
+            else:
+                self._send_json(200, batch)
+        elif parts[-1] == "content" and parts[-3] == "files":
+            content = self.server.files.get(parts[-2])
+            if content is None:
+                self._send_error(404, f"Unknown file {parts[-2]}")
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", "application/octet-stream")
+            self.send_header("Content-Length", str(len(content)))
+            self.end_headers()
+            self.wfile.write(content)
+        else:
+            self._send_error(404, f"Unknown path {self.path}")
+
+    def _upload(self, body: bytes) -> None:
+        """Store a multipart/form-data file upload."""
+        header = f"Content-Type: {self.headers['Content-Type']}\r\n\r\n".encode()
+        parser = email.parser.BytesParser(policy=email.policy.default)
+        message = parser.parsebytes(header + body)
+        fields: dict[str, Any] = {}
+        filename = "upload.jsonl"
+        for part in message.iter_parts():
+            name = part.get_param("name", header="content-disposition")
+            fields[name] = part.get_payload(decode=True)
+            if name == "file":
+                filename = part.get_filename() or filename
+        uploaded = self.server.create_file(
+            filename, fields["file"], fields.get("purpose", b"batch").decode()
+        )
+        self._send_json(200, uploaded)
+
+    def do_POST(self) -> None:
+        length = int(self.headers.get("Content-Length", 0))
+        body = self.rfile.read(length)
+        path = self.path.rstrip("/")
+        if path.endswith("/files"):
+            self._upload(body)
+            return
+        if path.endswith("/batches"):
+            self._send_json(200, self.server.create_batch(json.loads(body)))
+            return
+        if not path.endswith("/chat/completions"):
+            self._send_error(404, f"Unknown path {self.path}")
+            return
+
+        status, latency = self.server.admit()
+        if status is not None:
+            self._send_error(status, "Mock error")
+            return
+        try:
+            if latency > 0:
+                time.sleep(latency)
+            self._send_json(200, self.server.completion(json.loads(body)))
+        finally:
+            self.server.release()
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="OpenAI-compatible mock server for load testing",
+        prog="qualiluma.util.mock_server",
+    )
+    parser.add_argument("--host", type=str, default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument(
+        "--latency", type=float, default=0.0, help="Median latency in seconds"
+    )
+    parser.add_argument(
+        "--latency-sigma",
+        type=float,
+        default=0.0,
+        help="Sigma of the lognormal latency distribution (0 for constant)",
+    )
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0)
+    parser.add_argument("--max-concurrency", type=int, default=None)
+    parser.add_argument("--retry-after", type=float, default=0.0)
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    if args.latency_sigma > 0:
+        latency = FakeLatency(
+            distribution="lognormal", median=args.latency, sigma=args.latency_sigma
+        )
+    else:
+        latency = FakeLatency(distribution="constant", value=args.latency)
+    settings = MockServerSettings(
+        latency=latency,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        max_concurrency=args.max_concurrency,
+        retry_after=args.retry_after,
+    )
+    server = MockOpenAIServer(args.host, args.port, settings)
+    print(f"Serving OpenAI-compatible API at {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()  # pragma: no cover
@@ -0,0 +1,96 @@
+"""
+Read-ahead of file contents, overlapping disk and network reads with LLM latency.
+
+While a file waits for the LLM, the next files are read in a background I/O
+pool, so `load_file` (and `load_numbered`) finds them ready. The buffer is
+bounded both in files and in memory.
+"""
+
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Iterable, Iterator
+
+from .io import PREFETCH_BUFFER, SourceFile, read_file
+from .sources import stat_key
+
+PREFETCH_FILES = 32  # files read ahead of the consumer at most
+PREFETCH_BYTES = 64_000_000  # bytes of file contents buffered at most
+IO_WORKERS = 8
+
+_IO_POOL = ThreadPoolExecutor(max_workers=IO_WORKERS, thread_name_prefix="qualiluma-io")
+
+
+class Prefetcher:
+    """Reads files ahead of an iteration over them."""
+
+    def __init__(
+        self, max_files: int = PREFETCH_FILES, max_bytes: int = PREFETCH_BYTES
+    ):
+        """Init prefetcher.
+
+        Args:
+            max_files: Files read ahead of the consumer at most.
+            max_bytes: Sizes of the files read ahead at most. At least one
+                file is always read ahead, even if larger.
+        """
+        self.max_files = max_files
+        self.max_bytes = max_bytes
+        self._ahead: list[tuple[Path, Future[SourceFile], int]] = []
+        self._ahead_bytes = 0
+
+    def _fill(self, paths: Iterator[Path]) -> bool:
+        """Read ahead until a limit is hit.
+
+        Returns:
+            False if the paths are exhausted.
+        """
+        while len(self._ahead) < self.max_files and (
+            not self._ahead or self._ahead_bytes < self.max_bytes
+        ):
+            file_path = next(paths, None)
+            if file_path is None:
+                return False
+            try:
+                size = stat_key(file_path)[1]
+            except OSError:
+                size = 0  # the read reports the error
+            future = _IO_POOL.submit(read_file, file_path)
+            PREFETCH_BUFFER.put(file_path, future)
+            self._ahead.append((file_path, future, size))
+            self._ahead_bytes += size
+        return True
+
+    def _discard(self, file_path: Path, future: Future[SourceFile]) -> None:
+        """Drop content that was not used, e.g. of a skipped file."""
+        PREFETCH_BUFFER.discard(file_path, future)
+        future.cancel()
+
+    def iterate(self, file_paths: Iterable[Path]) -> Iterator[Path]:
+        """Yield the paths while reading the upcoming files in the background.
+
+        Contents not taken by `load_file` while their path is current
+        are dropped when the iteration moves on.
+
+        Args:
+            file_paths: The files to iterate over (may be a lazy iterator).
+
+        Yields:
+            The same paths, in the same order.
+        """
+        paths = iter(file_paths)
+        more = True
+        try:
+            while True:
+                if more:
+                    more = self._fill(paths)
+                if not self._ahead:
+                    return
+                file_path, future, size = self._ahead.pop(0)
+                self._ahead_bytes -= size
+                yield file_path
+                self._discard(file_path, future)
+        finally:
+            for file_path, future, _size in self._ahead:
+                self._discard(file_path, future)
+            self._ahead = []
+            self._ahead_bytes = 0
@@ -0,0 +1,192 @@
+"""Random sampling of checked files, to estimate issue rates of large repositories.
+
+A sample is reproducible: files are ranked by a stable hash of the seed and
+their path, so every checker (and every machine) checks the same files.
+With strata (top-level directory, file type), every stratum gets its share
+of the sample, and the issue rate is estimated with stratified weights.
+"""
+
+import math
+from pathlib import Path
+from statistics import NormalDist
+from typing import Iterable, Mapping
+
+from pydantic import BaseModel
+
+from .shard import _relative_key, stable_hash
+
+STRATA_KEYS = ("directory", "type")
+CONFIDENCE = 0.95  # level of the reported intervals
+
+
+class IssueRateEstimate(BaseModel):
+    """Estimated share of files with issues, from a sample."""
+
+    rate: float
+    low: float  # confidence interval bounds
+    high: float
+    confidence: float = CONFIDENCE
+    checked: int  # sampled files checked
+    with_issues: int  # sampled files with issues
+    population: float  # estimated files the checker would check in the whole tree
+
+
+class Sample:
+    """A random subset of the checked files, optionally stratified."""
+
+    def __init__(
+        self,
+        size: int | None = None,
+        fraction: float | None = None,
+        seed: int = 0,
+        strata: Iterable[str] = (),
+    ):
+        """Init sample. Give either size or fraction.
+
+        Args:
+            size: The number of files to check.
+            fraction: The share of files to check, in (0, 1].
+            seed: The seed of the random selection.
+            strata: Keys of STRATA_KEYS to stratify by.
+        """
+        if (size is None) == (fraction is None):
+            raise ValueError("Give either a sample size or a sample fraction")
+        if size is not None and size < 1:
+            raise ValueError(f"Invalid sample size {size}")
+        if fraction is not None and not 0 < fraction <= 1:
+            raise ValueError(f"Invalid sample fraction {fraction}")
+        self.size = size
+        self.fraction = fraction
+        self.seed = seed
+        self.strata = tuple(strata)
+        unknown = set(self.strata) - set(STRATA_KEYS)
+        if unknown:
+            raise ValueError(f"Unknown strata {unknown}, expected {STRATA_KEYS}")
+        # files per stratum of the last selection
+        self.population: dict[str, int] = {}
+        self._root: Path | None = None
+
+    def __str__(self) -> str:
+        amount = str(self.size) if self.size is not None else f"{self.fraction:.2%}"
+        strata = f" by {'+'.join(self.strata)}" if self.strata else ""
+        return f"{amount} files (seed {self.seed}){strata}"
+
+    def stratum(self, path: Path) -> str:
+        """Get the stratum of a file, e.g. "src|.py"."""
+        rel = _relative_key(path, self._root) if self._root is not None else str(path)
+        parts = []
+        for key in self.strata:
+            if key == "directory":
+                parts.append(rel.split("/")[0] if "/" in rel else ".")
+            else:
+                parts.append(Path(rel).suffix)
+        return "|".join(parts)
+
+    def select(self, file_paths: Iterable[Path], root: Path) -> list[Path]:
+        """Select the files of the sample.
+
+        Args:
+            file_paths: All files to check, in any order.
+            root: The checked root, paths are hashed relative to it.
+
+        Returns:
+            The sampled files, in the input order.
+        """
+        self._root = root
+        paths = list(file_paths)
+        by_stratum: dict[str, list[tuple[int, int]]] = {}
+        for index, path in enumerate(paths):
+            rank = stable_hash(f"{self.seed}:{_relative_key(path, root)}")
+            by_stratum.setdefault(self.stratum(path), []).append((rank, index))
+        self.population = {name: len(ranks) for name, ranks in by_stratum.items()}
+
+        selected = []
+        for name, count in self._allocate(len(paths)).items():
+            selected.extend(index for _rank, index in sorted(by_stratum[name])[:count])
+        return [paths[index] for index in sorted(selected)]
+
+    def _allocate(self, total: int) -> dict[str, int]:
+        """Split the sample size over strata in proportion to their files.
+
+        Remainders go to the strata with the largest fractional shares.
+        """
+        if self.size is not None:
+            size = min(self.size, total)
+        else:
+            assert self.fraction is not None
+            size = min(max(round(self.fraction * total), 1), total) if total else 0
+        shares = {name: size * count / total for name, count in self.population.items()}
+        counts = {name: math.floor(share) for name, share in shares.items()}
+        by_remainder = sorted(shares, key=lambda name: counts[name] - shares[name])
+        for name in by_remainder[: size - sum(counts.values())]:
+            counts[name] += 1
+        return counts
+
+    def estimate(self, outcomes: Mapping[Path, bool | None]) -> IssueRateEstimate:
+        """Estimate the share of files with issues from the results of a checker.
+
+        Files not checked (e.g. skipped by gates) are left out: the rate is
+        among the files the checker would check.
+
+        Args:
+            outcomes: Sampled file -> whether it has issues, None if not checked.
+
+        Returns:
+            IssueRateEstimate: The stratified estimate, with a Wilson interval
+                at the effective sample size of the design.
+        """
+        sampled: dict[str, int] = {}
+        checked: dict[str, int] = {}
+        with_issues: dict[str, int] = {}
+        for path, has_issues in outcomes.items():
+            name = self.stratum(path)
+            sampled[name] = sampled.get(name, 0) + 1
+            if has_issues is not None:
+                checked[name] = checked.get(name, 0) + 1
+                with_issues[name] = with_issues.get(name, 0) + int(has_issues)
+
+        n_checked = sum(checked.values())
+        n_issues = sum(with_issues.values())
+        if not n_checked:
+            return IssueRateEstimate(
+                rate=0.0, low=0.0, high=1.0, checked=0, with_issues=0, population=0.0
+            )
+
+        # files the checker would check per stratum, scaled from the sample
+        population = {
+            name: self.population.get(name, sampled[name]) * n / sampled[name]
+            for name, n in checked.items()
+        }
+        total = sum(population.values())
+        rate = variance = 0.0
+        for name, n in checked.items():
+            weight = population[name] / total
+            p = with_issues[name] / n
+            fpc = 1 - sampled[name] / max(self.population.get(name, 0), sampled[name])
+            rate += weight * p
+            variance += weight**2 * fpc * p * (1 - p) / max(n - 1, 1)
+
+        effective_n = rate * (1 - rate) / variance if variance > 0 else n_checked
+        if variance == 0 and all(
+            sampled[name] >= self.population.get(name, 0) for name in checked
+        ):
+            low = high = rate  # every file was checked
+        else:
+            low, high = _wilson(rate, effective_n, CONFIDENCE)
+        return IssueRateEstimate(
+            rate=rate,
+            low=low,
+            high=high,
+            checked=n_checked,
+            with_issues=n_issues,
+            population=total,
+        )
+
+
+def _wilson(rate: float, n: float, confidence: float) -> tuple[float, float]:
+    """Wilson score interval of a proportion."""
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+    denominator = 1 + z**2 / n
+    center = (rate + z**2 / (2 * n)) / denominator
+    margin = z * math.sqrt(rate * (1 - rate) / n + z**2 / (4 * n**2)) / denominator
+    return max(center - margin, 0.0), min(center + margin, 1.0)
@@ -0,0 +1,87 @@
+"""Deterministic split of checked files across CI nodes."""
+
+import hashlib
+from pathlib import Path
+from typing import Iterable
+
+from .sources import is_file, stat_key
+
+
+class Shard:
+    """One of N disjoint parts of the checked files.
+
+    Files are assigned by a stable hash of their path relative to the checked
+    root, so every node computes the same split without coordination. With
+    `by_size`, files are instead distributed greedily by size (largest first),
+    which balances nodes better but needs the whole file list.
+    """
+
+    def __init__(self, index: int, count: int, by_size: bool = False):
+        """Init shard.
+
+        Args:
+            index: 1-based index of the shard.
+            count: The number of shards.
+            by_size: Whether to balance shards by file sizes.
+        """
+        if count < 1 or not 1 <= index <= count:
+            raise ValueError(f"Invalid shard {index}/{count}")
+        self.index = index
+        self.count = count
+        self.by_size = by_size
+
+    @classmethod
+    def parse(cls, spec: str, by_size: bool = False) -> "Shard":
+        """Parse a shard specification like "2/4"."""
+        try:
+            index, count = (int(part) for part in spec.split("/"))
+        except ValueError:
+            raise ValueError(f"Invalid shard '{spec}', expected 'i/N'") from None
+        return cls(index, count, by_size)
+
+    def __str__(self) -> str:
+        return f"{self.index}/{self.count}"
+
+    def select(self, file_paths: Iterable[Path], root: Path) -> list[Path]:
+        """Select the files of this shard.
+
+        Args:
+            file_paths: All files to check, in any order.
+            root: The checked root, paths are hashed relative to it.
+
+        Returns:
+            The files of this shard, in the input order.
+        """
+        paths = list(file_paths)
+        rel_paths = [_relative_key(path, root) for path in paths]
+        if not self.by_size:
+            return [
+                path
+                for path, rel in zip(paths, rel_paths)
+                if stable_hash(rel) % self.count == self.index - 1
+            ]
+
+        # greedy longest-processing-time assignment, ties broken by path
+        loads = [0] * self.count
+        selected = set()
+        sizes = sorted((-stat_key(path)[1], rel) for path, rel in zip(paths, rel_paths))
+        for neg_size, rel in sizes:
+            shard = min(range(self.count), key=lambda i: (loads[i], i))
+            loads[shard] -= neg_size
+            if shard == self.index - 1:
+                selected.add(rel)
+        return [path for path, rel in zip(paths, rel_paths) if rel in selected]
+
+
+def stable_hash(text: str) -> int:
+    """Hash that is the same on every machine and Python process."""
+    return int.from_bytes(hashlib.sha1(text.encode()).digest()[:8], "big")
+
+
+def _relative_key(path: Path, root: Path) -> str:
+    if is_file(root):
+        root = root.parent
+    try:
+        return path.relative_to(root).as_posix()
+    except ValueError:
+        return path.as_posix()
@@ -0,0 +1,150 @@
+"""
+Virtual file sources, to check files that are not in the working tree.
+
+A source lists files under a virtual root path, e.g. `/repo@1a2b3c4d5e6f`
+for a git revision, and reads them from elsewhere (the git object store).
+While a source is mounted, file access of checkers, gates, shards and
+caches goes through it for paths under its root, and to the disk for
+other paths, see the module functions below.
+"""
+
+import threading
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, TypeVar
+
+FileKey = tuple[int, int]  # (mtime_ns, size)
+
+_SOURCES: dict[Path, "FileSourceABC"] = {}  # virtual root -> mounted source
+_LOCK = threading.Lock()
+
+S = TypeVar("S", bound="FileSourceABC")
+
+
+class FileSourceABC(ABC):
+    """Files under a virtual root, listed once and read on demand."""
+
+    def __init__(self, root: Path):
+        """Init source, subclasses list their files with `add_file`.
+
+        Args:
+            root: The virtual root path, not existing on the disk.
+        """
+        self.root = root
+        self._files: dict[Path, FileKey] = {}
+        self._dirs: set[Path] = {root}
+
+    def add_file(self, path: Path, key: FileKey) -> None:
+        """List a file of the source, with its (mtime_ns, size)."""
+        self._files[path] = key
+        for parent in path.parents:
+            if parent in self._dirs:
+                break
+            self._dirs.add(parent)
+
+    def __len__(self) -> int:
+        return len(self._files)
+
+    def is_file(self, path: Path) -> bool:
+        return path in self._files
+
+    def is_dir(self, path: Path) -> bool:
+        return path in self._dirs
+
+    def iter_files(self, directory: Path) -> Iterator[Path]:
+        """Yield the files under a directory of the source, recursively."""
+        for path in self._files:
+            if directory == self.root or directory in path.parents:
+                yield path
+
+    def stat_key(self, path: Path) -> FileKey:
+        """Get the (mtime_ns, size) of a file.
+
+        Raises:
+            FileNotFoundError: If the source has no such file.
+        """
+        try:
+            return self._files[path]
+        except KeyError:
+            raise FileNotFoundError(f"No file {path} in {self}") from None
+
+    @abstractmethod
+    def read_bytes(self, path: Path) -> bytes:
+        """Read the content of a file.
+
+        Raises:
+            FileNotFoundError: If the source has no such file.
+        """
+        pass
+
+    def content_key(self, path: Path) -> str | None:
+        """Get a digest of the file content known without reading it, if any."""
+        return None
+
+    def close(self) -> None:
+        """Release the resources of the source, e.g. a subprocess."""
+
+
+@contextmanager
+def mount(source: S) -> Iterator[S]:
+    """Access the files of a source in the block, closing it afterwards."""
+    with _LOCK:
+        assert source.root not in _SOURCES, f"{source.root} is already mounted"
+        _SOURCES[source.root] = source
+    try:
+        yield source
+    finally:
+        with _LOCK:
+            del _SOURCES[source.root]
+        source.close()
+
+
+def find_source(path: Path) -> FileSourceABC | None:
+    """Get the mounted source of a path, None for paths on the disk."""
+    if not _SOURCES:
+        return None
+    for candidate in (path, *path.parents):
+        source = _SOURCES.get(candidate)
+        if source is not None:
+            return source
+    return None
+
+
+def is_file(path: Path) -> bool:
+    """Check if a path is a file, as `Path.is_file` for paths on the disk."""
+    source = find_source(path)
+    return source.is_file(path) if source is not None else path.is_file()
+
+
+def is_dir(path: Path) -> bool:
+    """Check if a path is a directory, as `Path.is_dir` for paths on the disk."""
+    source = find_source(path)
+    return source.is_dir(path) if source is not None else path.is_dir()
+
+
+def exists(path: Path) -> bool:
+    """Check if a path exists, as `Path.exists` for paths on the disk."""
+    source = find_source(path)
+    if source is None:
+        return path.exists()
+    return source.is_file(path) or source.is_dir(path)
+
+
+def stat_key(path: Path) -> FileKey:
+    """Get the (mtime_ns, size) of a file."""
+    source = find_source(path)
+    if source is not None:
+        return source.stat_key(path)
+    stat = path.stat()
+    return stat.st_mtime_ns, stat.st_size
+
+
+def read_bytes(path: Path, limit: int | None = None) -> bytes:
+    """Read the content of a file, or its first `limit` bytes."""
+    source = find_source(path)
+    if source is not None:
+        data = source.read_bytes(path)
+        return data if limit is None else data[:limit]
+    with path.open("rb") as f:
+        return f.read(-1 if limit is None else limit)
@@ -0,0 +1,218 @@
+"""Tracing and sampling profiling of qualiluma runs.
+
+`TRACER` records spans (walk, read, prompt build, LLM call, parse, ...) and
+writes them as Chrome trace JSON (viewable in chrome://tracing or Perfetto).
+`SamplingProfiler` periodically samples the stacks of all threads and writes
+them in the folded format used by flamegraph.pl and speedscope.
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+from types import FrameType
+from typing import Any, Iterable, Iterator, TypeVar
+
+T = TypeVar("T")
+
+
+class Tracer:
+    """Thread-safe collector of Chrome trace "complete" events."""
+
+    def __init__(self):
+        self.enabled = False
+        self._lock = threading.Lock()
+        self._events: list[dict[str, Any]] = []
+        self._thread_names: dict[tuple[int, int], str] = {}  # (pid, tid) -> name
+        self._start = time.perf_counter()
+
+    def start(self) -> None:
+        """Drop previous events and start recording."""
+        with self._lock:
+            self._events = []
+            self._thread_names = {}
+            self._start = time.perf_counter()
+        self.enabled = True
+
+    def stop(self) -> None:
+        """Stop recording, collected events are kept."""
+        self.enabled = False
+
+    def add_span(
+        self, name: str, start: float, end: float, args: dict[str, Any]
+    ) -> None:
+        """Record a finished span.
+
+        Args:
+            name: The span name, e.g. "read".
+            start: `time.perf_counter()` at the span start.
+            end: `time.perf_counter()` at the span end.
+            args: Tags shown with the span, e.g. checker and file.
+        """
+        thread = threading.current_thread()
+        event = {
+            "name": name,
+            "cat": args.get("checker", "qualiluma"),
+            "ph": "X",
+            "ts": (start - self._start) * 1e6,
+            "dur": (end - start) * 1e6,
+            "pid": os.getpid(),
+            "tid": thread.ident,
+            "args": {k: str(v) for k, v in args.items()},
+        }
+        with self._lock:
+            self._events.append(event)
+            self._thread_names.setdefault((os.getpid(), thread.ident or 0), thread.name)
+
+    def _monotonic_start_us(self) -> float:
+        """The recording start on the monotonic clock, shared by processes."""
+        return (self._start + time.monotonic() - time.perf_counter()) * 1e6
+
+    def take_events(self) -> list[dict[str, Any]]:
+        """Take the recorded spans out, e.g. to send them to another process.
+
+        Returns:
+            The events, with timestamps on the monotonic clock.
+        """
+        with self._lock:
+            events, self._events = self._events, []
+        shift = self._monotonic_start_us()
+        for event in events:
+            event["ts"] += shift
+        return events
+
+    def add_events(self, events: list[dict[str, Any]]) -> None:
+        """Add spans taken from a tracer of another process with `take_events`."""
+        shift = self._monotonic_start_us()
+        with self._lock:
+            for event in events:
+                event["ts"] -= shift
+                self._events.append(event)
+                key = (event["pid"], event["tid"])
+                self._thread_names.setdefault(key, f"worker {event['pid']}")
+
+    def export(self, file_path: Path) -> None:
+        """Write collected spans as Chrome trace JSON."""
+        with self._lock:
+            events = list(self._events)
+            thread_names = dict(self._thread_names)
+
+        metadata = [
+            {
+                "name": "thread_name",
+                "ph": "M",
+                "pid": pid,
+                "tid": tid,
+                "args": {"name": name},
+            }
+            for (pid, tid), name in thread_names.items()
+        ]
+        data = {"traceEvents": metadata + events, "displayTimeUnit": "ms"}
+        file_path.write_text(json.dumps(data))
+
+
+TRACER = Tracer()
+
+
+@contextmanager
+def span(name: str, **args: Any) -> Iterator[None]:
+    """Record a code block as a trace span (does nothing if tracing is off)."""
+    if not TRACER.enabled:
+        yield
+        return
+
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        TRACER.add_span(name, start, time.perf_counter(), args)
+
+
+def traced_iter(iterable: Iterable[T], name: str, **args: Any) -> Iterator[T]:
+    """Iterate, recording the time to get every item as a span.
+
+    Useful for lazy producers like `os.walk`, where the work is done in `next()`.
+    """
+    iterator = iter(iterable)
+    while True:
+        with span(name, **args):
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+        yield item
+
+
+def _frame_name(frame: FrameType) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({Path(code.co_filename).name}:{code.co_firstlineno})"
+
+
+class SamplingProfiler:
+    """Statistical profiler sampling stacks of all threads from a background thread.
+
+    Usage:
+        with SamplingProfiler() as profiler:
+            run()
+        profiler.export(Path("profile.folded"))
+    """
+
+    def __init__(self, interval: float = 0.005):
+        """Init profiler.
+
+        Args:
+            interval: Seconds between samples.
+        """
+        self.interval = interval
+        self.samples: Counter[str] = Counter()
+        self._stop_event = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def _sample(self) -> None:
+        own_id = threading.get_ident()
+        thread_names = {t.ident: t.name for t in threading.enumerate()}
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own_id:
+                continue
+            stack = []
+            current: FrameType | None = frame
+            while current is not None:
+                stack.append(_frame_name(current))
+                current = current.f_back
+            stack.append(thread_names.get(thread_id, str(thread_id)))
+            self.samples[";".join(reversed(stack))] += 1
+
+    def _run(self) -> None:
+        while not self._stop_event.wait(self.interval):
+            self._sample()
+
+    def start(self) -> None:
+        """Start sampling in a background thread."""
+        self._stop_event.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="qualiluma-profiler", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop sampling."""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self) -> "SamplingProfiler":
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.stop()
+
+    def export(self, file_path: Path) -> None:
+        """Write samples in the folded stacks format ("frame;frame;frame count")."""
+        lines = [f"{stack} {count}" for stack, count in self.samples.most_common()]
+        file_path.write_text("\n".join(lines) + "\n")
@@ -0,0 +1,278 @@
+"""
+File system watching for `qualiluma watch`.
+
+Uses inotify on Linux (through libc, no extra dependencies) and falls back to
+polling file modification times elsewhere or when inotify is not available.
+"""
+
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import time
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Iterable
+
+from .logs import get_logger
+
+logger = get_logger(__name__)
+
+POLL_INTERVAL = 1.0  # seconds between scans of the polling watcher
+
+# inotify constants, see inotify(7)
+_IN_MODIFY = 0x00000002
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_FROM = 0x00000040
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_DELETE = 0x00000200
+_IN_DELETE_SELF = 0x00000400
+_IN_MOVE_SELF = 0x00000800
+_IN_Q_OVERFLOW = 0x00004000
+_IN_IGNORED = 0x00008000
+_IN_ONLYDIR = 0x01000000
+_IN_ISDIR = 0x40000000
+_IN_WATCH_MASK = (
+    _IN_MODIFY
+    | _IN_CLOSE_WRITE
+    | _IN_MOVED_FROM
+    | _IN_MOVED_TO
+    | _IN_CREATE
+    | _IN_DELETE
+    | _IN_DELETE_SELF
+    | _IN_MOVE_SELF
+    | _IN_ONLYDIR
+)
+_EVENT_HEADER = struct.Struct("iIII")  # wd, mask, cookie, name length
+
+
+class WatcherABC(ABC):
+    """Reports changed (created, modified or deleted) files under a root."""
+
+    def __init__(self, root: Path, ignored_dirs: Iterable[str] = ()):
+        """Init watcher.
+
+        Args:
+            root: The directory to watch recursively.
+            ignored_dirs: Names of directories not to watch.
+        """
+        self.root = root
+        self.ignored_dirs = set(ignored_dirs)
+
+    @abstractmethod
+    def poll(self, timeout: float) -> set[Path]:
+        """Wait up to `timeout` seconds for changes.
+
+        Returns:
+            The changed files (or removed directories), empty if nothing changed.
+        """
+
+    def close(self) -> None:
+        """Release the resources of the watcher."""
+
+    def __enter__(self) -> "WatcherABC":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def _walk_files(self, directory: Path) -> Iterable[Path]:
+        """Yield files under a directory, skipping ignored directories."""
+        for dirpath, dirnames, filenames in os.walk(directory):
+            dirnames[:] = [d for d in dirnames if d not in self.ignored_dirs]
+            for file_name in filenames:
+                yield Path(dirpath) / file_name
+
+
+class PollingWatcher(WatcherABC):
+    """Portable watcher comparing (mtime, size) snapshots of the tree."""
+
+    def __init__(
+        self,
+        root: Path,
+        ignored_dirs: Iterable[str] = (),
+        interval: float = POLL_INTERVAL,
+    ):
+        """Init watcher.
+
+        Args:
+            root: The directory to watch recursively.
+            ignored_dirs: Names of directories not to watch.
+            interval: Seconds between scans of the tree.
+        """
+        super().__init__(root, ignored_dirs)
+        self.interval = interval
+        self._snapshot = self._scan()
+        self._last_scan = time.monotonic()
+
+    def _scan(self) -> dict[Path, tuple[int, int]]:
+        snapshot = {}
+        for file_path in self._walk_files(self.root):
+            try:
+                stat = file_path.stat()
+            except OSError:
+                continue  # deleted meanwhile
+            snapshot[file_path] = (stat.st_mtime_ns, stat.st_size)
+        return snapshot
+
+    def poll(self, timeout: float) -> set[Path]:
+        next_scan = self._last_scan + self.interval
+        time.sleep(max(0.0, min(timeout, next_scan - time.monotonic())))
+        if time.monotonic() < next_scan:
+            return set()
+
+        snapshot = self._scan()
+        self._last_scan = time.monotonic()
+        changed = {
+            path
+            for path in snapshot.keys() | self._snapshot.keys()
+            if snapshot.get(path) != self._snapshot.get(path)
+        }
+        self._snapshot = snapshot
+        return changed
+
+
+class InotifyWatcher(WatcherABC):
+    """Linux watcher with one inotify watch per directory."""
+
+    def __init__(self, root: Path, ignored_dirs: Iterable[str] = ()):
+        """Init watcher.
+
+        Args:
+            root: The directory to watch recursively.
+            ignored_dirs: Names of directories not to watch.
+
+        Raises:
+            OSError: If inotify is not available.
+        """
+        super().__init__(root, ignored_dirs)
+        if not sys.platform.startswith("linux"):
+            raise OSError("inotify is only available on Linux")
+        self._libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self._fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self._fd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, f"inotify_init1 failed: {os.strerror(errno)}")
+        self._dirs: dict[int, Path] = {}  # watch descriptor -> directory
+        self._add_tree(root)
+
+    def _add_watch(self, directory: Path) -> None:
+        wd = self._libc.inotify_add_watch(
+            self._fd, os.fsencode(directory), _IN_WATCH_MASK
+        )
+        if wd < 0:
+            # e.g. the directory was removed meanwhile, or the watch limit is hit
+            errno = ctypes.get_errno()
+            logger.warning(f"Cannot watch {directory}: {os.strerror(errno)}")
+            return
+        self._dirs[wd] = directory
+
+    def _add_tree(self, directory: Path) -> None:
+        for dirpath, dirnames, _filenames in os.walk(directory):
+            dirnames[:] = [d for d in dirnames if d not in self.ignored_dirs]
+            self._add_watch(Path(dirpath))
+
+    def poll(self, timeout: float) -> set[Path]:
+        readable, _, _ = select.select([self._fd], [], [], timeout)
+        if not readable:
+            return set()
+
+        changed: set[Path] = set()
+        while True:
+            try:
+                data = os.read(self._fd, 64 * 1024)
+            except BlockingIOError:
+                break
+            changed |= self._parse_events(data)
+        return changed
+
+    def _parse_events(self, data: bytes) -> set[Path]:
+        changed: set[Path] = set()
+        offset = 0
+        while offset < len(data):
+            wd, mask, _cookie, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = os.fsdecode(data[offset : offset + length].rstrip(b"\0"))
+            offset += length
+
+            if mask & _IN_Q_OVERFLOW:
+                # events were lost, report everything
+                logger.warning("Too many file system events, rescanning the tree")
+                changed |= set(self._walk_files(self.root))
+                continue
+            if mask & _IN_IGNORED:
+                self._dirs.pop(wd, None)  # the directory is gone
+                continue
+            directory = self._dirs.get(wd)
+            if directory is None or not name:
+                continue
+
+            path = directory / name
+            if mask & _IN_ISDIR:
+                if name in self.ignored_dirs:
+                    continue
+                if mask & (_IN_CREATE | _IN_MOVED_TO) and path.is_dir():
+                    # files may be created before the watch is added
+                    self._add_tree(path)
+                    changed |= set(self._walk_files(path))
+                elif mask & (_IN_DELETE | _IN_MOVED_FROM):
+                    changed.add(path)  # files under it are gone
+                continue
+            changed.add(path)
+        return changed
+
+    def close(self) -> None:
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+
+def create_watcher(
+    root: Path, ignored_dirs: Iterable[str] = (), polling: bool = False
+) -> WatcherABC:
+    """Create the best available watcher.
+
+    Args:
+        root: The directory to watch recursively.
+        ignored_dirs: Names of directories not to watch.
+        polling: Whether to use the polling watcher even if inotify works.
+
+    Returns:
+        An inotify watcher, or a polling one if inotify is not available.
+    """
+    if not polling:
+        try:
+            return InotifyWatcher(root, ignored_dirs)
+        except (OSError, AttributeError, TypeError) as e:
+            # AttributeError: libc without inotify, TypeError: no libc found
+            logger.info(f"inotify is not available ({e}), polling for changes")
+    return PollingWatcher(root, ignored_dirs)
+
+
+def wait_for_changes(
+    watcher: WatcherABC, debounce: float, timeout: float | None = None
+) -> set[Path]:
+    """Wait for a burst of changes to settle.
+
+    Args:
+        watcher: The watcher to get changes from.
+        debounce: Seconds without new changes that end the burst.
+        timeout: Seconds to wait for the first change, forever if None.
+
+    Returns:
+        The files changed during the burst, empty on timeout.
+    """
+    deadline = time.monotonic() + timeout if timeout is not None else None
+    changed: set[Path] = set()
+    while not changed:
+        remaining = deadline - time.monotonic() if deadline is not None else 1.0
+        if remaining <= 0:
+            return changed
+        changed = watcher.poll(min(remaining, 1.0))
+
+    while more := watcher.poll(debounce):
+        changed |= more
+    return changed
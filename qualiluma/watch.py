@@ -0,0 +1,277 @@
+"""
+Continuous checking: `qualiluma watch PATH` re-checks files as they change.
+
+The whole path is checked once, then every debounced burst of changes
+re-runs only the checkers that accept the changed files, reusing the results
+of all other files. Checks of a file that changes again are cancelled,
+including their in-flight LLM requests.
+"""
+
+import sys
+import threading
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Callable
+
+from .checks import CheckerABC, FileCheckResult
+from .main import build_checkers, check_path, contains_errors, order_by_cost
+from .util import Config, get_logger
+from .util.cache import ResultCache
+from .util.llm import LLMCancelledError, cancellable
+from .util.metrics import METRICS
+from .util.watch import create_watcher, wait_for_changes
+
+logger = get_logger(__name__)
+results_logger = get_logger(__name__, results_mode=True)
+
+DEFAULT_DEBOUNCE = 0.3  # seconds
+_CLEAR_SCREEN = "\x1b[H\x1b[2J"
+
+Results = dict[str, dict[Path, FileCheckResult]]
+
+
+class WatchSession:
+    """Keeps the results of a path up to date by re-checking changed files.
+
+    Changed files are checked one at a time in a background thread, in the
+    order of their changes.
+    """
+
+    def __init__(
+        self,
+        target_path: Path,
+        checkers: list[CheckerABC],
+        on_update: Callable[[Results], None] | None = None,
+    ):
+        """Init session.
+
+        Args:
+            target_path: The file or directory to keep checked.
+            checkers: The checkers to run.
+            on_update: Called with all results after every applied change.
+        """
+        self.target_path = target_path
+        self.checkers = checkers
+        self.on_update = on_update
+        self.results: Results = {checker.get_name(): {} for checker in checkers}
+        # reverted edits reuse earlier results
+        self.cache = ResultCache()
+        for checker in checkers:
+            if checker.result_cache is None:
+                checker.result_cache = self.cache
+
+        self._lock = threading.Condition()
+        self._pending: dict[Path, None] = {}  # ordered set
+        self._generations: dict[Path, int] = defaultdict(int)
+        self._in_flight: dict[Path, threading.Event] = {}
+        self._stopped = False
+        self._thread: threading.Thread | None = None
+
+    def check_all(self) -> Results:
+        """Check the whole path, replacing all results."""
+        self.results = check_path(self.target_path, self.checkers)
+        self._notify()
+        return self.results
+
+    def start(self) -> "WatchSession":
+        """Start re-checking submitted files in the background."""
+        self._thread = threading.Thread(
+            target=self._run, name="qualiluma-watch", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Stop the background thread, cancelling the current check."""
+        with self._lock:
+            self._stopped = True
+            for event in self._in_flight.values():
+                event.set()
+            self._lock.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+
+    def submit(self, changed: set[Path]) -> None:
+        """Schedule re-checks of changed files (or removed directories).
+
+        Checks already running for these files are cancelled.
+        """
+        if self.target_path.is_file() or not self.target_path.exists():
+            changed = {path for path in changed if path == self.target_path}
+        with self._lock:
+            for path in sorted(changed):
+                self._generations[path] += 1
+                if path in self._in_flight:
+                    logger.debug(f"Cancelling the check of {path}, it changed again")
+                    self._in_flight[path].set()
+                self._pending.pop(path, None)
+                self._pending[path] = None  # moved to the end
+            self._lock.notify_all()
+
+    def wait_idle(self, timeout: float | None = None) -> bool:
+        """Wait until all submitted files are re-checked.
+
+        Returns:
+            False on timeout, True otherwise.
+        """
+        with self._lock:
+            return self._lock.wait_for(
+                lambda: not self._pending and not self._in_flight, timeout
+            )
+
+    def _run(self) -> None:
+        while True:
+            with self._lock:
+                self._lock.wait_for(lambda: self._pending or self._stopped)
+                if self._stopped:
+                    return
+                path = next(iter(self._pending))
+                del self._pending[path]
+                generation = self._generations[path]
+                cancel = threading.Event()
+                self._in_flight[path] = cancel
+
+            METRICS.clear()  # records of earlier re-checks, not shown by watch
+            try:
+                with cancellable(cancel):
+                    updates = self._check_changed(path)
+            except LLMCancelledError:
+                updates = None
+
+            with self._lock:
+                del self._in_flight[path]
+                if updates is not None and generation == self._generations[path]:
+                    self._apply(path, updates)
+                self._lock.notify_all()
+            if updates is not None:
+                self._notify()
+
+    def _check_changed(self, path: Path) -> dict[str, FileCheckResult | None]:
+        """Re-check a changed file with the checkers accepting it.
+
+        Returns:
+            The new result by checker name, None if the result should be removed.
+        """
+        updates: dict[str, FileCheckResult | None] = {}
+        for checker in order_by_cost(self.checkers):
+            if self.target_path.is_file():
+                accepted = path.is_file()
+            else:
+                accepted = checker.accepts_file(path, self.target_path)
+            if not accepted:
+                updates[checker.get_name()] = None
+                continue
+            try:
+                prior = {name: res for name, res in updates.items() if res is not None}
+                updates[checker.get_name()] = checker.check_file(path, prior)
+            except LLMCancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Failed to check {path}: {e}")
+                updates[checker.get_name()] = FileCheckResult(
+                    was_checked=False, issues=[]
+                )
+        return updates
+
+    def _apply(self, path: Path, updates: dict[str, FileCheckResult | None]) -> None:
+        for name, res in updates.items():
+            file_results = self.results[name]
+            if res is not None:
+                file_results[path] = res
+                continue
+            # removed file, or a removed directory with all its files
+            for file_path in list(file_results):
+                if file_path == path or path in file_path.parents:
+                    del file_results[file_path]
+
+    def _notify(self) -> None:
+        if self.on_update is not None:
+            self.on_update(self.results)
+
+
+def show_summary(results: Results, target_path: Path) -> None:
+    """Show the issues and the summary, replacing the previous one on terminals.
+
+    Args:
+        results: A dictionary mapping checker names to file paths and their check status.
+        target_path: The watched path.
+    """
+    if sys.stdout.isatty():
+        sys.stdout.write(_CLEAR_SCREEN)
+        sys.stdout.flush()
+
+    for checker_name, file_status in results.items():
+        for file_path, status in sorted(file_status.items()):
+            if not status.was_checked:
+                continue
+            for issue in sorted(status.issues, key=lambda x: x.line or 0):
+                line = issue.line if issue.line is not None else "unknown"
+                results_logger.info(
+                    f"{file_path}:{line}: {issue.severity.name}:"
+                    f" {issue.check_name} - {issue.message}"
+                )
+
+    results_logger.info("")
+    results_logger.info(" Summary ".center(80, "="))
+    for checker_name, file_status in results.items():
+        failed = sum(
+            1 for status in file_status.values() if status.was_checked and status.issues
+        )
+        mark = "❌" if failed else "✅"
+        results_logger.info(
+            f"  - {mark} '{checker_name}': {failed} of {len(file_status)} files"
+            " with issues"
+        )
+    msg = "❌ Errors found" if contains_errors(results) else "✅ No errors found"
+    results_logger.info(f"Check status: '{msg}'")
+    results_logger.info(
+        f"Watching {target_path} for changes (updated {time.strftime('%H:%M:%S')},"
+        " Ctrl+C to stop)"
+    )
+
+
+def watch(
+    target_path: Path,
+    filter_checkers: str | None = None,
+    thorough: bool = False,
+    config: Config | None = None,
+    debounce: float = DEFAULT_DEBOUNCE,
+    polling: bool = False,
+) -> int:
+    """Check a path, then re-check changed files until interrupted.
+
+    Args:
+        target_path: The path to the file or directory to check.
+        filter_checkers: Comma-separated list of checkers to run (or no filtering).
+        thorough: Whether to use more thorough (but slower) checks.
+        config: The configuration object containing settings for the checkers.
+        debounce: Seconds without new changes before re-checking.
+        polling: Whether to poll for changes instead of using inotify.
+
+    Returns:
+        An integer indicating the result of the last check (0 for success, 1 for failure).
+    """
+    if config is None:
+        config = Config()
+
+    if not target_path.exists():
+        logger.error(f"Path '{target_path}' does not exist")
+        return 1
+
+    checkers = build_checkers(config, filter_checkers, thorough)
+    session = WatchSession(
+        target_path, checkers, lambda results: show_summary(results, target_path)
+    )
+    root = target_path if target_path.is_dir() else target_path.parent
+    with create_watcher(root, config.get_ignored_directories(), polling) as watcher:
+        session.check_all()
+        session.start()
+        try:
+            while True:
+                session.submit(wait_for_changes(watcher, debounce))
+        except KeyboardInterrupt:
+            pass
+        finally:
+            session.stop()
+    return int(contains_errors(session.results))
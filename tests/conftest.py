@@ -0,0 +1,32 @@
+import pytest
+
+
+class FakeConfig:
+    """Stands in for `Config` in checker tests: every file is checked."""
+
+    def __init__(self):
+        self.ignored_directories: list[str] = []
+        self.checker_extra: dict = {}
+
+    def get_labels(self, suffix):
+        return ["code"]
+
+    def get_checker_extra(self, name):
+        return self.checker_extra
+
+    def get_checker_extensions(self, name):
+        return None
+
+    def get_ignored_directories(self):
+        return self.ignored_directories
+
+    def is_checked_extension(self, suffix):
+        return True
+
+    def is_ignored_directory(self, name):
+        return name in self.ignored_directories
+
+
+@pytest.fixture
+def fake_config() -> FakeConfig:
+    return FakeConfig()
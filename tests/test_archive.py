@@ -0,0 +1,62 @@
+import io
+import tarfile
+import zipfile
+from pathlib import Path
+
+import pytest
+
+from qualiluma.main import build_checkers, check, check_path
+from qualiluma.util import Config
+from qualiluma.util.archive import ArchiveSource
+
+MEMBERS = {
+    "pkg/src/a.py": b"a = 1",  # no trailing newline
+    "pkg/src/b.py": b"b = 2\n",
+    "pkg/node_modules/c.py": b"c = 3",
+    "../escape.py": b"d = 4",
+}
+
+
+def _tar(path: Path) -> Path:
+    with tarfile.open(path, "w:gz") as tar:
+        for name, data in MEMBERS.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            tar.addfile(info, io.BytesIO(data))
+    return path
+
+
+def _zip(path: Path) -> Path:
+    with zipfile.ZipFile(path, "w") as zf:
+        for name, data in MEMBERS.items():
+            zf.writestr(name, data)
+    return path
+
+
+@pytest.mark.parametrize("make", [_tar, _zip])
+def test_check_archive(tmp_path: Path, make):
+    archive = make(tmp_path / ("pkg.tar.gz" if make is _tar else "pkg.zip"))
+    results = check_path(archive, build_checkers(Config(), "trailing newline"))
+    res = results["trailing newline"]
+    root = Path(f"{archive}!")
+    assert set(res) == {root / "pkg/src/a.py", root / "pkg/src/b.py"}
+    assert str(root / "pkg/src/a.py").endswith(f"{archive.name}!/pkg/src/a.py")
+    assert res[root / "pkg/src/a.py"].issues
+    assert not res[root / "pkg/src/b.py"].issues
+
+    assert check(archive, "trailing newline") == 1
+
+
+def test_compressed_tar_order(tmp_path: Path):
+    source = ArchiveSource(_tar(tmp_path / "pkg.tgz"))
+    root = source.root
+    assert len(source) == 3  # "../escape.py" is left out
+    # reads slightly out of order use the members passed over
+    assert source.read_bytes(root / "pkg/src/b.py") == b"b = 2\n"
+    assert source.read_bytes(root / "pkg/src/a.py") == b"a = 1"
+    assert source.restarts == 0
+    assert source.read_bytes(root / "pkg/src/a.py") == b"a = 1"
+    assert source.restarts == 1
+    with pytest.raises(FileNotFoundError):
+        source.read_bytes(root / "pkg/src/missing.py")
+    source.close()
@@ -0,0 +1,79 @@
+from pathlib import Path
+
+import pytest
+
+from qualiluma.checks import FileCheckResult
+from qualiluma.util import llm
+from qualiluma.util.balancer import Endpoint, EndpointBalancer
+from qualiluma.util.metrics import MetricsRegistry
+from qualiluma.util.mock_server import MockOpenAIServer, MockServerSettings
+
+
+def test_least_outstanding():
+    a = Endpoint("a", None, weight=2)
+    b = Endpoint("b", None, max_concurrency=1)
+    balancer = EndpointBalancer([a, b])
+
+    assert [balancer.acquire(wait=False) for _ in range(3)] == [a, b, a]
+    assert balancer.acquire(avoid=a, wait=False) is a  # b is full
+    balancer.release(b, True)
+    assert balancer.acquire(avoid=a, wait=False) is b
+
+    balancer.release(a, False)  # a is out for a cooldown
+    assert a.failures == 1
+    balancer.release(b, True)
+    assert balancer.acquire(wait=False) is b
+    assert balancer.any_up()
+
+
+def test_sequential_spread():
+    a = Endpoint("a", None, weight=2)
+    b = Endpoint("b", None)
+    c = Endpoint("c", None)
+    balancer = EndpointBalancer([a, b, c])
+
+    chosen = []
+    for _ in range(8):  # one request at a time, as `check_files` sends them
+        endpoint = balancer.acquire(wait=False)
+        assert endpoint is not None
+        chosen.append(endpoint.name)
+        balancer.release(endpoint, True)
+    assert chosen == ["a", "b", "c", "a"] * 2
+
+
+def test_timeout_counted_once():
+    a = Endpoint("a", None)
+    balancer = EndpointBalancer([a, Endpoint("b", None)])
+
+    assert balancer.acquire(wait=False) is a
+    balancer.report_failure(a)  # timed out
+    balancer.release(a, False)  # the abandoned request fails later
+    assert a.failures == 1
+    assert a.outstanding == 0
+
+
+def test_failover(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr("qualiluma.util.llm.RETRY_BASE_DELAY", 10)  # not waited
+    down = MockOpenAIServer(settings=MockServerSettings(error_rate=1.0))
+    with down, MockOpenAIServer() as up:
+        monkeypatch.setitem(
+            llm.CONFIG["llms"],
+            "multi",
+            {
+                "model": "mock",
+                "max_tokens": 100,
+                "api_key": "test",
+                "endpoints": [{"base_url": down.url}, {"base_url": up.url}],
+            },
+        )
+        client = llm.LLMClient("multi")
+
+        registry = MetricsRegistry()
+        with registry.track("checker", Path("a.py")) as record:
+            for _ in range(5):
+                res = client.structured_output("check this", FileCheckResult)
+                assert res.was_checked is True
+        assert down.requests_count == 1  # then out for a cooldown
+        assert up.requests_count == 5
+        assert record.llm_calls == 5
+        assert record.retries == 1
@@ -33,7 +33,7 @@ class TestSimpleCheckerAdapter:
         assert result.was_checked is True
         assert len(result.issues) == 0
 
-    def test_synthetic_checker(self, tmp_path):
+    def test_synthetic_checker(self, tmp_path, fake_config):
         # todo: replace with endsline checker
         # custom simple checker that fails on files containing "fail"
         class MySimpleChecker(SimpleCheckerABC):
@@ -54,19 +54,9 @@ class TestSimpleCheckerAdapter:
                     )
                 return FileCheckResult(was_checked=True, issues=[])
 
-        class FakeConfig:
-            def get_labels(self, suffix):
-                return ["code"]
-
-            def get_checker_extra(self, name):
-                return {"dummy": True}
-
-            def get_ignored_directories(self):
-                return []
-
-        cfg = FakeConfig()
+        fake_config.checker_extra = {"dummy": True}
         checker = MySimpleChecker()
-        adapter = SimpleCheckerAdapter(cfg, checker)
+        adapter = SimpleCheckerAdapter(fake_config, checker)
 
         ok = tmp_path / "ok.py"
         ok.write_text("everything fine")
@@ -125,7 +115,7 @@ class TestSimpleCheckerABC:
 
 class TestCheckerABC:
     def test_checkerabc_check_file_and_directory_and_statistics_and_error_handling(
-        self, tmp_path
+        self, tmp_path, fake_config
     ):
         # CheckerABC subclass that records statistics and raises for a particular filename
         class MyChecker(CheckerABC):
@@ -148,15 +138,8 @@ class TestCheckerABC:
                     ],
                 )
 
-        class FakeConfig:
-            def get_labels(self, suffix):
-                return ["code"]
-
-            def get_ignored_directories(self):
-                return ["ignored_dir"]
-
-        cfg = FakeConfig()
-        checker = MyChecker(cfg)
+        fake_config.ignored_directories = ["ignored_dir"]
+        checker = MyChecker(fake_config)
         CheckerABC._check_file_impl(checker, Path())
 
         # create files and directories
@@ -190,7 +173,7 @@ class TestCheckerABC:
 
 
 class TestFunctionAdapter:
-    def test_function_adapter(self, tmp_path):
+    def test_function_adapter(self, tmp_path, fake_config):
         # function returns None -> skipped
         def fun_none(p: Path):
             return None
@@ -203,13 +186,9 @@ class TestFunctionAdapter:
         def fun_true(p: Path):
             return True
 
-        class FakeConfig:
-            pass
-
-        cfg = FakeConfig()
-        fa_none = FunctionAdapter(cfg, fun_none, "none_check")
-        fa_false = FunctionAdapter(cfg, fun_false, "false_check")
-        fa_true = FunctionAdapter(cfg, fun_true, "true_check")
+        fa_none = FunctionAdapter(fake_config, fun_none, "none_check")
+        fa_false = FunctionAdapter(fake_config, fun_false, "false_check")
+        fa_true = FunctionAdapter(fake_config, fun_true, "true_check")
         assert fa_none.get_name() == "none_check"
 
         p = tmp_path / "x.py"
@@ -226,3 +205,31 @@ class TestFunctionAdapter:
         r_true = fa_true.check_file(p)
         assert r_true.was_checked is True
         assert r_true.issues == []
+
+
+class TestFollowSymlinks:
+    def test_iter_files_follow_symlinks(self, tmp_path):
+        from qualiluma.main import build_checkers, check_path
+
+        src = tmp_path / "src"
+        (src / "pkg").mkdir(parents=True)
+        (src / "pkg" / "a.py").write_text("a = 1")  # no trailing newline
+        (src / "pkg" / "loop").symlink_to(src, target_is_directory=True)
+        ws = tmp_path / "ws"
+        ws.mkdir()
+        (ws / "pkg").symlink_to(src / "pkg", target_is_directory=True)
+        (ws / "pkg2").symlink_to(src / "pkg", target_is_directory=True)
+        (ws / "b.py").symlink_to(src / "pkg" / "a.py")
+
+        checker = build_checkers(Config(), "trailing newline")[0]
+        assert list(checker.iter_files(ws)) == [ws / "b.py"]
+
+        checker.follow_symlinks = True
+        files = list(checker.iter_files(ws))
+        assert len(files) == 1  # one physical file, no endless loop
+
+        results = check_path(ws, [checker])["trailing newline"]
+        aliases = {ws / "b.py", ws / "pkg" / "a.py", ws / "pkg2" / "a.py"}
+        assert set(results) == aliases
+        assert len({id(res) for res in results.values()}) == 1
+        assert results[ws / "pkg2" / "a.py"].issues
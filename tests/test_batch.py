@@ -0,0 +1,77 @@
+import json
+from pathlib import Path
+
+import pytest
+
+from qualiluma.main import build_checkers, check_path
+from qualiluma.util import Config
+from qualiluma.util.batch import BATCH_PENDING, BATCH_SUFFIX, run_batched
+from qualiluma.util.llm import _model_pricing, configure_llms
+from qualiluma.util.mock_server import MockOpenAIServer, MockServerSettings
+
+CHECKERS = "VariablesConsistencyChecker,PepChecker"
+
+
+@pytest.fixture
+def files(tmp_path: Path) -> Path:
+    (tmp_path / "code").mkdir()
+    for i in range(3):
+        (tmp_path / "code" / f"{i}.py").write_text(f"a = {i}\n")
+    return tmp_path / "code"
+
+
+def test_batch_rounds(files: Path, tmp_path: Path):
+    state_path = tmp_path / "state.json"
+    with MockOpenAIServer() as server:
+        configure_llms(base_url=server.url, api_key="test")
+        try:
+            checkers = build_checkers(Config(), CHECKERS)
+            results = run_batched(
+                lambda: check_path(files, checkers), state_path, poll_interval=0.01
+            )
+            assert server.requests_count == 0  # no direct requests
+            # variables detection and PEP checks, then the consistency check
+            # (the same for all files, as the mock detects the same variables)
+            assert len(server.batches) == 2
+            assert server.batch_requests_count == 7
+            for checker_results in results.values():
+                assert all(res.was_checked for res in checker_results.values())
+
+            # answers are kept in the state, nothing is sent again
+            state = json.loads(state_path.read_text())
+            assert len(state["answers"]) == 7 and not state["batches"]
+            run_batched(lambda: check_path(files, checkers), state_path)
+            assert len(server.batches) == 2
+        finally:
+            configure_llms()
+
+
+def test_batch_max_rounds(files: Path):
+    with MockOpenAIServer(settings=MockServerSettings(error_rate=1.0)) as server:
+        configure_llms(base_url=server.url, api_key="test")
+        try:
+            checkers = build_checkers(Config(), CHECKERS)
+            results = run_batched(
+                lambda: check_path(files, checkers), max_rounds=1, poll_interval=0.01
+            )
+            assert not server.batches  # the last round submits nothing
+            pending = results["PepChecker"].values()
+            assert all(res.issues[0].message == BATCH_PENDING for res in pending)
+
+            results = run_batched(
+                lambda: check_path(files, checkers), max_rounds=2, poll_interval=0.01
+            )
+            assert len(server.batches) == 1
+            failed = results["PepChecker"].values()  # errors of the batch API
+            assert not any(res.was_checked or res.issues for res in failed)
+        finally:
+            configure_llms()
+
+
+def test_batch_pricing():
+    pricing = {"m": {"input_noncached_per_1m": 2.0, "output_per_1m": 8.0}}
+    assert _model_pricing(pricing, "m" + BATCH_SUFFIX) == {
+        "input_noncached_per_1m": 1.0,
+        "output_per_1m": 4.0,
+    }
+    assert _model_pricing(pricing, "other") == {}
@@ -0,0 +1,84 @@
+"""Throughput regression tests with the fake LLM backend."""
+
+import json
+from pathlib import Path
+
+import pytest
+
+from qualiluma.bench import (
+    CHECKER_NAMES,
+    BenchResult,
+    find_regressions,
+    make_synthetic_tree,
+    run_benchmark,
+)
+
+BASELINE = json.loads((Path(__file__).parent / "bench_baseline.json").read_text())
+
+
+def _check_throughput(tmp_path: Path, n_files: int):
+    root = make_synthetic_tree(tmp_path, n_files)
+    results = [run_benchmark(root, name) for name in CHECKER_NAMES]
+    for res in results:
+        assert res.files == n_files
+    assert find_regressions(results, BASELINE, n_files) == []
+
+
+@pytest.mark.slow  # timing varies run to run on shared machines
+def test_throughput_1k(tmp_path: Path):
+    _check_throughput(tmp_path, 1_000)
+
+
+@pytest.mark.slow
+@pytest.mark.parametrize("n_files", [10_000, 100_000])
+def test_throughput_large(tmp_path: Path, n_files: int):
+    _check_throughput(tmp_path, n_files)
+
+
+def test_find_regressions():
+    res = BenchResult(
+        checker="A",
+        files=10,
+        seconds=1.0,
+        files_per_sec=10.0,
+        requests=0,
+        requests_per_sec=0.0,
+        cpu_ms_per_request=None,
+        peak_rss_mb=1.0,
+        relative_speed=0.1,
+    )
+    baseline = {"10": {"A": {"files_per_sec": 100, "relative_speed": 0.12}}}
+    assert find_regressions([res], baseline, 10) == []  # e.g. a slower machine
+    baseline["10"]["A"]["relative_speed"] = 0.2
+    assert len(find_regressions([res], baseline, 10)) == 1
+    assert find_regressions([res], {}, 10) == []
+
+
+def test_fake_llm_errors():
+    import openai
+
+    from qualiluma.checks import FileCheckResult
+    from qualiluma.util.fake_llm import FakeChatModel, FakeSettings
+
+    model = FakeChatModel(settings=FakeSettings(rate_limit_rate=1.0))
+    with pytest.raises(openai.RateLimitError):
+        model.invoke("hello")
+
+    model = FakeChatModel(settings=FakeSettings(error_rate=1.0))
+    with pytest.raises(openai.InternalServerError):
+        model.invoke("hello")
+
+    model = FakeChatModel(
+        settings=FakeSettings(
+            latency={"distribution": "uniform", "low": 0.0, "high": 0.001},
+            responses={
+                "FileCheckResult": {
+                    "was_checked": True,
+                    "issues": [{"check_name": "x", "message": "bad", "severity": 3}],
+                }
+            },
+        )
+    )
+    res = model.with_structured_output(FileCheckResult).invoke("hello")
+    assert len(res.issues) == 1
+    assert model.invoke("hello").usage_metadata["input_tokens"] > 0
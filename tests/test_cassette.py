@@ -0,0 +1,64 @@
+from pathlib import Path
+
+import pytest
+
+from qualiluma.checks import FileCheckResult
+from qualiluma.main import main
+from qualiluma.util.cassette import Cassette, CassetteMissError, request_key
+from qualiluma.util.llm import configure_llms, get_llm_client
+
+
+@pytest.fixture(autouse=True)
+def reset_llms():
+    yield
+    configure_llms()
+
+
+def test_cassette_store(tmp_path: Path):
+    key = request_key("model", "Schema", "{}", "prompt")
+    assert key != request_key("model", "Schema", "{}", "other prompt")
+    assert key != request_key("other model", "Schema", "{}", "prompt")
+
+    cassette = Cassette(tmp_path / "tape")
+    with pytest.raises(CassetteMissError):
+        cassette.get(key)
+    cassette.record(key, "model", "Schema", {"a": 1}, {"model": {"input_tokens": 3}})
+
+    reloaded = Cassette(tmp_path / "tape")
+    assert len(reloaded) == 1
+    assert reloaded.get(key)["output"] == {"a": 1}
+    assert "prompt" not in (tmp_path / "tape" / "cassette.jsonl").read_text()
+
+
+def test_record_and_replay(tmp_path: Path):
+    tape = tmp_path / "tape"
+    configure_llms(backend="fake", record=tape)
+    client = get_llm_client("fast")
+    recorded = client.structured_output("check this", FileCheckResult)
+    recorded_text = client("say something")
+
+    configure_llms(replay=tape)
+    client = get_llm_client("fast")
+    assert client.client is None  # no backend needed
+    assert client.structured_output("check this", FileCheckResult) == recorded
+    assert client("say something") == recorded_text
+    with pytest.raises(CassetteMissError):
+        client.structured_output("not recorded", FileCheckResult)
+
+
+def test_main_record_replay(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    code_dir = tmp_path / "code"
+    code_dir.mkdir()
+    (code_dir / "a.py").write_text("a = 1\n")
+    tape = tmp_path / "tape"
+
+    args = ["qualiluma", str(code_dir), "-c", "PepChecker"]
+    monkeypatch.setattr(
+        "qualiluma.main.sys.argv",
+        args + ["--llm-backend", "fake", "--record", str(tape)],
+    )
+    assert main() == 0
+    assert (tape / "cassette.jsonl").exists()
+
+    monkeypatch.setattr("qualiluma.main.sys.argv", args + ["--replay", str(tape)])
+    assert main() == 0
@@ -0,0 +1,61 @@
+import time
+from pathlib import Path
+
+import pytest
+
+from qualiluma.main import EXIT_LLM_UNAVAILABLE, build_checkers, check, check_path
+from qualiluma.util import Config
+from qualiluma.util.circuit import CircuitBreaker, LLMUnavailableError
+from qualiluma.util.llm import configure_llms
+from qualiluma.util.mock_server import MockOpenAIServer, MockServerSettings
+
+
+def test_circuit_breaker():
+    breaker = CircuitBreaker("test", threshold=2, probe_interval=0.1)
+    for _ in range(2):
+        assert breaker.before_call() is False
+        breaker.record(False)
+    assert breaker.is_open
+    with pytest.raises(LLMUnavailableError):
+        breaker.before_call()
+
+    time.sleep(0.1)
+    assert breaker.before_call() is True  # a single probe
+    with pytest.raises(LLMUnavailableError):
+        breaker.before_call()
+    breaker.record(False, probe=True)
+    with pytest.raises(LLMUnavailableError):
+        breaker.before_call()  # the next probe is later
+
+    time.sleep(0.1)
+    assert breaker.before_call() is True
+    breaker.record(True, probe=True)
+    assert not breaker.is_open
+    assert breaker.before_call() is False
+
+
+def test_provider_outage(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr("qualiluma.util.llm.RETRY_BASE_DELAY", 0)
+    for i in range(6):
+        (tmp_path / f"{i}.py").write_text(f"a = {i}\n")
+
+    settings = MockServerSettings(error_rate=1.0)
+    with MockOpenAIServer(settings=settings) as server:
+        configure_llms(
+            base_url=server.url, api_key="test", max_retries=1, circuit_threshold=2
+        )
+        try:
+            checkers = build_checkers(Config(), "PepChecker")
+            results = check_path(tmp_path, checkers)["PepChecker"]
+            assert server.requests_count == 4  # two files with a retry each
+
+            messages = [res.issues[0].message for res in results.values() if res.issues]
+            assert messages.count("LLM unavailable") == 4
+
+            # the circuit of a new client is closed, but fails fast again
+            configure_llms(
+                base_url=server.url, api_key="test", max_retries=0, circuit_threshold=1
+            )
+            assert check(tmp_path, "PepChecker", fail_fast=True) == EXIT_LLM_UNAVAILABLE
+        finally:
+            configure_llms()
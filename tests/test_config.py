@@ -1,3 +1,5 @@
+import pytest
+
 from qualiluma.util import Config
 
 
@@ -25,3 +27,45 @@ class TestConfig:
         assert "build" in ignored_dirs
         assert "tmp" in ignored_dirs
         assert "base.py" not in ignored_dirs
+
+    def test_get_file_type(self):
+        config = Config()
+        assert config.get_file_type(".py") == "python"
+        assert config.get_file_type(".htm") == "html"
+        assert config.get_file_type(".unknown") is None
+
+    def test_compiled_lookups(self):
+        config = Config()
+        assert config.is_checked_extension(".py")
+        assert config.is_checked_extension(".txt")
+        assert not config.is_checked_extension(".unknown")
+        assert config.is_ignored_directory("node_modules")
+        assert not config.is_ignored_directory("src")
+
+        assert config.get_checker_extensions("PepChecker") == frozenset({".py"})
+        llm_extensions = config.get_checker_extensions("LLMSimpleChecker")
+        assert ".py" in llm_extensions and ".html" not in llm_extensions
+        assert config.get_checker_extensions("UnknownChecker") is None
+
+        extra = config.get_checker_extra("PepChecker")
+        extra["languages"].append("markdown")  # a copy, the config is unchanged
+        assert Config().get_checker_extra("PepChecker")["languages"] == ["python"]
+
+    def test_compile_errors(self, tmp_path, monkeypatch):
+        import yaml
+
+        from qualiluma.util import config as config_module
+
+        raw = config_module.read_config_file()
+        path = tmp_path / "config.yaml"
+        bad = {**raw, "directories": {"ignore": ["*.egg-info", "build"]}}
+        path.write_text(yaml.safe_dump(bad))
+        monkeypatch.setattr(config_module, "CONFIG_PATH", path)
+        assert Config().is_ignored_directory("qualiluma.egg-info")
+
+        bad["checkers_extra"] = [{"name": "PepChecker", "languages": ["cobol"]}]
+        path = tmp_path / "bad.yaml"
+        path.write_text(yaml.safe_dump(bad))
+        monkeypatch.setattr(config_module, "CONFIG_PATH", path)
+        with pytest.raises(config_module.ConfigError, match="cobol"):
+            Config()
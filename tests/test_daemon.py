@@ -0,0 +1,94 @@
+import threading
+from pathlib import Path
+
+import pytest
+
+from qualiluma.checks import FileCheckResult
+from qualiluma.checks.base import CheckerABC
+from qualiluma.daemon import CheckServer, check_with_daemon
+from qualiluma.util.cache import ResultCache
+from qualiluma.util.llm import configure_llms
+from qualiluma.util.metrics import METRICS
+
+
+def test_result_cache():
+    cache = ResultCache(max_entries=2)
+    cache.put("ns", "a", 1)
+    cache.put("ns", "b", 2)
+    assert cache.get("ns", "a") == 1
+    cache.put("ns", "c", 3)  # evicts "b", the least recently used
+    assert cache.get("ns", "b") is None
+    assert cache.get("other", "a") is None
+    assert len(cache) == 2
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+def test_checker_result_cache(tmp_path: Path, fake_config):
+    class CountingChecker(CheckerABC):
+        calls = 0
+
+        def _check_file_impl(self, file_path: Path) -> FileCheckResult:
+            CountingChecker.calls += 1
+            return FileCheckResult(was_checked=True, issues=[])
+
+    checker = CountingChecker(fake_config)
+    checker.result_cache = ResultCache()
+    (tmp_path / "a.py").write_text("a = 1\n")
+    (tmp_path / "b.py").write_text("a = 1\n")  # same content
+
+    checker.check_directory(tmp_path)
+    assert CountingChecker.calls == 1
+    (tmp_path / "b.py").write_text("b = 2\n")
+    checker.check_directory(tmp_path)
+    assert CountingChecker.calls == 2
+
+
+@pytest.fixture
+def server(tmp_path: Path):
+    configure_llms(backend="fake")
+    server = CheckServer(tmp_path / "test.sock")
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+    configure_llms()
+
+
+def test_check_with_daemon(tmp_path: Path, server: CheckServer):
+    code_dir = tmp_path / "code"
+    code_dir.mkdir()
+    (code_dir / "good.py").write_text("a = 1\n")
+    socket_path = server.socket_path
+
+    assert check_with_daemon(code_dir, socket_path, "trailing newline") == 0
+    assert check_with_daemon(code_dir / "good.py", socket_path) == 0
+    (code_dir / "bad.py").write_text("a = 1")
+    assert check_with_daemon(code_dir, socket_path, "trailing newline") == 1
+
+    # good.py is cached by the single file check, bad.py by the first run
+    hits = server.cache.hits
+    assert check_with_daemon(code_dir, socket_path, "PepChecker") == 0
+    assert check_with_daemon(code_dir, socket_path, "PepChecker") == 0
+    assert server.cache.hits == hits + 3
+
+    # warm checkers and metrics keep nothing of earlier requests
+    checkers = server.get_checkers("PepChecker", False)
+    assert [len(checker.statistics) for checker in checkers] == [2]
+    assert len(METRICS.records) == 2
+
+    assert check_with_daemon(tmp_path / "missing", socket_path) == 1
+    assert check_with_daemon(code_dir, socket_path, "no_such_checker") == 1
+
+
+def test_daemon_client(tmp_path: Path, server: CheckServer, monkeypatch, capsys):
+    from qualiluma import daemon_client
+
+    (tmp_path / "bad.py").write_text("a = 1")
+    argv = ["daemon_client", str(tmp_path), "--socket", str(server.socket_path)]
+    monkeypatch.setattr("sys.argv", argv + ["-c", "trailing newline"])
+    assert daemon_client.main() == 1
+    assert "bad.py:1: ERROR: trailing newline" in capsys.readouterr().out
+
+    monkeypatch.setattr("sys.argv", argv + ["-c", "no_such_checker"])
+    assert daemon_client.main() == 1
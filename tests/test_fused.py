@@ -0,0 +1,73 @@
+from pathlib import Path
+
+from qualiluma.checks.fused import PromptFuser, _field_name
+from qualiluma.checks.gates import gate_no_errors
+from qualiluma.main import build_checkers, check_path
+from qualiluma.util import Config
+from qualiluma.util.llm import configure_llms
+from qualiluma.util.metrics import METRICS
+
+LLM_CHECKERS = "LLMSimpleChecker,VariablesConsistencyChecker,PepChecker"
+
+
+def _llm_calls(checkers, tmp_path: Path) -> tuple[dict, int]:
+    METRICS.clear()
+    results = check_path(tmp_path, checkers)
+    return results, sum(info["llm_calls"] for info in METRICS.summary().values())
+
+
+def test_field_name():
+    assert _field_name("PepChecker") == "pep_checker"
+    assert _field_name("LLMSimpleChecker") == "llmsimple_checker"
+    assert _field_name("local rules") == "local_rules"
+
+
+def test_fused_checks(tmp_path: Path):
+    for i in range(3):
+        (tmp_path / f"{i}.py").write_text(f"a = {i}\n")
+    issue = {"check_name": "llm", "message": "bad", "severity": 2}
+    bad = {"was_checked": True, "issues": [issue]}
+    configure_llms(backend="fake", fake={"responses": {"FileCheckResult": bad}})
+    try:
+        separate, separate_calls = _llm_calls(
+            build_checkers(Config(), LLM_CHECKERS), tmp_path
+        )
+        checkers = build_checkers(Config(), LLM_CHECKERS, fused=True)
+        fused, fused_calls = _llm_calls(checkers, tmp_path)
+    finally:
+        configure_llms()
+
+    assert isinstance(checkers[0].fuser, PromptFuser)
+    assert separate_calls == 12  # the variables check needs two requests
+    assert fused_calls == 3
+    assert fused.keys() == separate.keys()
+    for name in fused:
+        assert fused[name].keys() == separate[name].keys()
+        assert all(res.issues[0].message == "bad" for res in fused[name].values())
+    assert not checkers[0].fuser._sections  # all sections were taken
+
+
+def test_fused_sections_dropped(tmp_path: Path, monkeypatch):
+    for i in range(3):
+        (tmp_path / f"{i}.py").write_text(f"a = {i}\n")
+    issue = {"check_name": "llm", "message": "bad", "severity": 3}
+    error = {"was_checked": True, "issues": [issue]}
+    configure_llms(backend="fake", fake={"responses": {"FileCheckResult": error}})
+    try:
+        checkers = build_checkers(Config(), LLM_CHECKERS, fused=True)
+        fuser = checkers[0].fuser
+        monkeypatch.setattr("qualiluma.checks.fused.MAX_SECTIONS", 2)
+        for i in range(3):
+            fuser.check(checkers[0], tmp_path / f"{i}.py")
+        assert len(fuser._sections) == 2  # the oldest one is dropped
+
+        # the other checkers skip the files by their no_errors gate
+        for checker in checkers[1:]:
+            checker.gates.append(gate_no_errors)
+        monkeypatch.setattr("qualiluma.checks.fused.MAX_SECTIONS", 10)
+        results = check_path(tmp_path, checkers)
+    finally:
+        configure_llms()
+
+    assert not results["PepChecker"][tmp_path / "0.py"].was_checked
+    assert not fuser._sections
@@ -0,0 +1,78 @@
+from pathlib import Path
+
+from qualiluma.checks import CostTier, FileCheckResult, Severity
+from qualiluma.checks.base import FileCheckResultBuilder
+from qualiluma.checks.gates import gate_no_errors, gate_not_generated, gate_parses
+from qualiluma.main import build_checkers, check_path, order_by_cost
+from qualiluma.util import Config
+from qualiluma.util.llm import configure_llms
+from qualiluma.util.metrics import METRICS
+
+
+def test_gates(tmp_path: Path):
+    good = tmp_path / "good.py"
+    good.write_text("a = 1\n")
+    broken = tmp_path / "broken.py"
+    broken.write_text("def f(:\n")
+    generated = tmp_path / "gen.js"
+    generated.write_text("// Code generated by protoc. DO NOT EDIT.\nvar a = 1;\n")
+
+    assert gate_parses(good, {}) is None
+    assert gate_parses(broken, {}) == "Python syntax error at line 1"
+    assert gate_parses(generated, {}) is None  # not Python
+
+    assert gate_not_generated(good, {}) is None
+    assert gate_not_generated(generated, {}) == "Generated file"
+    texts = {
+        '"""The report generated by the exporter, do not edit by hand."""\n': None,
+        "# ids are auto-generated by the database\n": None,
+        'MESSAGE = "DO NOT EDIT"\n': None,
+        "# @generated by tool\n": "Generated file",
+        "/*\n * DO NOT EDIT\n */\n": "Generated file",
+    }
+    for i, (text, reason) in enumerate(texts.items()):
+        (tmp_path / f"{i}.py").write_text(text)
+        assert gate_not_generated(tmp_path / f"{i}.py", {}) == reason, text
+
+    builder = FileCheckResultBuilder("A")
+    warning = builder.failed("meh", severity=Severity.WARNING)
+    assert gate_no_errors(good, {"A": builder.passed(), "B": warning}) is None
+    assert gate_no_errors(good, {"A": builder.failed()}) is not None
+    assert (
+        gate_no_errors(good, {"A": FileCheckResult(was_checked=False, issues=[])})
+        is None
+    )
+
+
+def test_check_path_gating(tmp_path: Path):
+    (tmp_path / "good.py").write_text("a = 1\n")
+    (tmp_path / "broken.py").write_text("def f(:\n")
+    (tmp_path / "no_newline.py").write_text("a = 1")
+    (tmp_path / "script.js").write_text("var a = 1;\n")
+
+    configure_llms(backend="fake")
+    try:
+        checkers = build_checkers(Config(), "PepChecker,python syntax,trailing newline")
+        assert [c.get_cost_tier() for c in order_by_cost(checkers)] == [
+            CostTier.LOCAL,
+            CostTier.LOCAL,
+            CostTier.LLM,
+        ]
+        METRICS.clear()
+        results = check_path(tmp_path, checkers)
+    finally:
+        configure_llms()
+
+    # the result order follows the requested checkers
+    assert list(results) == ["PepChecker", "python syntax", "trailing newline"]
+    syntax = results["python syntax"]
+    assert syntax[tmp_path / "broken.py"].issues[0].line == 1
+    assert not syntax[tmp_path / "script.js"].was_checked
+
+    pep = results["PepChecker"]
+    # a cosmetic error found earlier doesn't skip the LLM check
+    assert pep[tmp_path / "good.py"].was_checked
+    assert pep[tmp_path / "no_newline.py"].was_checked
+    for name in ["broken.py", "script.js"]:
+        assert pep[tmp_path / name] == FileCheckResult(was_checked=False, issues=[])
+    assert sum(record.llm_calls for record in METRICS.records) == 2
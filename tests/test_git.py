@@ -0,0 +1,68 @@
+import subprocess
+from pathlib import Path
+
+import pytest
+
+from qualiluma.main import build_checkers, check, check_path
+from qualiluma.util import Config, file_digest, load_numbered
+from qualiluma.util.git import GitError, GitRevisionSource
+from qualiluma.util.sources import mount
+
+
+def _git(repo: Path, *args: str) -> str:
+    return subprocess.run(
+        ["git", "-c", "user.name=test", "-c", "user.email=test@example.com", *args],
+        cwd=repo,
+        capture_output=True,
+        check=True,
+        text=True,
+    ).stdout.strip()
+
+
+@pytest.fixture
+def repo(tmp_path: Path) -> Path:
+    _git(tmp_path, "init", "-q")
+    (tmp_path / "src").mkdir()
+    (tmp_path / "node_modules").mkdir()
+    (tmp_path / "src" / "a.py").write_text("a = 1")  # no trailing newline
+    (tmp_path / "src" / "copy.py").write_text("a = 1")
+    (tmp_path / "node_modules" / "b.py").write_text("b = 2")
+    (tmp_path / "data.bin").write_bytes(b"not code")
+    _git(tmp_path, "add", ".")
+    _git(tmp_path, "commit", "-q", "-m", "first")
+    # the working tree and the next commit fix the files
+    (tmp_path / "src" / "a.py").write_text("a = 1\n")
+    (tmp_path / "src" / "copy.py").write_text("a = 1\n")
+    _git(tmp_path, "commit", "-q", "-am", "second")
+    return tmp_path
+
+
+def test_revision_source(repo: Path):
+    source = GitRevisionSource(repo, "HEAD~1")
+    assert source.root.name.startswith(f"{repo.name}@")
+    assert len(source) == 4
+    path = source.virtual_path(repo / "src" / "a.py")
+    with mount(source):
+        assert load_numbered(path) == "1: a = 1"
+        assert file_digest(path) == file_digest(source.root / "src" / "copy.py")
+        checker = build_checkers(Config(), "trailing newline")[0]
+        assert sorted(checker.iter_files(source.root)) == [
+            source.root / "src" / "a.py",
+            source.root / "src" / "copy.py",
+        ]
+    assert source._process is None  # closed
+
+    with pytest.raises(GitError):
+        GitRevisionSource(repo, "no-such-branch")
+
+
+def test_check_rev(repo: Path):
+    assert check(repo, "trailing newline") == 0
+    assert check(repo, "trailing newline", rev="HEAD~1") == 1
+    assert check(repo / "src" / "a.py", "trailing newline", rev="HEAD~1") == 1
+    assert check(repo, "trailing newline", rev="no-such-branch") == 1
+
+    source = GitRevisionSource(repo, "HEAD~1")
+    with mount(source):
+        results = check_path(source.root, build_checkers(Config(), "trailing newline"))
+    assert {path.name for path in results["trailing newline"]} == {"a.py", "copy.py"}
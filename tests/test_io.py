@@ -0,0 +1,51 @@
+import hashlib
+from pathlib import Path
+
+import pytest
+
+from qualiluma.checks.gates import gate_not_binary
+from qualiluma.util import file_digest, io, load_numbered
+from qualiluma.util.io import BinaryFileError, detect_encoding, load_file
+
+
+def test_detect_encoding():
+    assert detect_encoding(b"a = 1\n") == "utf-8"
+    assert detect_encoding(b"\xef\xbb\xbfa = 1\n") == "utf-8-sig"
+    assert detect_encoding("a = 1\n".encode("utf-16")) == "utf-16"
+    assert detect_encoding(b"#!/bin/python\n# -*- coding: latin-1 -*-\n") == (
+        "iso8859-1"
+    )
+    assert detect_encoding(b"\n\n# coding: latin-1\n") == "utf-8"  # third line
+    assert detect_encoding(b"\x89PNG\r\n\x1a\n\0\0\0\rIHDR") is None
+
+
+def test_load_numbered(tmp_path: Path):
+    path = tmp_path / "a.py"
+    path.write_bytes(b"def f():  \r\n\treturn 1\t\r\n\n  x = 2")
+    assert load_numbered(path) == "1: def f():\n2: \treturn 1\n3: \n4:   x = 2"
+    source = load_file(path)
+    assert source.lines == ["def f():  ", "\treturn 1\t", "", "  x = 2"]
+    assert source.line_offsets == [0, 11, 22, 23]
+    assert source.line_at(source.text.index("x")) == 4
+
+    path.write_bytes("# café\n".encode("cp1252"))  # not UTF-8
+    assert load_numbered(path) == "1: # café"
+    assert load_file(path).encoding == "cp1252"
+
+    path.write_bytes(b"")
+    assert load_numbered(path) == ""
+
+    path.write_bytes(b"\0\1\2")
+    assert gate_not_binary(path, {}) == "Binary file"
+    with pytest.raises(BinaryFileError):
+        load_numbered(path)
+
+
+def test_load_large_file(tmp_path: Path, monkeypatch):
+    monkeypatch.setattr(io, "MMAP_MIN_BYTES", 10)
+    path = tmp_path / "big.py"
+    content = "".join(f"x{i} = {i}\n" for i in range(100)).encode()
+    path.write_bytes(content)
+
+    assert file_digest(path) == hashlib.sha256(content).hexdigest()
+    assert load_numbered(path).split("\n")[-1] == "100: x99 = 99"
@@ -1,8 +1,12 @@
 """Simple tests for the LLM module"""
 
+import time
+from pathlib import Path
+
 import pytest
 
-from qualiluma.util.llm import get_llm_client
+from qualiluma.util.balancer import Endpoint, EndpointBalancer
+from qualiluma.util.llm import LLMClient, get_llm_client
 
 
 @pytest.mark.slow
@@ -25,6 +29,12 @@ def MockClient(is_initialized):
     return _MockClient
 
 
+def use_runnable(client: LLMClient, runnable) -> LLMClient:
+    """Send the requests of the client to a runnable."""
+    client.balancer = EndpointBalancer([Endpoint("test", runnable)])
+    return client
+
+
 def test_get_llm_client(monkeypatch):
     some_true = MockClient(True)()
     monkeypatch.setattr("qualiluma.util.llm._LLM_CLIENTS", {"some_true": some_true})
@@ -35,3 +45,163 @@ def test_get_llm_client(monkeypatch):
 
     monkeypatch.setattr("qualiluma.util.llm.LLMClient", MockClient(True))
     assert get_llm_client("abc") is not None
+
+
+def test_llm_client_retries(monkeypatch):
+    import httpx
+    import openai
+
+    from qualiluma.util.llm import LLMClient
+    from qualiluma.util.metrics import MetricsRegistry
+
+    class FlakyRunnable:
+        def __init__(self, failures):
+            self.failures = failures
+
+        def invoke(self, messages, config):
+            if self.failures > 0:
+                self.failures -= 1
+                raise openai.APIConnectionError(request=httpx.Request("POST", "/"))
+            return "ok"
+
+    monkeypatch.setattr("qualiluma.util.llm.RETRY_BASE_DELAY", 0)
+    client = LLMClient("fast")
+    client.max_retries = 2
+
+    registry = MetricsRegistry()
+    with registry.track("checker", Path("a.py")) as record:
+        assert use_runnable(client, FlakyRunnable(2))._invoke("query")[0] == "ok"
+    assert record.retries == 2
+    assert record.llm_calls == 1
+    assert "llm_latency" in record.durations
+
+    with pytest.raises(openai.APIConnectionError):
+        use_runnable(client, FlakyRunnable(3))._invoke("query")
+
+
+def test_llm_client_retry_after(monkeypatch):
+    import httpx
+    import openai
+
+    class RateLimitedRunnable:
+        def __init__(self, headers):
+            self.headers = headers
+
+        def invoke(self, messages, config):
+            if self.headers is None:
+                return "ok"
+            request = httpx.Request("POST", "/")
+            response = httpx.Response(429, headers=self.headers, request=request)
+            self.headers = None
+            raise openai.RateLimitError("slow down", response=response, body=None)
+
+    delays = []
+    monkeypatch.setattr("qualiluma.util.llm._sleep", delays.append)
+    monkeypatch.setattr("qualiluma.util.llm.RETRY_BASE_DELAY", 0.5)
+    client = LLMClient("fast")
+    client.max_retries = 1
+    for headers in [{"retry-after-ms": "1500"}, {"Retry-After": "2"}, {}]:
+        runnable = RateLimitedRunnable(headers)
+        assert use_runnable(client, runnable)._invoke("query")[0] == "ok"
+    assert delays == [1.5, 2.0, 0.5]  # the backoff if the header asks for less
+
+    # with other endpoints up, the request fails over at once, the rate
+    # limited endpoint stays out for at least the asked time
+    limited = Endpoint("limited", RateLimitedRunnable({"retry-after": "30"}))
+    other = Endpoint("other", RateLimitedRunnable(None))
+    client.balancer = EndpointBalancer([limited, other])
+    assert client._invoke("query")[0] == "ok"
+    assert delays[-1] == 0.0
+    assert limited.down_until - time.monotonic() > 29
+
+
+def test_llm_client_cancellable():
+    import threading
+    import time
+
+    from qualiluma.util.llm import LLMCancelledError, LLMClient, cancellable
+
+    class SlowRunnable:
+        def invoke(self, messages, config):
+            time.sleep(5)
+            return "late"
+
+    class FastRunnable:
+        def invoke(self, messages, config):
+            return "ok"
+
+    client = LLMClient("fast")
+    event = threading.Event()
+    with cancellable(event):
+        assert use_runnable(client, FastRunnable())._invoke("query")[0] == "ok"
+
+        threading.Timer(0.1, event.set).start()
+        start = time.perf_counter()
+        with pytest.raises(LLMCancelledError):
+            use_runnable(client, SlowRunnable())._invoke("query")
+        assert time.perf_counter() - start < 1
+
+        with pytest.raises(LLMCancelledError):  # already cancelled
+            use_runnable(client, FastRunnable())._invoke("query")
+
+
+class ScriptedRunnable:
+    """Answers with a fake model after scripted delays, one per request."""
+
+    def __init__(self, delays):
+        from qualiluma.util.fake_llm import FakeChatModel
+
+        self.delays = iter(delays)
+        self.model = FakeChatModel(model_name="fake")
+
+    def invoke(self, messages, config):
+        import time
+
+        time.sleep(next(self.delays))
+        return self.model.invoke(messages, config)
+
+
+def test_llm_client_timeout_and_hedge(monkeypatch):
+    import time
+
+    from qualiluma.util.llm import LLMClient
+    from qualiluma.util.metrics import MetricsRegistry
+
+    monkeypatch.setattr("qualiluma.util.llm.RETRY_BASE_DELAY", 0)
+    client = LLMClient("fast")
+    client.timeout = 0.3
+    client.max_retries = 1
+
+    registry = MetricsRegistry()
+    with registry.track("checker", Path("a.py")) as record:
+        # the first request times out, the retry answers
+        use_runnable(client, ScriptedRunnable([1.0, 0.0]))._invoke("query")
+    assert record.llm_calls == 1
+    assert record.retries == 1
+
+    client.hedge = True
+    for _ in range(20):
+        client.latencies.add(0.05)
+    start = time.perf_counter()
+    with registry.track("checker", Path("b.py")) as record:
+        use_runnable(client, ScriptedRunnable([0.5, 0.0]))._invoke("query")
+    assert time.perf_counter() - start < 0.25  # the duplicate answered first
+    assert record.hedges == 1
+    assert record.retries == 0
+    time.sleep(0.5)  # the abandoned request still counts its usage
+    assert record.llm_calls == 1
+    assert record.input_tokens > 0
+    assert record.input_tokens % 2 == 0  # two identical requests
+
+
+def test_llm_client_deadline():
+    import time
+
+    from qualiluma.util.deadline import DeadlineExceededError, run_deadline
+    from qualiluma.util.llm import LLMClient
+
+    client = LLMClient("fast")
+    start = time.perf_counter()
+    with run_deadline(0.1), pytest.raises(DeadlineExceededError):
+        use_runnable(client, ScriptedRunnable([2.0]))._invoke("query")
+    assert time.perf_counter() - start < 1
@@ -0,0 +1,70 @@
+from pathlib import Path
+
+from qualiluma.util.logs import flush_logging, get_logger, init_logging, log_payload
+
+
+def test_payload_log(tmp_path: Path):
+    log_file = tmp_path / "main.log"
+    payload_file = tmp_path / "payload.log"
+
+    class Payload:
+        formatted = 0
+
+        def __str__(self):
+            Payload.formatted += 1
+            return "big prompt"
+
+    # payloads are neither formatted nor logged without the payload log
+    init_logging(str(log_file))
+    log_payload(__name__, "prompt", Payload())
+    flush_logging()
+    assert Payload.formatted == 0
+    assert not payload_file.exists()
+
+    init_logging(str(log_file), payload_log_file=str(payload_file))
+    get_logger(__name__).info("regular message")
+    log_payload(__name__, "prompt", Payload())
+    flush_logging()
+
+    assert Payload.formatted == 1
+    assert "prompt:\nbig prompt" in payload_file.read_text()
+    assert "big prompt" not in log_file.read_text()
+    assert "regular message" in log_file.read_text()
+    assert "regular message" not in payload_file.read_text()
+
+
+def test_payload_log_size_cap(tmp_path: Path):
+    payload_file = tmp_path / "payload.log"
+    init_logging(
+        str(tmp_path / "main.log"),
+        payload_log_file=str(payload_file),
+        payload_log_max_bytes=1000,
+    )
+    for _ in range(50):
+        log_payload(__name__, "response", "x" * 200)
+    flush_logging()
+
+    payload_logs = list(tmp_path.glob("payload*.log"))
+    assert len(payload_logs) <= 2  # current file and one rotated
+    assert sum(p.stat().st_size for p in payload_logs) < 3000
+
+
+def test_debug_not_formatted(tmp_path: Path):
+    class Arg:
+        formatted = 0
+
+        def __str__(self):
+            Arg.formatted += 1
+            return "arg"
+
+    log_file = tmp_path / "main.log"
+    init_logging(str(log_file))  # INFO in the file and on the console
+    get_logger(__name__).debug("checking {}", Arg())
+    flush_logging()
+    assert Arg.formatted == 0
+
+    init_logging(str(log_file), file_log_level="DEBUG")
+    get_logger(__name__).debug("checking {}", Arg())
+    flush_logging()
+    assert Arg.formatted == 1
+    assert "checking arg" in log_file.read_text()
@@ -3,9 +3,11 @@ from pathlib import Path
 import pytest
 
 from qualiluma.checks.base import FileCheckResultBuilder
-from qualiluma.main import build_checkers, check, main, visualize_results
+from qualiluma.main import build_checkers, check, check_path, main, visualize_results
 from qualiluma.util import Config
-from qualiluma.util.logs import init_logging
+from qualiluma.util.deadline import run_deadline
+from qualiluma.util.llm import configure_llms
+from qualiluma.util.logs import flush_logging, init_logging
 
 
 @pytest.mark.slow
@@ -82,6 +84,7 @@ def test_visualize_results(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
     issues.append(issues[0])  # duplicate issue to test multiple issues
 
     visualize_results(results)
+    flush_logging()
 
     log_contents = log_file.read_text()
 
@@ -91,9 +94,11 @@ def test_visualize_results(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
     assert "Check status: '❌ Errors found'" in log_contents
     assert "  - ❌ Found issues in 1 files by 'CheckerAlpha'." in log_contents
     assert "  - ✅ No issues found by 'CheckerBeta'" in log_contents
+    assert "    ⏭️  1 files skipped" in log_contents
 
     monkeypatch.setattr("qualiluma.main.contains_errors", lambda x: False)
     visualize_results(results)
+    flush_logging()
     log_contents = log_file.read_text()
     assert "Inconsistent error detection state" in log_contents
 
@@ -111,3 +116,35 @@ def test_main(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
         ["qualiluma", str(tmp_path), "--checkers", "trailing newline"],
     )
     assert main() == 1
+
+
+def test_main_fake_llm(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    (tmp_path / "test_file.py").write_text("print('Hello, World!')\n")
+    monkeypatch.setattr(
+        "qualiluma.main.sys.argv",
+        ["qualiluma", str(tmp_path), "--llm-backend", "fake"],
+    )
+    try:
+        assert main() == 0
+    finally:
+        configure_llms()
+
+
+def test_check_path_deadline(tmp_path: Path):
+    import time
+
+    for i in range(6):
+        (tmp_path / f"{i}.py").write_text(f"a = {i}\n")
+    configure_llms(backend="fake", fake={"latency": {"value": 0.3}})
+    try:
+        checkers = build_checkers(Config(), "PepChecker")
+        start = time.perf_counter()
+        with run_deadline(0.5):
+            results = check_path(tmp_path, checkers)["PepChecker"]
+    finally:
+        configure_llms()
+
+    assert time.perf_counter() - start < 1.5
+    late = [res for res in results.values() if not res.was_checked]
+    assert 0 < len(late) < 6
+    assert all(res.issues[0].message == "deadline exceeded" for res in late)
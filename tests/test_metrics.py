@@ -0,0 +1,153 @@
+import json
+from pathlib import Path
+
+from qualiluma.checks.base import (
+    BUDGET_EXCEEDED,
+    CheckerABC,
+    CostTier,
+    FileCheckResult,
+)
+from qualiluma.main import check
+from qualiluma.util.metrics import (
+    MetricsRegistry,
+    _percentile,
+    add_llm_usage,
+    current,
+    stage,
+)
+
+
+class TestMetricsRegistry:
+    def test_percentile(self):
+        assert _percentile([], 0.5) == 0.0
+        assert _percentile([1.0], 0.99) == 1.0
+        assert _percentile([1.0, 2.0, 3.0], 0.5) == 2.0
+        assert _percentile([0.0, 10.0], 0.95) == 9.5
+
+    def test_track_and_summary(self, tmp_path: Path):
+        registry = MetricsRegistry()
+        assert current() is None
+
+        for i in range(3):
+            with registry.track("A", tmp_path / f"{i}.py") as record:
+                assert current() is record
+                with stage("read"):
+                    pass
+                add_llm_usage(input_tokens=10, cached_tokens=4, cost=0.5, retries=i)
+
+        assert current() is None
+        add_llm_usage(input_tokens=100)  # no current file, ignored
+
+        summary = registry.summary()
+        assert summary["A"]["files"] == 3
+        assert summary["A"]["llm_calls"] == 3
+        assert summary["A"]["retries"] == 3
+        assert summary["A"]["input_tokens"] == 30
+        assert summary["A"]["cached_tokens"] == 12
+        assert summary["A"]["cost"] == 1.5
+        assert summary["A"]["stages"]["read"]["count"] == 3
+        assert "llm_latency" not in summary["A"]["stages"]
+
+        registry.export_json(tmp_path / "metrics.json")
+        data = json.loads((tmp_path / "metrics.json").read_text())
+        assert len(data["files"]) == 3
+        assert data["checkers"]["A"]["files"] == 3
+
+        registry.export_prometheus(tmp_path / "metrics.prom")
+        prom = (tmp_path / "metrics.prom").read_text()
+        assert 'qualiluma_files_total{checker="A"} 3' in prom
+        assert (
+            'qualiluma_stage_seconds{checker="A",stage="read",quantile="0.5"}' in prom
+        )
+
+        registry.clear()
+        assert registry.summary() == {}
+
+    def test_usage_breakdown(self, tmp_path: Path):
+        registry = MetricsRegistry()
+        usage = [
+            ("A", "src/a.py", "gpt-4", 0.5),
+            ("A", "src/a.py", "gpt-3", 0.1),
+            ("A", "tests/b.py", "gpt-4", 0.2),
+            ("B", "src/a.py", "gpt-4", 1.0),
+        ]
+        for checker, file, model, cost in usage:
+            with registry.track(checker, Path(file), tier="llm"):
+                add_llm_usage(input_tokens=10, output_tokens=5, cost=cost, model=model)
+
+        by_checker = registry.usage_breakdown(("checker",))
+        assert [(r["checker"], r["cost"]) for r in by_checker] == [
+            ("B", 1.0),
+            ("A", 0.8),
+        ]
+        by_directory = registry.usage_breakdown(("directory", "tier"))
+        assert by_directory[0]["directory"] == "src"
+        assert by_directory[0]["tier"] == "llm"
+        assert by_directory[0]["input_tokens"] == 30
+
+        top = registry.top_files(1)
+        assert top == [registry.usage_breakdown(("file",))[0]]
+        assert top[0]["file"] == str(Path("src/a.py"))
+        assert top[0]["output_tokens"] == 15
+
+        registry.export_json(tmp_path / "metrics.json")
+        data = json.loads((tmp_path / "metrics.json").read_text())
+        assert {(r["checker"], r["model"]) for r in data["usage"]} == {
+            ("A", "gpt-4"),
+            ("A", "gpt-3"),
+            ("B", "gpt-4"),
+        }
+        assert len(data["top_files"]) == 2
+
+    def test_checker_budget(self, tmp_path: Path, fake_config):
+        class PaidChecker(CheckerABC):
+            cost_tier = CostTier.LLM
+
+            def _check_file_impl(self, file_path: Path) -> FileCheckResult:
+                add_llm_usage(cost=0.4, model="gpt-4")
+                return FileCheckResult(was_checked=True, issues=[])
+
+        for name in "abcd":
+            (tmp_path / f"{name}.py").write_text("a = 1\n")
+
+        checker = PaidChecker(fake_config)
+        checker.budget = 1.0
+        results = checker.check_files(sorted(tmp_path.glob("*.py")))
+        assert [r.was_checked for r in results.values()] == [True, True, True, False]
+        assert results[tmp_path / "d.py"].issues[0].message == BUDGET_EXCEEDED
+        assert all(r.tier == "llm" for r in checker.statistics)
+
+    def test_checker_statistics(self, tmp_path: Path, fake_config):
+        class MyChecker(CheckerABC):
+            def _check_file_impl(self, file_path: Path) -> FileCheckResult:
+                with stage("read"):
+                    file_path.read_text()
+                return FileCheckResult(was_checked=True, issues=[])
+
+        (tmp_path / "a.py").write_text("a = 1\n")
+        (tmp_path / "b.py").write_text("b = 1\n")
+
+        checker = MyChecker(fake_config)
+        checker.check_directory(tmp_path)
+        assert sorted(Path(r.file).name for r in checker.statistics) == [
+            "a.py",
+            "b.py",
+        ]
+        assert all("queue_wait" in r.durations for r in checker.statistics)
+        assert all("read" in r.durations for r in checker.statistics)
+
+
+def test_check_exports(tmp_path: Path):
+    (tmp_path / "code.py").write_text("a = 1\n")
+    json_path = tmp_path / "out.json"
+    prom_path = tmp_path / "out.prom"
+    res = check(
+        tmp_path / "code.py",
+        filter_checkers="trailing newline",
+        metrics_json=json_path,
+        metrics_prom=prom_path,
+    )
+    assert res == 0
+    data = json.loads(json_path.read_text())
+    assert data["checkers"]["trailing newline"]["files"] == 1
+    assert "qualiluma_files_total" in prom_path.read_text()
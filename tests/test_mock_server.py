@@ -0,0 +1,70 @@
+import json
+import urllib.request
+from pathlib import Path
+
+import openai
+import pytest
+from langchain_openai import ChatOpenAI
+
+from qualiluma.checks import FileCheckResult
+from qualiluma.util.llm import configure_llms, get_llm_client
+from qualiluma.util.metrics import MetricsRegistry
+from qualiluma.util.mock_server import (
+    MockOpenAIServer,
+    MockServerSettings,
+    example_from_schema,
+)
+
+
+@pytest.fixture(autouse=True)
+def reset_llms():
+    yield
+    configure_llms()
+
+
+def test_example_from_schema():
+    schema = FileCheckResult.model_json_schema()
+    assert FileCheckResult.model_validate(example_from_schema(schema)).issues == []
+    assert example_from_schema({"anyOf": [{"type": "integer"}, {"type": "null"}]}) == 1
+
+
+def test_llm_client_with_mock_server():
+    with MockOpenAIServer() as server:
+        configure_llms(base_url=server.url, api_key="test")
+        client = get_llm_client("fast")
+
+        registry = MetricsRegistry()
+        with registry.track("checker", Path("a.py")) as record:
+            res = client.structured_output("check this", FileCheckResult)
+            assert res.was_checked is True
+            assert client("hello") == "good"
+        assert record.llm_calls == 2
+        assert record.input_tokens > 0
+        assert server.requests_count == 2
+
+        with urllib.request.urlopen(f"{server.url}/models") as response:
+            assert json.load(response)["object"] == "list"
+
+
+def test_tool_call_structured_output():
+    with MockOpenAIServer() as server:
+        model = ChatOpenAI(model="mock", base_url=server.url, api_key="test")
+        structured = model.with_structured_output(
+            FileCheckResult, method="function_calling"
+        )
+        assert structured.invoke("check this").was_checked is True
+
+
+def test_rate_limit(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr("qualiluma.util.llm.RETRY_BASE_DELAY", 0)
+    settings = MockServerSettings(rate_limit_rate=1.0)
+    with MockOpenAIServer(settings=settings) as server:
+        configure_llms(base_url=server.url, api_key="test", max_retries=2)
+        client = get_llm_client("fast")
+        with pytest.raises(openai.RateLimitError):
+            client.structured_output("check this", FileCheckResult)
+        assert server.requests_count == 3  # first try and two retries
+
+    server = MockOpenAIServer(settings=MockServerSettings(max_concurrency=0))
+    assert server.admit() == (429, 0.0)
+    server.server_close()
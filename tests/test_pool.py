@@ -0,0 +1,109 @@
+import json
+import os
+from pathlib import Path
+
+from qualiluma.checks import gates
+from qualiluma.checks.pool import ProcessPoolRunner
+from qualiluma.main import build_checkers, check_path
+from qualiluma.util import Config
+from qualiluma.util.cache import ResultCache
+from qualiluma.util.llm import configure_llms
+from qualiluma.util.metrics import METRICS
+from qualiluma.util.tracing import TRACER
+
+
+def make_tree(root: Path) -> None:
+    for i in range(150):
+        directory = root / f"pkg_{i % 3}"
+        directory.mkdir(exist_ok=True)
+        text = f"a_{i} = {i}\n"
+        if i % 10 == 0:
+            text = text.rstrip()  # no newline at the end
+        if i % 25 == 0:
+            text = "def f(:\n"  # syntax error
+        (directory / f"file_{i}.py").write_text(text)
+
+
+def test_check_path_jobs(tmp_path: Path):
+    make_tree(tmp_path)
+    config = Config()
+    names = "local rules,python syntax,PepChecker"
+
+    configure_llms(backend="fake")
+    try:
+        expected = check_path(tmp_path, build_checkers(config, names))
+        gates._python_syntax_error.cache_clear()
+        METRICS.clear()
+        TRACER.start()
+        streamed = []
+        results = check_path(
+            tmp_path,
+            build_checkers(config, names),
+            on_result=lambda *args: streamed.append(args),
+            jobs=2,
+        )
+    finally:
+        TRACER.stop()
+        configure_llms()
+
+    assert results == expected
+    assert list(results["local rules"]) == list(expected["local rules"])
+    assert len(streamed) == 3 * 150
+    # gates still see the results of the local checkers from the workers
+    pep = results["PepChecker"]
+    assert sum(res.was_checked for res in pep.values()) == 150 - 6
+    # the parses gate uses the results of the syntax checker, not another parse
+    assert gates._python_syntax_error.cache_info().misses == 0
+
+    # metrics and trace spans of the workers are collected too
+    local = [r for r in METRICS.records if r.checker == "local rules"]
+    assert len(local) == 150
+    assert all("read" in r.durations and "queue_wait" in r.durations for r in local)
+    TRACER.export(tmp_path / "trace.json")
+    events = json.loads((tmp_path / "trace.json").read_text())["traceEvents"]
+    worker_checks = [
+        e for e in events if e["name"] == "check" and e["pid"] != os.getpid()
+    ]
+    assert len(worker_checks) == 2 * 150
+    assert all(e["ts"] >= 0 for e in worker_checks)
+
+
+def test_process_pool_runner(tmp_path: Path):
+    (tmp_path / "a.py").write_text("a = 1")
+    (tmp_path / "b.py").write_text("b = 1\n")
+    config = Config()
+    checkers = build_checkers(config, "trailing newline")
+    with ProcessPoolRunner(config, checkers, jobs=1) as runner:
+        runner.submit(checkers[0], [tmp_path / "a.py", tmp_path / "b.py"])
+        res = runner.wait_file(tmp_path / "a.py")["trailing newline"]
+        assert res.issues[0].line == 1
+        results = runner.drain()["trailing newline"]
+    assert list(results) == [tmp_path / "a.py", tmp_path / "b.py"]
+    assert results[tmp_path / "b.py"].issues == []
+
+
+def test_process_pool_runner_cache(tmp_path: Path):
+    (tmp_path / "a.py").write_text("a = 1")
+    (tmp_path / "b.py").write_text("b = 1\n")
+    paths = [tmp_path / "a.py", tmp_path / "b.py"]
+    config = Config()
+    checkers = build_checkers(config, "trailing newline")
+    checkers[0].result_cache = ResultCache()
+    with ProcessPoolRunner(config, checkers, jobs=1) as runner:
+        runner.submit(checkers[0], paths)
+        expected = runner.drain()["trailing newline"]
+    assert len(checkers[0].statistics) == 2
+    assert all("queue_wait" in r.durations for r in checkers[0].statistics)
+
+    (tmp_path / "b.py").write_text("b = 2")
+    with ProcessPoolRunner(config, checkers, jobs=1) as runner:
+        runner.submit(checkers[0], paths)
+        results = runner.drain()["trailing newline"]
+    assert results[tmp_path / "a.py"] == expected[tmp_path / "a.py"]
+    assert results[tmp_path / "b.py"].issues[0].line == 1  # changed, checked again
+    # statistics of this run only, a.py came from the cache
+    assert len(checkers[0].statistics) == 2
+    assert ["queue_wait" in r.durations for r in checkers[0].statistics] == [
+        False,
+        True,
+    ]
@@ -0,0 +1,52 @@
+import time
+from pathlib import Path
+
+from qualiluma.util import load_numbered
+from qualiluma.util.io import PREFETCH_BUFFER, SourceFile, read_file
+from qualiluma.util.prefetch import Prefetcher
+
+
+def make_files(root: Path, n: int) -> list[Path]:
+    paths = []
+    for i in range(n):
+        path = root / f"{i}.py"
+        path.write_text(f"a = {i}\nb = {i}\n")
+        paths.append(path)
+    return paths
+
+
+def test_prefetch_overlaps_reads(tmp_path: Path, monkeypatch):
+    def slow_read(file_path: Path) -> SourceFile:
+        time.sleep(0.05)  # e.g. a network file system
+        return read_file(file_path)
+
+    monkeypatch.setattr("qualiluma.util.prefetch.read_file", slow_read)
+    paths = make_files(tmp_path, 20)
+
+    start = time.perf_counter()
+    for path in Prefetcher().iterate(paths):
+        if path.name != "3.py":  # skipped files are not loaded
+            assert load_numbered(path).startswith("1: a = ")
+        time.sleep(0.05)  # e.g. the LLM request
+    # sequential reads would take 2 seconds
+    assert time.perf_counter() - start < 1.6
+    assert PREFETCH_BUFFER.take(paths[3]) is None  # dropped when passed
+
+
+def test_prefetch_limits(tmp_path: Path):
+    paths = make_files(tmp_path, 10)
+
+    prefetcher = Prefetcher(max_files=3)
+    iterator = prefetcher.iterate(paths)
+    assert next(iterator) == paths[0]
+    assert len(prefetcher._ahead) == 2  # and the current one
+
+    prefetcher = Prefetcher(max_bytes=1)
+    iterator = prefetcher.iterate(paths)
+    assert next(iterator) == paths[0]
+    time.sleep(0.1)
+    assert next(iterator) == paths[1]
+    assert len(prefetcher._ahead) == 0  # the buffer is full with one file
+
+    assert list(iterator) == paths[2:]
+    assert load_numbered(paths[0]) == "1: a = 0\n2: b = 0"
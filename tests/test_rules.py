@@ -0,0 +1,110 @@
+from pathlib import Path
+
+import pytest
+
+from qualiluma.checks import RulesChecker, Severity
+from qualiluma.checks.rules import load_rules
+from qualiluma.main import build_checkers
+from qualiluma.util import Config
+
+
+class RulesConfig:
+    def __init__(self, rules):
+        self.rules = rules
+
+    def get_local_rules(self):
+        return self.rules
+
+    def get_file_type(self, suffix):
+        return {".py": "python"}.get(suffix)
+
+
+ALL_RULES = [
+    {"name": "newline", "kind": "trailing_newline", "severity": "ERROR"},
+    {"name": "length", "kind": "line_length", "max_length": 10},
+    {"name": "whitespace", "kind": "trailing_whitespace", "severity": "INFO"},
+    {"name": "tabs", "kind": "tabs", "languages": ["python"]},
+    {"name": "mixed", "kind": "mixed_indentation"},
+    {"name": "crlf", "kind": "crlf"},
+    {"name": "bom", "kind": "bom"},
+    {"name": "utf8", "kind": "non_utf8"},
+    {"name": "todo", "kind": "regex", "pattern": r"#\s*TODO", "message": "TODO"},
+]
+
+
+def issue_lines(result):
+    return sorted((issue.check_name, issue.line) for issue in result.issues)
+
+
+@pytest.mark.parametrize("mmap_min_bytes", [1_000_000, 1])
+def test_rules_checker(tmp_path: Path, monkeypatch, mmap_min_bytes: int):
+    monkeypatch.setattr("qualiluma.util.io.MMAP_MIN_BYTES", mmap_min_bytes)
+    checker = RulesChecker(RulesConfig(ALL_RULES))
+
+    clean = tmp_path / "clean.py"
+    clean.write_text("a = 1\nif a:\n    b = 2\n")
+    assert checker.check_file(clean).issues == []
+
+    dirty = tmp_path / "dirty.py"
+    dirty.write_bytes(
+        b"\xef\xbb\xbfa = 1 \n"  # BOM, trailing whitespace
+        b"if a:\r\n"  # CRLF
+        b"\tb = 2  # TODO: fix\n"  # tab indentation, long line, TODO
+        b"    c = '\xff'\n"  # spaces after tabs, invalid UTF-8
+        b"d = 4"  # no newline at the end
+    )
+    res = checker.check_file(dirty)
+    assert res.was_checked
+    assert issue_lines(res) == [
+        ("bom", 1),
+        ("crlf", 2),
+        ("length", 3),
+        ("length", 4),
+        ("mixed", 4),
+        ("newline", 5),
+        ("tabs", 3),
+        ("todo", 3),
+        ("utf8", 4),
+        ("whitespace", 1),
+    ]
+    severities = {issue.check_name: issue.severity for issue in res.issues}
+    assert severities["newline"] == Severity.ERROR
+    assert severities["whitespace"] == Severity.INFO
+    assert severities["bom"] == Severity.WARNING
+
+    (tmp_path / "data.py").write_bytes(b"\0\1\2")
+    assert not checker.check_file(tmp_path / "data.py").was_checked
+
+    # rules limited to other languages don't apply
+    (tmp_path / "notes.txt").write_bytes(b"\tnote\n")
+    assert checker.check_file(tmp_path / "notes.txt").issues == []
+
+
+def test_rules_checker_limits(tmp_path: Path, monkeypatch):
+    monkeypatch.setattr("qualiluma.checks.rules.MAX_ISSUES_PER_RULE", 2)
+    checker = RulesChecker(RulesConfig(ALL_RULES), ["whitespace"], name="ws")
+    assert checker.get_name() == "ws"
+
+    (tmp_path / "a.py").write_text("a = 1 \n" * 5)
+    res = checker.check_file(tmp_path / "a.py")
+    assert [issue.line for issue in res.issues] == [1, 2, None]
+    assert res.issues[-1].message == "3 more issues"
+
+
+def test_load_rules():
+    rules = load_rules(Config())
+    assert "trailing newline" in [rule.name for rule in rules]
+
+    with pytest.raises(ValueError):
+        load_rules(RulesConfig([{"name": "x", "kind": "unknown"}]))
+
+
+def test_build_rule_checkers():
+    checkers = build_checkers(Config(), "line length,local rules")
+    assert [checker.get_name() for checker in checkers] == [
+        "line length",
+        "local rules",
+    ]
+    assert [rule.name for rule in checkers[0].rules] == ["line length"]
+    # disabled by default, but selected explicitly above
+    assert "line length" not in [rule.name for rule in checkers[1].rules]
@@ -0,0 +1,72 @@
+from pathlib import Path
+
+import pytest
+
+from qualiluma.main import build_checkers, check_path
+from qualiluma.util import Config
+from qualiluma.util.sample import Sample
+
+
+def _tree(root: Path) -> list[Path]:
+    paths = []
+    for directory, count in (("src", 30), ("docs", 10)):
+        (root / directory).mkdir()
+        for i in range(count):
+            path = root / directory / f"{i}.py"
+            # files with an even index miss the trailing newline
+            path.write_text(f"a = {i}" + ("" if i % 2 == 0 else "\n"))
+            paths.append(path)
+    return paths
+
+
+def test_select(tmp_path: Path):
+    paths = _tree(tmp_path)
+    sample = Sample(size=8, seed=1)
+    selected = sample.select(paths, tmp_path)
+    assert len(selected) == 8
+    assert sorted(selected) == sorted(sample.select(reversed(paths), tmp_path))
+    assert selected != Sample(size=8, seed=2).select(paths, tmp_path)
+
+    stratified = Sample(fraction=0.1, strata=["directory"])
+    selected = stratified.select(paths, tmp_path)
+    assert stratified.population == {"src": 30, "docs": 10}
+    assert sum(path.parent.name == "src" for path in selected) == 3
+    assert sum(path.parent.name == "docs" for path in selected) == 1
+
+    assert len(Sample(size=100).select(paths, tmp_path)) == 40
+    with pytest.raises(ValueError):
+        Sample(size=5, fraction=0.5)
+    with pytest.raises(ValueError):
+        Sample(size=5, strata=["owner"])
+
+
+def test_estimate(tmp_path: Path):
+    paths = _tree(tmp_path)
+    census = Sample(fraction=1.0)
+    selected = census.select(paths, tmp_path)
+    estimate = census.estimate({path: int(path.stem) % 2 == 0 for path in selected})
+    assert estimate.rate == estimate.low == estimate.high == 0.5
+    assert estimate.population == 40
+
+    sample = Sample(size=20, strata=["directory"])
+    selected = sample.select(paths, tmp_path)
+    outcomes = {path: path.parent.name == "docs" for path in selected}
+    estimate = sample.estimate(outcomes)
+    assert estimate.rate == pytest.approx(0.25)  # docs are a quarter of the files
+    assert estimate.low < 0.25 < estimate.high
+    assert estimate.checked == 20
+
+    outcomes[selected[0]] = None  # not checked, left out
+    assert sample.estimate(outcomes).checked == 19
+
+
+def test_check_path_sample(tmp_path: Path):
+    _tree(tmp_path)
+    checkers = build_checkers(Config(), "trailing newline")
+    sample = Sample(size=10, strata=["directory", "type"])
+    results = check_path(tmp_path, checkers, sample=sample)["trailing newline"]
+    assert len(results) == 10
+    estimate = sample.estimate(
+        {path: bool(res.issues) for path, res in results.items()}
+    )
+    assert estimate.low <= 0.5 <= estimate.high
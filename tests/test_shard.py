@@ -0,0 +1,89 @@
+from pathlib import Path
+
+import pytest
+
+from qualiluma.checks import FileCheckResult
+from qualiluma.checks.base import FileCheckResultBuilder
+from qualiluma.main import main
+from qualiluma.results import load_results, save_results
+from qualiluma.util.shard import Shard
+
+
+def _make_files(root: Path, n: int) -> list[Path]:
+    paths = []
+    for i in range(n):
+        path = root / f"dir_{i % 3}" / f"file_{i}.py"
+        path.parent.mkdir(exist_ok=True)
+        path.write_text("x = 1\n" * (i + 1))
+        paths.append(path)
+    return paths
+
+
+class TestShard:
+    def test_parse(self):
+        shard = Shard.parse("2/4")
+        assert (shard.index, shard.count) == (2, 4)
+        assert str(shard) == "2/4"
+        for spec in ["0/4", "5/4", "a/b", "1"]:
+            with pytest.raises(ValueError):
+                Shard.parse(spec)
+
+    @pytest.mark.parametrize("by_size", [False, True])
+    def test_disjoint_and_complete(self, tmp_path: Path, by_size: bool):
+        paths = _make_files(tmp_path, 30)
+        shards = [Shard(i, 3, by_size).select(paths, tmp_path) for i in (1, 2, 3)]
+        selected = [path for shard in shards for path in shard]
+        assert sorted(selected) == sorted(paths)
+        assert len(set(selected)) == len(paths)
+
+        # the split doesn't depend on the order of discovery or the root location
+        assert Shard(1, 3, by_size).select(reversed(paths), tmp_path) == list(
+            reversed(shards[0])
+        )
+
+    def test_by_size_balanced(self, tmp_path: Path):
+        paths = _make_files(tmp_path, 30)
+        loads = [
+            sum(p.stat().st_size for p in Shard(i, 3, True).select(paths, tmp_path))
+            for i in (1, 2, 3)
+        ]
+        assert max(loads) - min(loads) <= max(p.stat().st_size for p in paths)
+
+
+def test_save_load_results(tmp_path: Path):
+    builder = FileCheckResultBuilder("A")
+    usage = {"model": {"input_tokens": 10, "output_tokens": 5, "total_tokens": 15}}
+    save_results(
+        {"A": {Path("a.py"): builder.failed("bad")}}, tmp_path / "1.json", usage
+    )
+    save_results({"A": {Path("b.py"): builder.passed()}}, tmp_path / "2.json", usage)
+
+    results, merged_usage = load_results([tmp_path / "1.json", tmp_path / "2.json"])
+    assert set(results["A"]) == {Path("a.py"), Path("b.py")}
+    assert isinstance(results["A"][Path("a.py")], FileCheckResult)
+    assert results["A"][Path("a.py")].issues[0].message == "bad"
+    assert merged_usage["model"]["input_tokens"] == 20
+
+
+def test_main_shard_and_merge(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    code_dir = tmp_path / "code"
+    code_dir.mkdir()
+    paths = _make_files(code_dir, 10)
+    paths[0].write_text("no newline")
+
+    results_files = []
+    for i in (1, 2):
+        results_file = tmp_path / f"shard_{i}.json"
+        results_files.append(str(results_file))
+        argv = ["qualiluma", str(code_dir), "-c", "trailing newline"]
+        argv += ["--shard", f"{i}/2", "--results-json", str(results_file)]
+        monkeypatch.setattr("qualiluma.main.sys.argv", argv)
+        main()
+
+    results, _usage = load_results([Path(f) for f in results_files])
+    assert len(results["trailing newline"]) == 10
+
+    monkeypatch.setattr(
+        "qualiluma.main.sys.argv", ["qualiluma", "merge", *results_files]
+    )
+    assert main() == 1
@@ -0,0 +1,62 @@
+import json
+import time
+from pathlib import Path
+
+from qualiluma.main import check
+from qualiluma.util.tracing import SamplingProfiler, Tracer, span, traced_iter
+
+
+class TestTracer:
+    def test_spans_and_export(self, tmp_path: Path):
+        tracer = Tracer()
+        tracer.start()
+        tracer.add_span("read", 1.0, 1.5, {"checker": "A", "file": Path("x.py")})
+        tracer.stop()
+
+        tracer.export(tmp_path / "trace.json")
+        data = json.loads((tmp_path / "trace.json").read_text())
+        spans = [e for e in data["traceEvents"] if e["ph"] == "X"]
+        assert len(spans) == 1
+        assert spans[0]["name"] == "read"
+        assert spans[0]["cat"] == "A"
+        assert spans[0]["args"]["file"] == "x.py"
+        assert abs(spans[0]["dur"] - 0.5e6) < 1
+        assert any(e["ph"] == "M" for e in data["traceEvents"])
+
+    def test_span_disabled(self):
+        with span("nothing"):
+            pass
+        assert list(traced_iter([1, 2, 3], "it")) == [1, 2, 3]
+
+
+def test_sampling_profiler(tmp_path: Path):
+    def busy_function():
+        end = time.perf_counter() + 0.1
+        while time.perf_counter() < end:
+            pass
+
+    with SamplingProfiler(interval=0.001) as profiler:
+        busy_function()
+
+    profiler.export(tmp_path / "profile.folded")
+    lines = (tmp_path / "profile.folded").read_text().splitlines()
+    assert any("busy_function" in line for line in lines)
+    assert all(line.rsplit(" ", 1)[1].isdigit() for line in lines)
+
+
+def test_check_trace_and_profile(tmp_path: Path):
+    (tmp_path / "code.py").write_text("a = 1\n")
+    trace_path = tmp_path / "trace.json"
+    profile_path = tmp_path / "profile.folded"
+    res = check(
+        tmp_path,
+        filter_checkers="trailing newline",
+        trace=trace_path,
+        profile=profile_path,
+    )
+    assert res == 0
+
+    events = json.loads(trace_path.read_text())["traceEvents"]
+    names = {e["name"] for e in events if e["ph"] == "X"}
+    assert {"walk", "check"} <= names
+    assert profile_path.exists()
@@ -0,0 +1,90 @@
+import time
+from pathlib import Path
+
+import pytest
+
+from qualiluma.main import build_checkers
+from qualiluma.util import Config
+from qualiluma.util.llm import configure_llms
+from qualiluma.util.watch import PollingWatcher, create_watcher, wait_for_changes
+from qualiluma.watch import WatchSession
+
+
+@pytest.mark.parametrize("polling", [False, True])
+def test_watcher(tmp_path: Path, polling: bool):
+    (tmp_path / "sub").mkdir()
+    (tmp_path / "skipped").mkdir()
+    (tmp_path / "a.py").write_text("a = 1\n")
+
+    with create_watcher(tmp_path, ["skipped"], polling) as watcher:
+        if polling:
+            assert isinstance(watcher, PollingWatcher)
+            watcher.interval = 0.05
+        assert wait_for_changes(watcher, 0.1, timeout=0.2) == set()
+
+        (tmp_path / "a.py").write_text("a = 2\n")
+        (tmp_path / "sub" / "b.py").write_text("b = 1\n")
+        (tmp_path / "skipped" / "c.py").write_text("c = 1\n")
+        (tmp_path / "new").mkdir()
+        (tmp_path / "new" / "d.py").write_text("d = 1\n")
+        assert wait_for_changes(watcher, 0.2, timeout=5) == {
+            tmp_path / "a.py",
+            tmp_path / "sub" / "b.py",
+            tmp_path / "new" / "d.py",
+        }
+
+        (tmp_path / "a.py").unlink()
+        assert tmp_path / "a.py" in wait_for_changes(watcher, 0.2, timeout=5)
+
+
+def test_watch_session(tmp_path: Path):
+    (tmp_path / "good.py").write_text("a = 1\n")
+    (tmp_path / "bad.py").write_text("a = 1")
+    (tmp_path / "notes.bin").write_text("")
+
+    checkers = build_checkers(Config(), "trailing newline")
+    updates = []
+    session = WatchSession(tmp_path, checkers, on_update=updates.append)
+    results = session.check_all()["trailing newline"]
+    assert set(results) == {tmp_path / "good.py", tmp_path / "bad.py"}
+    assert results[tmp_path / "bad.py"].issues
+
+    session.start()
+    try:
+        (tmp_path / "bad.py").write_text("a = 1\n")
+        (tmp_path / "good.py").unlink()
+        (tmp_path / "notes.bin").write_text("a")
+        session.submit(
+            {tmp_path / "bad.py", tmp_path / "good.py", tmp_path / "notes.bin"}
+        )
+        assert session.wait_idle(timeout=5)
+    finally:
+        session.stop()
+
+    results = session.results["trailing newline"]
+    assert set(results) == {tmp_path / "bad.py"}
+    assert not results[tmp_path / "bad.py"].issues
+    assert len(updates) == 4
+
+
+def test_watch_session_cancels(tmp_path: Path):
+    configure_llms(
+        backend="fake", fake={"latency": {"distribution": "constant", "value": 2}}
+    )
+    try:
+        (tmp_path / "a.py").write_text("a = 1\n")
+        session = WatchSession(tmp_path, build_checkers(Config(), "PepChecker"))
+        session.start()
+        try:
+            start = time.perf_counter()
+            session.submit({tmp_path / "a.py"})
+            time.sleep(0.5)  # the first check is waiting for the LLM
+            session.submit({tmp_path / "a.py"})
+            assert session.wait_idle(timeout=10)
+            # without cancelling, both checks would take 2 seconds
+            assert time.perf_counter() - start < 3.5
+        finally:
+            session.stop()
+        assert session.results["PepChecker"][tmp_path / "a.py"].was_checked
+    finally:
+        configure_llms()